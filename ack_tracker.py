@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rastreamento de confirmações de presença nas convocações
+Membros reagem à DM da convocação (ou à publicação do modo resumo) para confirmar presença. As reações chegam
+como eventos raw e são resolvidas por um índice message_id -> convocação em O(1),
+sem depender do cache de mensagens. A mensagem de resultado do oficial mostra a
+contagem ao vivo, com edições agrupadas (no máximo uma a cada poucos segundos)
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger('ack_tracker')
+
+
+class ConvocationAcks:
+    """Estado de confirmações de uma convocação"""
+
+    __slots__ = ("id", "total", "acks", "message", "base_text", "messages",
+                 "last_edit", "edit_task", "rendered")
+
+    def __init__(self, convocation_id):
+        self.id = convocation_id
+        self.total = 0
+        self.acks = set()
+        self.messages = 0      # DMs ainda indexadas desta convocação
+        self.message = None    # Mensagem de resultado do oficial
+        self.base_text = ""
+        self.last_edit = 0.0
+        self.edit_task = None
+        self.rendered = None   # Último conteúdo enviado, para evitar edições repetidas
+
+    def render(self):
+        return f"{self.base_text}\n✋ Presenças confirmadas: **{len(self.acks)}/{self.total}**"
+
+
+class AckTracker:
+    """Índice de DMs de convocação e contagem de confirmações"""
+
+    def __init__(self, emoji="✅", edit_interval=5.0):
+        self.emoji = emoji
+        self.edit_interval = edit_interval
+        self._by_message = {}      # message_id -> (convocation_id, user_id ou frozenset no modo resumo)
+        self._convocations = {}    # convocation_id -> ConvocationAcks
+        self.edits = 0
+        self.acks_received = 0
+
+    def start(self, convocation_id):
+        conv = ConvocationAcks(convocation_id)
+        self._convocations[convocation_id] = conv
+        return conv
+
+    def get(self, convocation_id):
+        return self._convocations.get(convocation_id)
+
+    def register_message(self, convocation_id, message_id, user_id):
+        """Indexa uma DM enviada para resolver reações a ela"""
+        conv = self._convocations.get(convocation_id)
+        if conv is None:
+            return
+        self._by_message[message_id] = (convocation_id, user_id)
+        conv.total += 1
+        conv.messages += 1
+
+    def register_digest(self, convocation_id, message_ids, user_ids):
+        """Indexa as publicações de um canal de resumo; reações de qualquer membro mencionado contam"""
+        conv = self._convocations.get(convocation_id)
+        if conv is None or not message_ids:
+            return
+        membros = frozenset(user_ids)
+        for message_id in message_ids:
+            self._by_message[message_id] = (convocation_id, membros)
+        conv.total += len(membros)
+        conv.messages += len(message_ids)
+
+    def forget_message(self, message_id):
+        """Remove uma DM do índice (ex.: após a auto-destruição)"""
+        entry = self._by_message.pop(message_id, None)
+        if entry is None:
+            return
+        conv = self._convocations.get(entry[0])
+        if conv is None:
+            return
+        conv.messages -= 1
+        if conv.messages <= 0:
+            if conv.edit_task is not None:
+                conv.edit_task.cancel()
+            del self._convocations[conv.id]
+
+    def set_result(self, convocation_id, base_text):
+        """
+        Define o texto de resultado da convocação e retorna o conteúdo com a contagem
+        de presenças, que deve ser usado na mensagem passada a attach_message
+        """
+        conv = self._convocations.get(convocation_id)
+        if conv is None:
+            return base_text
+        if conv.total == 0:
+            # Nenhuma DM entregue: não há o que acompanhar
+            del self._convocations[convocation_id]
+            return base_text
+        conv.base_text = base_text
+        return conv.render()
+
+    def attach_message(self, convocation_id, message):
+        """Define a mensagem de resultado que exibirá a contagem ao vivo"""
+        conv = self._convocations.get(convocation_id)
+        if conv is None or message is None:
+            return
+        conv.message = message
+        conv.rendered = conv.render()
+        conv.last_edit = time.monotonic()
+
+    def handle_reaction(self, payload, added=True):
+        """
+        Processa um evento raw de reação; retorna a convocação afetada ou None
+        Reações em mensagens que não são DMs de convocação custam apenas um lookup
+        """
+        entry = self._by_message.get(payload.message_id)
+        if entry is None or str(payload.emoji) != self.emoji:
+            return None
+
+        convocation_id, destinatario = entry
+        if isinstance(destinatario, frozenset):
+            if payload.user_id not in destinatario:
+                return None
+        elif payload.user_id != destinatario:
+            return None
+        user_id = payload.user_id
+
+        conv = self._convocations.get(convocation_id)
+        if conv is None:
+            return None
+
+        if added:
+            if user_id in conv.acks:
+                return conv
+            conv.acks.add(user_id)
+            self.acks_received += 1
+        else:
+            if user_id not in conv.acks:
+                return conv
+            conv.acks.discard(user_id)
+
+        self._schedule_edit(conv)
+        return conv
+
+    def _schedule_edit(self, conv):
+        # Uma edição pendente já incluirá esta mudança
+        if conv.message is None or (conv.edit_task is not None and not conv.edit_task.done()):
+            return
+        conv.edit_task = asyncio.get_running_loop().create_task(self._coalesced_edit(conv))
+
+    async def _coalesced_edit(self, conv):
+        # Repete enquanto houver mudanças não exibidas (reações durante a edição anterior)
+        while conv.message is not None:
+            espera = conv.last_edit + self.edit_interval - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+            conteudo = conv.render()
+            if conteudo == conv.rendered:
+                return
+            conv.last_edit = time.monotonic()
+            try:
+                await conv.message.edit(content=conteudo)
+                conv.rendered = conteudo
+                self.edits += 1
+            except Exception as e:
+                # Ex.: token da interação expirado ou mensagem apagada; para de editar
+                logger.warning(f"Não foi possível atualizar presenças da convocação {conv.id}: {e}")
+                conv.message = None
+
+    def stats(self):
+        return {
+            "indexed_messages": len(self._by_message),
+            "convocations": len(self._convocations),
+            "acks_received": self.acks_received,
+            "summary_edits": self.edits
+        }
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Controle de admissão para comandos caros (convocações)
+Token buckets por usuário e por servidor limitam a frequência de convocações,
+e um limite global controla quantas convocações enviam DMs ao mesmo tempo
+(as excedentes aguardam na fila)
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import time
+import asyncio
+import contextlib
+from collections import Counter
+
+from config import Config
+
+# Quantidade de buckets a partir da qual os cheios (inativos) são descartados
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Balde de fichas com reposição contínua"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity):
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, capacity, refill_seconds, now):
+        if refill_seconds <= 0:
+            self.tokens = float(capacity)
+        else:
+            self.tokens = min(capacity, self.tokens + (now - self.updated) / refill_seconds)
+        self.updated = now
+
+    def check(self, capacity, refill_seconds, now):
+        """Retorna 0 se há ficha disponível, ou os segundos até a próxima ficha"""
+        self._refill(capacity, refill_seconds, now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * refill_seconds
+
+    def consume(self):
+        self.tokens -= 1
+
+    def is_full(self, capacity, refill_seconds, now):
+        self._refill(capacity, refill_seconds, now)
+        return self.tokens >= capacity
+
+
+class AdmissionController:
+    """Limita convocações por usuário, por servidor e em andamento simultaneamente"""
+
+    def __init__(self):
+        self._user_buckets = {}
+        self._guild_buckets = {}
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition = asyncio.Condition()
+        self.counters = Counter()
+
+    @staticmethod
+    def _limits():
+        return {
+            "user": (Config.CONVOCAR_USER_BURST, Config.DEFAULT_COMMAND_COOLDOWN),
+            "guild": (Config.CONVOCAR_GUILD_BURST, Config.CONVOCAR_GUILD_REFILL_SECONDS)
+        }
+
+    def _bucket(self, buckets, key, capacity, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_BUCKETS:
+                self._prune(now)
+            bucket = buckets[key] = TokenBucket(capacity)
+        return bucket
+
+    def _prune(self, now):
+        limits = self._limits()
+        for tipo, buckets in (("user", self._user_buckets), ("guild", self._guild_buckets)):
+            capacity, refill = limits[tipo]
+            for key in [k for k, b in buckets.items() if b.is_full(capacity, refill, now)]:
+                del buckets[key]
+
+    def try_admit(self, guild_id, user_id):
+        """
+        Consome uma ficha do usuário e do servidor, se ambos tiverem
+
+        Returns:
+            tuple: (admitido, escopo que recusou ou None, segundos de espera sugeridos)
+        """
+        now = time.monotonic()
+        limits = self._limits()
+        user_bucket = self._bucket(self._user_buckets, user_id, limits["user"][0], now)
+        guild_bucket = self._bucket(self._guild_buckets, guild_id, limits["guild"][0], now)
+
+        espera_usuario = user_bucket.check(*limits["user"], now)
+        espera_servidor = guild_bucket.check(*limits["guild"], now)
+
+        # Só consome quando os dois baldes aceitam, para não punir em dobro
+        if espera_usuario > 0:
+            self.counters["rejected_user"] += 1
+            return False, "user", espera_usuario
+        if espera_servidor > 0:
+            self.counters["rejected_guild"] += 1
+            return False, "guild", espera_servidor
+
+        user_bucket.consume()
+        guild_bucket.consume()
+        self.counters["admitted"] += 1
+        return True, None, 0.0
+
+    def saturated(self):
+        """True se uma nova convocação teria que aguardar na fila"""
+        return self._in_flight >= Config.MAX_CONCURRENT_FANOUTS
+
+    @contextlib.asynccontextmanager
+    async def fanout_slot(self):
+        """Reserva uma vaga de convocação em andamento, aguardando se o limite global foi atingido"""
+        async with self._condition:
+            if self._in_flight >= Config.MAX_CONCURRENT_FANOUTS:
+                self.counters["queued"] += 1
+                self._waiting += 1
+                try:
+                    await self._condition.wait_for(
+                        lambda: self._in_flight < Config.MAX_CONCURRENT_FANOUTS
+                    )
+                finally:
+                    self._waiting -= 1
+            self._in_flight += 1
+            self.counters["max_in_flight"] = max(self.counters["max_in_flight"], self._in_flight)
+
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def stats(self):
+        """Contadores para monitoramento"""
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrent": Config.MAX_CONCURRENT_FANOUTS,
+            "tracked_users": len(self._user_buckets),
+            "tracked_guilds": len(self._guild_buckets),
+            **dict(self.counters)
+        }
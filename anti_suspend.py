@@ -18,15 +18,21 @@ import requests
 import psutil
 from datetime import datetime
 
-# Configura logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-)
+# Configurar logging (fila + escrita em segundo plano)
+from log_pipeline import setup_logging
+setup_logging()
 logger = logging.getLogger('anti_suspend')
 
 # Intervalo de verificação (em segundos)
-CHECK_INTERVAL = 300  # 5 minutos
+try:
+    from config import Config
+except ImportError:
+    Config = None
+CHECK_INTERVAL = 300  # 5 minutos (padrão se config.py não estiver disponível)
+
+def get_check_interval():
+    """Retorna o intervalo atual, acompanhando recargas da configuração"""
+    return Config.PING_INTERVAL if Config is not None else CHECK_INTERVAL
 
 # URLs para fazer ping e manter o sistema ativo
 PING_TARGETS = [
@@ -98,7 +104,7 @@ def monitor_uptime():
                 continue
             
             # Aguarda até a próxima verificação
-            time.sleep(CHECK_INTERVAL)
+            time.sleep(get_check_interval())
         except Exception as e:
             logger.error(f"Erro no sistema anti-suspensão: {str(e)}")
             # Aguarda um período antes de tentar novamente
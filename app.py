@@ -4,6 +4,10 @@
 """
 Arquivo de compatibilidade para o Replit
 Este arquivo existe apenas para suportar a execução web
+
+Também serve como ponto de entrada WSGI do servidor web separado do bot
+(ex.: gunicorn -w 4 app:app). Com SHARED_METRICS_FILE configurado, o estado e as
+métricas são lidos do segmento compartilhado gravado pelo processo do bot.
 """
 
 from flask import Flask, jsonify, render_template_string
@@ -11,7 +15,11 @@ import os
 
 # Importa o servidor ping existente, se possível
 try:
-    from ping_service import app
+    from ping_service import app, use_shared_state
+    from config import Config
+    
+    if Config.SHARED_METRICS_FILE:
+        use_shared_state(Config.SHARED_METRICS_FILE)
 except ImportError:
     # Se não conseguir importar, cria um servidor simples
     app = Flask(__name__)
@@ -6,6 +6,12 @@ Sistema de Reinicialização Automática para o Bot Discord
 Reinicia o bot periodicamente para garantir estabilidade
 Desenvolvido por Resetsui para We Profit - 2025
 Otimizado para melhor desempenho com menor impacto
+
+O uso de memória (RSS) é amostrado continuamente em um buffer circular e a
+tendência de crescimento é usada para prever quando o limiar será atingido.
+Reinícios necessários aguardam uma janela tranquila: enquanto alguma sonda de
+atividade (convocação em andamento, auto-destruições pendentes) indicar trabalho,
+o reinício é adiado, exceto se a memória passar do limite rígido.
 """
 
 import os
@@ -16,30 +22,70 @@ import psutil
 import logging
 import threading
 import subprocess
+from collections import deque
 from datetime import datetime, timedelta
 
-# Configura logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-)
+# Configurar logging (fila + escrita em segundo plano)
+from log_pipeline import setup_logging
+setup_logging()
 logger = logging.getLogger('auto_restart')
 
 # Importa configurações, se disponível
 try:
-    from config import Config
+    from config import Config, add_config_listener
     MEMORY_THRESHOLD_MB = Config.MEMORY_THRESHOLD_MB
-    CHECK_INTERVAL = 30 * 60  # 30 minutos
+    CHECK_INTERVAL = Config.MEMORY_SAMPLE_INTERVAL
     MAX_UPTIME = Config.AUTO_RESTART_INTERVAL
+    FORECAST_HORIZON = Config.MEMORY_FORECAST_HORIZON
+    HARD_LIMIT_FACTOR = Config.MEMORY_HARD_LIMIT_FACTOR
+    
+    def _on_config_change(alterados):
+        """Atualiza os limites quando o arquivo de configuração muda"""
+        global MEMORY_THRESHOLD_MB, MAX_UPTIME, CHECK_INTERVAL, FORECAST_HORIZON, HARD_LIMIT_FACTOR
+        MEMORY_THRESHOLD_MB = Config.MEMORY_THRESHOLD_MB
+        MAX_UPTIME = Config.AUTO_RESTART_INTERVAL
+        CHECK_INTERVAL = Config.MEMORY_SAMPLE_INTERVAL
+        FORECAST_HORIZON = Config.MEMORY_FORECAST_HORIZON
+        HARD_LIMIT_FACTOR = Config.MEMORY_HARD_LIMIT_FACTOR
+    
+    add_config_listener(_on_config_change)
 except ImportError:
     # Usa configurações padrão se não puder importar
     MEMORY_THRESHOLD_MB = 500  # 500MB
-    CHECK_INTERVAL = 30 * 60  # 30 minutos
+    CHECK_INTERVAL = 60  # Amostragem de memória a cada minuto
     MAX_UPTIME = 12 * 60 * 60  # 12 horas
+    FORECAST_HORIZON = 30 * 60  # 30 minutos
+    HARD_LIMIT_FACTOR = 1.5
+
+# Intervalo mínimo entre otimizações de memória sem reinício
+OPTIMIZE_INTERVAL = 3600
+
+# Amostras de memória: (timestamp, MB), cobrindo as últimas ~2h com o intervalo padrão
+MEMORY_SAMPLES = deque(maxlen=120)
+
+# Sondas de atividade: funções que retornam None (ocioso) ou o motivo para adiar o reinício
+ACTIVITY_PROBES = []
+
+# Estado do reinício pendente, exposto para monitoramento
+RESTART_STATE = {"pending_reason": None, "deferred_since": None, "deferred_by": []}
 
 # Último reinício - inicializado com o timestamp atual
 LAST_RESTART = time.time()
 
+# Funções chamadas antes da reinicialização (os.execl não executa atexit)
+SHUTDOWN_HOOKS = []
+
+def register_shutdown_hook(hook):
+    """Registra uma função sem argumentos executada no desligamento suave"""
+    SHUTDOWN_HOOKS.append(hook)
+
+def register_activity_probe(probe):
+    """
+    Registra uma função sem argumentos que retorna None se não há atividade,
+    ou um texto com o motivo para adiar o reinício (chamada na thread do monitor)
+    """
+    ACTIVITY_PROBES.append(probe)
+
 def get_memory_usage():
     """Retorna o uso de memória do processo atual em MB"""
     process = psutil.Process(os.getpid())
@@ -87,40 +133,116 @@ def optimize_memory_usage(bot=None):
     
     return stats
 
-def needs_restart():
-    """Verifica se o bot precisa ser reiniciado com base em várias condições"""
-    current_time = time.time()
-    uptime = current_time - LAST_RESTART
+def sample_memory():
+    """Registra uma amostra de uso de memória no buffer circular e a retorna"""
+    memory_mb = get_memory_usage()
+    MEMORY_SAMPLES.append((time.time(), memory_mb))
+    return memory_mb
+
+def memory_growth_slope():
+    """Tendência de crescimento da memória em MB/s (regressão linear das amostras)"""
+    amostras = list(MEMORY_SAMPLES)
+    if len(amostras) < 10:
+        return None
+    
+    t0 = amostras[0][0]
+    xs = [t - t0 for t, _ in amostras]
+    ys = [mb for _, mb in amostras]
+    media_x = sum(xs) / len(xs)
+    media_y = sum(ys) / len(ys)
+    variancia = sum((x - media_x) ** 2 for x in xs)
+    if variancia == 0:
+        return None
+    return sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys)) / variancia
+
+def forecast_threshold_crossing():
+    """Segundos até o limiar de memória ser atingido pela tendência atual (None se não crescer)"""
+    slope = memory_growth_slope()
+    if not slope or slope <= 0 or not MEMORY_SAMPLES:
+        return None
+    atual = MEMORY_SAMPLES[-1][1]
+    return max(0.0, (MEMORY_THRESHOLD_MB - atual) / slope)
+
+def restart_reason(memory_usage=None):
+    """Retorna o motivo pelo qual o bot deve ser reiniciado, ou None"""
+    uptime = time.time() - LAST_RESTART
     
     # Verifica tempo de atividade
     if uptime > MAX_UPTIME:
-        logger.info(f"Reinício programado: Tempo máximo de atividade atingido ({uptime/3600:.1f}h)")
-        return True
+        return f"tempo máximo de atividade atingido ({uptime/3600:.1f}h)"
     
     # Verifica uso de memória
-    memory_usage = get_memory_usage()
+    if memory_usage is None:
+        memory_usage = get_memory_usage()
     if memory_usage > MEMORY_THRESHOLD_MB:
         logger.warning(f"Uso de memória elevado: {memory_usage:.2f}MB > {MEMORY_THRESHOLD_MB}MB")
         
-        # Tenta otimizar antes de reiniciar
-        optimize_memory_usage()
+        # Tenta otimizar antes de reiniciar, uma vez por adiamento
+        # (a coleta completa é cara com o heap grande e não precisa se repetir a cada verificação)
+        if RESTART_STATE["deferred_since"] is None:
+            optimize_memory_usage()
+            memory_usage = get_memory_usage()
         
         # Verifica novamente após otimização
-        new_memory_usage = get_memory_usage()
-        if new_memory_usage > MEMORY_THRESHOLD_MB:
-            logger.warning(f"Memória continua alta após otimização: {new_memory_usage:.2f}MB")
-            return True
+        if memory_usage > MEMORY_THRESHOLD_MB:
+            return f"memória continua alta após otimização ({memory_usage:.2f}MB)"
+    
+    # Verifica a previsão de crescimento
+    eta = forecast_threshold_crossing()
+    if eta is not None and eta <= FORECAST_HORIZON:
+        return f"limiar de {MEMORY_THRESHOLD_MB}MB previsto em {eta/60:.0f} min"
     
-    return False
+    return None
+
+def needs_restart():
+    """Verifica se o bot precisa ser reiniciado com base em várias condições"""
+    motivo = restart_reason()
+    if motivo:
+        logger.info(f"Reinício necessário: {motivo}")
+    return motivo is not None
+
+def activity_reasons():
+    """Consulta as sondas de atividade e retorna os motivos para adiar o reinício"""
+    motivos = []
+    for probe in list(ACTIVITY_PROBES):
+        try:
+            motivo = probe()
+        except Exception as e:
+            logger.warning(f"Erro em sonda de atividade: {e}")
+            continue
+        if motivo:
+            motivos.append(motivo)
+    return motivos
+
+def restart_status():
+    """Estado do monitor de reinício para o endpoint de métricas"""
+    amostras = list(MEMORY_SAMPLES)
+    slope = memory_growth_slope()
+    eta = forecast_threshold_crossing()
+    return {
+        "memory_mb": round(amostras[-1][1], 2) if amostras else None,
+        "threshold_mb": MEMORY_THRESHOLD_MB,
+        "samples": len(amostras),
+        "growth_mb_per_hour": round(slope * 3600, 2) if slope is not None else None,
+        "threshold_eta_seconds": round(eta) if eta is not None else None,
+        "uptime_seconds": round(time.time() - LAST_RESTART),
+        **RESTART_STATE
+    }
 
 def graceful_shutdown():
     """Realiza um desligamento suave antes da reinicialização"""
     logger.info("Realizando desligamento suave antes da reinicialização...")
     
+    # Executa as rotinas registradas (ex.: persistir estado do bot)
+    for hook in list(SHUTDOWN_HOOKS):
+        try:
+            hook()
+        except Exception as e:
+            logger.error(f"Erro em rotina de desligamento: {e}")
+    
     # Limpa recursos antes de reiniciar
     gc.collect()
     
-    # Outras operações de limpeza podem ser adicionadas aqui
     logger.info("Desligamento suave concluído.")
 
 def restart_bot():
@@ -148,20 +270,43 @@ def monitor_and_restart():
     """Thread que monitora condições e reinicia quando necessário"""
     logger.info("Monitor de reinicialização automática iniciado")
     
+    ultima_otimizacao = time.time()
+    
     while True:
         try:
+            memory_usage = sample_memory()
+            
             # Verifica se é necessário reiniciar
-            if needs_restart():
-                restart_bot()
-                # Código abaixo não deve ser executado após restart_bot()
-                # mas mantemos como salvaguarda
-                time.sleep(60)
+            motivo = restart_reason(memory_usage)
+            if motivo:
+                ocupado = activity_reasons()
+                critico = memory_usage > MEMORY_THRESHOLD_MB * HARD_LIMIT_FACTOR
+                
+                if ocupado and not critico:
+                    # Aguarda a próxima janela tranquila
+                    if RESTART_STATE["deferred_by"] != ocupado:
+                        logger.info(f"Reinício adiado ({motivo}): {', '.join(ocupado)}")
+                    if RESTART_STATE["deferred_since"] is None:
+                        RESTART_STATE["deferred_since"] = time.time()
+                    RESTART_STATE.update(pending_reason=motivo, deferred_by=ocupado)
+                else:
+                    if critico and ocupado:
+                        logger.warning(f"Memória crítica ({memory_usage:.2f}MB): reiniciando apesar de "
+                                       f"{', '.join(ocupado)}")
+                    logger.info(f"Reinício programado: {motivo}")
+                    restart_bot()
+                    # Código abaixo não deve ser executado após restart_bot()
+                    # mas mantemos como salvaguarda
+                    time.sleep(60)
+            else:
+                RESTART_STATE.update(pending_reason=None, deferred_since=None, deferred_by=[])
             
             # Otimiza ocasionalmente mesmo sem necessidade de reinício
-            if time.time() - LAST_RESTART > 3600:  # A cada hora
+            if time.time() - ultima_otimizacao > OPTIMIZE_INTERVAL:
                 optimize_memory_usage()
+                ultima_otimizacao = time.time()
             
-            # Aguarda até a próxima verificação
+            # Aguarda até a próxima amostra
             time.sleep(CHECK_INTERVAL)
         except Exception as e:
             logger.error(f"Erro no monitor de reinicialização: {e}")
@@ -172,6 +317,12 @@ def start_auto_restart_monitor():
     """Inicia o monitor de reinicialização automática"""
     logger.info("Iniciando sistema de reinicialização automática...")
     
+    try:
+        from metrics_registry import register_metrics
+        register_metrics("auto_restart", restart_status)
+    except ImportError:
+        pass
+    
     auto_restart_thread = threading.Thread(target=monitor_and_restart)
     auto_restart_thread.daemon = True
     auto_restart_thread.start()
@@ -9,25 +9,26 @@ Desenvolvido por Resetsui para We Profit - 2025
 
 import os
 import sys
+import json
+import math
 import time
 import asyncio
+import uuid
+import contextlib
 import random
 import logging
 from typing import Optional, List, Dict
+from collections import Counter
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Configurar logging (fila + escrita em segundo plano)
+from log_pipeline import setup_logging
+setup_logging()
 logger = logging.getLogger('bot')
 
 # Carregar variáveis de ambiente
@@ -38,47 +39,164 @@ except ImportError:
     logger.warning("python-dotenv não está instalado. Não será possível carregar variáveis de ambiente do arquivo .env")
 
 # Importar configurações
-from config import Config
+from config import Config, add_config_listener, start_config_watcher
+from dm_cache import DMNegativeCache
+from send_scheduler import SendScheduler
+from role_index import RoleIndex, parse_role_tokens
+from recipient_order import order_recipients
+from digest import split_recipients, mention_chunks
+from admission import AdmissionController
+from ack_tracker import AckTracker
+from idempotency import IdempotencyRegistry, make_key
+from history_store import HistoryStore
+from scheduled_convocations import ConvocationSchedule, parse_fire_time
+from extension_loader import ExtensionLoader
+from trace_recorder import TraceRecorder
+from span_tracer import SpanTracer, span, annotate
+from instrumentation import DispatchStats
+from loop_monitor import LoopLagMonitor
+from auto_restart import register_shutdown_hook, register_activity_probe
+import ratelimit_state
+from metrics_registry import register_metrics, collect_metrics
+from bot_state import state as bot_state
+from shared_metrics import SharedMetricsWriter
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Árvore de comandos slash que mede a latência de cada comando quando a instrumentação está ativa"""
+    
+    async def _call(self, interaction):
+        # _call é interno do discord.py, mas é o ponto único de execução dos comandos slash
+        stats = getattr(self.client, "dispatch_stats", None)
+        if stats is None:
+            return await super()._call(interaction)
+        
+        inicio = time.perf_counter()
+        try:
+            return await super()._call(interaction)
+        finally:
+            nome = interaction.command.qualified_name if interaction.command else "desconhecido"
+            stats.record("app_command", nome, time.perf_counter() - inicio)
 
 class WeProfit(commands.Bot):
-    def __init__(self):
-        """Initialize Discord bot with necessary settings"""
+    def __init__(self, headless: bool = False):
+        """
+        Initialize Discord bot with necessary settings
+        Com `headless`, o bot é usado apenas via REST (maintenance.py), sem gateway
+        """
+        self.headless = headless
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         intents.reactions = True
+        intents.presences = Config.PRESENCE_INTENT  # faixa "online" da ordem de envio
         
         super().__init__(
             command_prefix=Config.COMMAND_PREFIX,
             intents=intents,
-            help_command=None  # Usaremos nosso próprio comando de ajuda personalizado
+            help_command=None,  # Usaremos nosso próprio comando de ajuda personalizado
+            tree_cls=InstrumentedCommandTree,
+            enable_debug_events=Config.TRACE_ENABLED  # on_socket_raw_receive para o trace
         )
         
+        # Gravação opcional do tráfego (gateway + REST) para reprodução offline
+        self.trace = None
+        if Config.TRACE_ENABLED:
+            self.trace = TraceRecorder(Config.TRACE_DIR, Config.TRACE_MAX_MB * 1024 * 1024, Config.COMMAND_PREFIX)
+            register_metrics("trace", self.trace.stats)
+        
+        # Spans amostrados das etapas de convocações e auto-destruição
+        self.tracer = SpanTracer(
+            Config.SPAN_DIR,
+            sample_rate=Config.SPAN_SAMPLE_RATE,
+            max_bytes=Config.SPAN_FILE_MAX_MB * 1024 * 1024,
+            backups=Config.SPAN_FILE_BACKUPS,
+            export_interval=Config.SPAN_EXPORT_SECONDS
+        )
+        register_metrics("spans", self.tracer.stats)
+        
+        # Histogramas de latência por evento/comando/tarefa (None = desativado)
+        self.dispatch_stats = DispatchStats() if Config.INSTRUMENTATION_ENABLED else None
+        if self.dispatch_stats is not None:
+            register_metrics("dispatch", self.dispatch_stats.snapshot)
+        
+        # Vigilância de bloqueios do event loop
+        self.loop_monitor = None
+        if Config.LOOP_MONITOR_ENABLED:
+            self.loop_monitor = LoopLagMonitor(threshold=Config.LOOP_LAG_THRESHOLD_MS / 1000)
+            register_metrics("loop_lag", self.loop_monitor.stats)
+        
         # Armazenamento de mensagens de alerta para auto-destruição
         self.alert_messages = []
         
         # Rastreamento de mensagens por membro
         self.members_messaged = {}
         
+        # Indica que a varredura de auto-destruição está em execução
+        self._auto_destruicao_ativa = False
+        
+        # Segmento mmap lido por servidores web em outros processos (None = desativado)
+        self.shared_metrics = None
+        
+        # Cache negativo de membros com DM fechada (persistido em disco)
+        self.dm_block_cache = DMNegativeCache(
+            os.path.join(Config.DATA_DIR, "dm_blocked.json"),
+            Config.DM_BLOCK_TTL_HOURS * 3600
+        )
+        
+        # Fila de envio compartilhada, com prioridade por urgência
+        self.send_scheduler = SendScheduler(interval=Config.DM_SEND_INTERVAL)
+        
+        # Índice cargo -> membros para convocações direcionadas
+        self.role_index = RoleIndex()
+        
+        # Controle de admissão das convocações (token buckets + limite global)
+        self.admission = AdmissionController()
+        register_metrics("admission", self.admission.stats)
+        register_metrics("send_scheduler", self.send_scheduler.stats)
+        
+        # Confirmações de presença por reação (índice message_id -> convocação)
+        self.ack_tracker = AckTracker(emoji=Config.ACK_EMOJI, edit_interval=Config.ACK_EDIT_INTERVAL)
+        register_metrics("acks", self.ack_tracker.stats)
+        
+        # Convocações recentes por chave de idempotência (evita reenvios duplicados)
+        # Falhas (nenhum membro alcançado) não são reaproveitadas: a nova tentativa executa de novo
+        self.idempotency = IdempotencyRegistry(Config.IDEMPOTENCY_WINDOW_SECONDS,
+                                               reusable=lambda resultado: resultado[2] > 0)
+        register_metrics("idempotency", self.idempotency.stats)
+        
+        # Histórico persistente de convocações, entregas e presenças
+        self.history = HistoryStore(Config.HISTORY_DB)
+        register_metrics("history", self.history.stats)
+        
+        # Convocações agendadas (persistidas no histórico, com fan-out pré-aquecido)
+        self.agendamentos = ConvocationSchedule(
+            preparar=self._preparar_agendamento,
+            aquecer=self._aquecer_convocacao,
+            disparar=self._disparar_agendamento,
+            expirar=self._expirar_agendamento,
+            prewarm_seconds=Config.SCHEDULE_PREWARM_MINUTES * 60,
+            max_late_seconds=Config.SCHEDULE_MAX_LATE_MINUTES * 60
+        )
+        register_metrics("scheduled", self.agendamentos.stats)
+        
+        # Extensões do manifesto, carregadas sob demanda (não atrasam a conexão ao gateway)
+        self.extension_loader = ExtensionLoader(
+            self,
+            Config.EXTENSIONS_MANIFEST,
+            os.path.join(Config.DATA_DIR, "extension_failures.json")
+        )
+        register_metrics("extensions", self.extension_loader.stats)
+        
         # Adicionar comandos diretamente ao bot
         self.add_commands()
         
     async def setup_cogs(self):
-        """Carrega os cogs (módulos) do bot"""
-        logger.info("Carregando cogs...")
-        
-        # Lista de cogs para carregar
-        cogs = [
-            'cogs_new.commands',  # Comandos básicos
-            'cogs_new.events',    # Eventos do bot
-        ]
-        
-        for cog in cogs:
-            try:
-                await self.load_extension(cog)
-                logger.info(f"Cog carregado: {cog}")
-            except Exception as e:
-                logger.error(f"Erro ao carregar cog {cog}: {e}")
+        """
+        Lê o manifesto de cogs (módulos) do bot sem importá-los
+        Cada cog é carregado no primeiro uso de um de seus comandos (ver invoke)
+        ou em segundo plano após o on_ready
+        """
+        self.extension_loader.load_manifest()
                 
     def add_commands(self):
         """Adiciona comandos essenciais diretamente ao bot"""
@@ -86,27 +204,120 @@ class WeProfit(commands.Bot):
     
     async def setup_hook(self):
         """Hook executado na inicialização"""
+        if self.headless:
+            # Manutenção via REST: só o necessário para enviar e excluir DMs
+            self.dm_block_cache.load()
+            self._restaurar_ratelimits()
+            return
+        
         logger.info("Configurando hooks e tarefas...")
         
-        # Carregar cogs
+        # Medir o lag do event loop desde o início
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        
+        # Registrar as chamadas REST no trace
+        if self.trace is not None:
+            self._gravar_chamadas_rest()
+        
+        # Ler o manifesto de cogs (carregados depois, sob demanda)
         await self.setup_cogs()
         
+        # Carregar membros com DM fechada conhecidos
+        self.dm_block_cache.load()
+        
+        # Retomar auto-destruições pendentes registradas no histórico
+        await self._carregar_auto_destruicoes_pendentes()
+        
+        # Retomar convocações agendadas antes da reinicialização
+        await self._carregar_agendamentos()
+        
+        # Restaurar buckets de rate limit aprendidos antes da reinicialização
+        self._restaurar_ratelimits()
+        self.save_ratelimit_state.change_interval(minutes=Config.RATELIMIT_SNAPSHOT_MINUTES)
+        self.save_ratelimit_state.start()
+        
+        # Persistir estado antes de reinicializações do auto_restart (os.execl)
+        loop = asyncio.get_running_loop()
+        register_shutdown_hook(lambda: self._persistir_estado_threadsafe(loop))
+        
+        # Adiar reinícios automáticos enquanto houver convocações ou auto-destruições pendentes
+        register_activity_probe(self._atividade_em_andamento)
+        
+        # Publica o estado do bot para os endpoints de saúde
+        if Config.SHARED_METRICS_FILE:
+            try:
+                self.shared_metrics = SharedMetricsWriter(Config.SHARED_METRICS_FILE)
+                bot_state.attach_writer(self.shared_metrics)
+                logger.info(f"Segmento de métricas compartilhado em {Config.SHARED_METRICS_FILE}")
+            except OSError as e:
+                logger.error(f"Não foi possível criar o segmento de métricas compartilhado: {e}")
+        self.publish_state.change_interval(seconds=Config.HEALTH_PUBLISH_SECONDS)
+        self.publish_state.start()
+        
         # Inicia tarefa para verificar mensagens que devem ser auto-destruídas
+        self.check_scheduled_deletions.change_interval(minutes=Config.DELETION_CHECK_MINUTES)
         self.check_scheduled_deletions.start()
         
+        # Aplicar ajustes do arquivo de configuração em tempo de execução
+        add_config_listener(lambda alterados: loop.call_soon_threadsafe(self._aplicar_config, alterados))
+        start_config_watcher()
+        
         # Registra comandos slash
         @self.tree.command(name="convocar", description="Convoca membros do grupo via mensagem direta")
         @app_commands.describe(
             urgencia="Nível de urgência da convocação",
-            detalhes="Detalhes adicionais sobre a convocação"
+            detalhes="Detalhes adicionais sobre a convocação",
+            cargos="Cargos a convocar (@Cargo); use -@Cargo para excluir. Vazio = todos os membros",
+            irmaos="Convocar também os servidores irmãos (cada pessoa recebe uma única DM)"
         )
         @app_commands.choices(urgencia=[
             app_commands.Choice(name="Baixa - Informativo apenas", value="baixa"),
             app_commands.Choice(name="Média - Recomendado comparecer", value="média"),
             app_commands.Choice(name="Alta - Presença obrigatória", value="alta")
         ])
-        async def convocar_slash(interaction, urgencia: str, detalhes: Optional[str] = None):
-            await self.convocar_comando(interaction, urgencia, detalhes)
+        async def convocar_slash(interaction, urgencia: str, detalhes: Optional[str] = None,
+                                 cargos: Optional[str] = None, irmaos: bool = False):
+            await self.convocar_comando(interaction, urgencia, detalhes, cargos, irmaos)
+        
+        @self.tree.command(name="agendar", description="Agenda uma convocação para um horário futuro")
+        @app_commands.describe(
+            urgencia="Nível de urgência da convocação",
+            horario="Quando disparar: HH:MM, DD/MM HH:MM, DD/MM/AAAA HH:MM ou +90m",
+            detalhes="Detalhes adicionais sobre a convocação",
+            cargos="Cargos a convocar (@Cargo); use -@Cargo para excluir. Vazio = todos os membros",
+            irmaos="Convocar também os servidores irmãos (cada pessoa recebe uma única DM)"
+        )
+        @app_commands.choices(urgencia=[
+            app_commands.Choice(name="Baixa - Informativo apenas", value="baixa"),
+            app_commands.Choice(name="Média - Recomendado comparecer", value="média"),
+            app_commands.Choice(name="Alta - Presença obrigatória", value="alta")
+        ])
+        @app_commands.guild_only()
+        async def agendar_slash(interaction, urgencia: str, horario: str, detalhes: Optional[str] = None,
+                                cargos: Optional[str] = None, irmaos: bool = False):
+            await self.agendar_comando(interaction, urgencia, horario, detalhes, cargos, irmaos)
+        
+        @self.tree.command(name="agendamentos", description="Lista ou cancela as convocações agendadas do servidor")
+        @app_commands.describe(cancelar="ID do agendamento a cancelar")
+        @app_commands.guild_only()
+        async def agendamentos_slash(interaction, cancelar: Optional[str] = None):
+            await self.agendamentos_comando(interaction, cancelar)
+        
+        @self.tree.command(name="faltas", description="Lista quem não confirmou presença nas últimas convocações")
+        @app_commands.describe(
+            urgencia="Considerar apenas convocações desta urgência",
+            ultimas="Quantidade de convocações recentes analisadas"
+        )
+        @app_commands.choices(urgencia=[
+            app_commands.Choice(name="Baixa", value="baixa"),
+            app_commands.Choice(name="Média", value="média"),
+            app_commands.Choice(name="Alta", value="alta")
+        ])
+        @app_commands.guild_only()
+        async def faltas_slash(interaction, urgencia: Optional[str] = None,
+                               ultimas: app_commands.Range[int, 1, 100] = 5):
+            await self.faltas_comando(interaction, urgencia, ultimas)
         
         try:
             # Sincronizar os comandos slash
@@ -115,6 +326,59 @@ class WeProfit(commands.Bot):
         except Exception as e:
             logger.error(f"Erro ao sincronizar comandos slash: {e}")
     
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        """Executa um handler de evento, medindo sua duração se a instrumentação estiver ativa"""
+        if self.dispatch_stats is None:
+            return await super()._run_event(coro, event_name, *args, **kwargs)
+        
+        inicio = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.dispatch_stats.record("event", event_name, time.perf_counter() - inicio)
+    
+    async def invoke(self, ctx):
+        """Executa um comando de texto, medindo sua duração se a instrumentação estiver ativa"""
+        # Comando de um cog ainda não carregado: carrega e resolve o contexto de novo
+        if ctx.command is None and await self.extension_loader.load_for_command(ctx.invoked_with):
+            ctx = await self.get_context(ctx.message)
+        
+        if self.dispatch_stats is None or ctx.command is None:
+            return await super().invoke(ctx)
+        
+        inicio = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            self.dispatch_stats.record("command", ctx.command.qualified_name, time.perf_counter() - inicio)
+    
+    async def on_socket_raw_receive(self, msg):
+        """Mensagem bruta do gateway (só despachada com TRACE_ENABLED)"""
+        if self.trace is not None:
+            self.trace.record_gateway(msg)
+    
+    def _gravar_chamadas_rest(self):
+        """Envolve HTTPClient.request para registrar cada chamada REST no trace"""
+        original = self.http.request
+        trace = self.trace
+        
+        async def request(route, **kwargs):
+            inicio = time.perf_counter()
+            status = 200
+            try:
+                return await original(route, **kwargs)
+            except discord.HTTPException as e:
+                status = e.status
+                raise
+            except Exception:
+                status = 0
+                raise
+            finally:
+                # route.path é o modelo da rota (ex.: /channels/{channel_id}/messages), sem IDs
+                trace.record_rest(route.method, route.path, inicio, time.perf_counter() - inicio, status)
+        
+        self.http.request = request
+    
     async def on_ready(self):
         """Evento chamado quando o bot estiver pronto"""
         logger.info(f"Bot conectado como {self.user} (ID: {self.user.id})")
@@ -139,11 +403,66 @@ class WeProfit(commands.Bot):
             logger.info(f"Bot conectado a {len(self.guilds)} servidor(es):")
             for guild in self.guilds:
                 logger.info(f"  • {guild.name} (ID: {guild.id}) - {len(guild.members)} membros")
+                self.role_index.build_guild(guild)
         else:
             logger.warning("Bot não está conectado a nenhum servidor")
         
         # Verificar comandos carregados
         logger.info(f"Comandos carregados: {len(self.commands)}")
+        
+        # Demais cogs do manifesto, sem atrasar a conexão
+        if Config.EXTENSIONS_BACKGROUND_LOAD:
+            self.extension_loader.start_background()
+        
+        self._publicar_estado()
+    
+    async def on_resumed(self):
+        self._publicar_estado()
+    
+    async def on_disconnect(self):
+        self._publicar_estado()
+    
+    async def on_guild_join(self, guild):
+        """Monta o índice de cargos de um novo servidor"""
+        self.role_index.build_guild(guild)
+    
+    async def on_guild_remove(self, guild):
+        self.role_index.remove_guild(guild.id)
+    
+    async def on_member_join(self, member):
+        self.role_index.add_member(member)
+    
+    async def on_raw_member_remove(self, payload):
+        self.role_index.remove_member(payload.guild_id, payload.user.id)
+    
+    async def on_member_update(self, before, after):
+        """Mantém o índice de cargos atualizado a partir das mudanças de cargo"""
+        self.role_index.update_member(before, after)
+    
+    async def on_guild_role_delete(self, role):
+        self.role_index.remove_role(role.guild.id, role.id)
+    
+    async def on_raw_reaction_add(self, payload):
+        """Confirmação de presença: reação na DM da convocação ou na publicação do modo resumo"""
+        if payload.user_id != self.user.id:
+            self._registrar_confirmacao(payload, added=True)
+    
+    async def on_raw_reaction_remove(self, payload):
+        if payload.user_id != self.user.id:
+            self._registrar_confirmacao(payload, added=False)
+    
+    def _registrar_confirmacao(self, payload, added):
+        """Atualiza a contagem ao vivo e o histórico com uma reação de confirmação"""
+        if str(payload.emoji) != Config.ACK_EMOJI:
+            return
+        conv = self.ack_tracker.handle_reaction(payload, added=added)
+        if conv is not None:
+            # Pela convocação: no modo resumo o membro pode reagir a uma publicação que
+            # não é a que o mencionou (ex.: a primeira, com o embed)
+            self.history.record_convocation_ack(conv.id, payload.user_id, added)
+        elif payload.guild_id is None:
+            # DMs enviadas antes de uma reinicialização (fora do índice em memória)
+            self.history.record_ack(payload.message_id, payload.user_id, added)
     
     async def convocar_comando_texto(self, ctx, urgencia: str, *, detalhes: Optional[str] = None):
         """Versão de texto do comando convocar"""
@@ -159,35 +478,196 @@ class WeProfit(commands.Bot):
         # Converte 'media' para 'média' para padronizar
         if urgencia == "media":
             urgencia = "média"
+        
+        # "+irmaos" no início dos detalhes inclui os servidores irmãos
+        irmaos = False
+        if detalhes and detalhes.split(maxsplit=1)[0].lower() in ("+irmaos", "+irmãos"):
+            irmaos = True
+            detalhes = detalhes.split(maxsplit=1)[1] if len(detalhes.split(maxsplit=1)) > 1 else None
+        
+        # Menções de cargo no início dos detalhes definem o público (-@Cargo exclui)
+        incluir, excluir, detalhes = parse_role_tokens(detalhes)
+        
+        # Reutiliza uma convocação idêntica recente ou inicia uma nova (com controle de admissão)
+        tarefa, reutilizada, recusa = self._iniciar_convocacao(ctx.guild, ctx.author, urgencia, detalhes,
+                                                              incluir, excluir, irmaos)
+        if recusa:
+            await ctx.send(recusa)
+            return
             
         # Cria resposta temporária
-        response = await ctx.send("⏳ Enviando convocação para todos os membros...")
+        response = await ctx.send(self._mensagem_inicial_convocacao(reutilizada))
         
-        # Chama a função principal de convocação
-        resultado = await self._enviar_convocacao(ctx.guild, urgencia, detalhes, ctx.author)
+        # Aguarda o resultado (shield: cancelar este comando não interrompe o envio compartilhado)
+        resultado, convocacao_id, _ = await asyncio.shield(tarefa)
         
-        # Atualiza a mensagem com o resultado
-        await response.edit(content=resultado)
+        # Atualiza a mensagem com o resultado (e acompanha as presenças nela)
+        conteudo = self.ack_tracker.set_result(convocacao_id, resultado)
+        if reutilizada:
+            await response.edit(content=f"♻️ Convocação idêntica recente reutilizada (nada foi reenviado).\n{conteudo}")
+        else:
+            await response.edit(content=conteudo)
+            self.ack_tracker.attach_message(convocacao_id, response)
     
-    async def convocar_comando(self, interaction: discord.Interaction, urgencia: str, detalhes: Optional[str] = None):
-        """Envia um alerta de combate em mensagem privada para todos os membros do servidor"""
-        await interaction.response.defer()
+    def _cargos_alvo(self, cargos):
+        """
+        Interpreta a opção `cargos` dos comandos de barra
         
+        Returns:
+            tuple: (ids incluídos, ids excluídos, mensagem de erro ou None)
+        """
+        incluir, excluir, restante = parse_role_tokens(cargos)
+        # Texto não reconhecido convocaria o servidor inteiro: recusa em vez de ignorar
+        if restante or (cargos and cargos.strip() and not incluir and not excluir):
+            invalido = (restante or cargos).split()[0]
+            return incluir, excluir, (f"❌ Cargo inválido: `{invalido}`. Use menções de cargo ou IDs "
+                                      f"(-@Cargo exclui).")
+        return incluir, excluir, None
+    
+    async def convocar_comando(self, interaction: discord.Interaction, urgencia: str, detalhes: Optional[str] = None,
+                               cargos: Optional[str] = None, irmaos: bool = False):
+        """Envia um alerta de combate em mensagem privada para os membros do servidor (ou dos cargos escolhidos)"""
         # Obter o servidor e o autor
         guild = interaction.guild
         autor = interaction.user
         
-        # Chama a função principal de convocação
-        resultado = await self._enviar_convocacao(guild, urgencia, detalhes, autor)
+        # Cargos alvo (menções ou IDs; -@Cargo exclui)
+        incluir, excluir, erro = self._cargos_alvo(cargos)
+        if erro:
+            await interaction.response.send_message(erro, ephemeral=True)
+            return
+        
+        # Reutiliza uma convocação idêntica recente ou inicia uma nova (com controle de admissão)
+        tarefa, reutilizada, recusa = self._iniciar_convocacao(guild, autor, urgencia, detalhes,
+                                                              incluir, excluir, irmaos)
+        if recusa:
+            await interaction.response.send_message(recusa, ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        if reutilizada or self.admission.saturated():
+            await interaction.followup.send(self._mensagem_inicial_convocacao(reutilizada), ephemeral=True)
+        
+        # Aguarda o resultado (shield: cancelar este comando não interrompe o envio compartilhado)
+        resultado, convocacao_id, _ = await asyncio.shield(tarefa)
+        
+        # Responde com o resultado (e acompanha as presenças nele)
+        conteudo = self.ack_tracker.set_result(convocacao_id, resultado)
+        if reutilizada:
+            await interaction.followup.send(
+                f"♻️ Convocação idêntica recente reutilizada (nada foi reenviado).\n{conteudo}")
+        else:
+            mensagem = await interaction.followup.send(conteudo, wait=True)
+            self.ack_tracker.attach_message(convocacao_id, mensagem)
+    
+    def _iniciar_convocacao(self, guild, autor, urgencia, detalhes, incluir, excluir, irmaos):
+        """
+        Associa o pedido a uma convocação idêntica dentro da janela de idempotência
+        ou, se não houver, aplica o controle de admissão e inicia uma nova
+        
+        Returns:
+            tuple: (tarefa da convocação, se foi reutilizada, mensagem de recusa ou None)
+        """
+        chave = make_key(guild.id if guild else None, autor.id, urgencia, detalhes,
+                         frozenset(incluir), frozenset(excluir), irmaos)
+        tarefa = self.idempotency.get(chave)
+        if tarefa is not None:
+            logger.info(f"Convocação duplicada de {autor} associada à execução existente ({chave[:8]})")
+            return tarefa, True, None
+        
+        recusa = self._admitir_convocacao(guild, autor)
+        if recusa:
+            return None, False, recusa
         
-        # Responde com o resultado
-        await interaction.followup.send(resultado)
+        coro = self._enviar_convocacao(guild, urgencia, detalhes, autor, incluir, excluir, irmaos)
+        return self.idempotency.start(chave, coro), False, None
     
-    async def _enviar_convocacao(self, guild, urgencia: str, detalhes: Optional[str], autor):
-        """Função interna para enviar convocações para todos os membros"""
+    async def faltas_comando(self, interaction: discord.Interaction, urgencia: Optional[str], ultimas: int):
+        """Mostra os membros que não confirmaram presença nas últimas convocações do servidor"""
+        await interaction.response.defer(ephemeral=True)
+        
+        pagina = await asyncio.to_thread(self.history.missed, interaction.guild_id, urgencia, ultimas, 50)
+        if not pagina["items"]:
+            await interaction.followup.send("✅ Ninguém faltou nas convocações analisadas.", ephemeral=True)
+            return
+        
+        filtro = f" de urgência **{urgencia}**" if urgencia else ""
+        linhas = [f"📋 Ausências nas últimas **{ultimas}** convocações{filtro}:"]
+        for item in pagina["items"]:
+            linha = f"• <@{item['user_id']}> — faltou {item['faltas']} de {item['convocado']}"
+            if sum(len(l) + 1 for l in linhas) + len(linha) > 1900:
+                linhas.append("… (lista completa em /api/history/missed)")
+                break
+            linhas.append(linha)
+        
+        await interaction.followup.send("\n".join(linhas), ephemeral=True,
+                                        allowed_mentions=discord.AllowedMentions.none())
+    
+    async def _enviar_convocacao(self, guild, urgencia: str, detalhes: Optional[str], autor,
+                                 incluir: Optional[set] = None, excluir: Optional[set] = None,
+                                 irmaos: bool = False):
+        """
+        Função interna para enviar convocações
+        Sem cargos em `incluir`, todos os membros são convocados; membros de cargos
+        em `excluir` são sempre removidos. Com `irmaos`, os servidores de
+        Config.SISTER_GUILD_IDS também são convocados e cada pessoa recebe uma única DM
+        
+        Returns:
+            tuple: (texto do resultado, ID da convocação ou None se nada foi enviado, membros alcançados)
+        """
+        with self.tracer.trace("convocacao", urgencia=urgencia):
+            with span("resolver_destinatarios") as etapa:
+                preparo = self._preparar_convocacao(guild, urgencia, detalhes, autor, incluir, excluir, irmaos)
+                if not isinstance(preparo, str):
+                    etapa.set(destinatarios=len(preparo["destinatarios"]))
+            if isinstance(preparo, str):
+                return preparo, None, 0
+            return await self._disparar_convocacao(guild, urgencia, detalhes, autor, preparo)
+    
+    def _preparar_convocacao(self, guild, urgencia, detalhes, autor, incluir=None, excluir=None,
+                             irmaos=False, enviado_em=None):
+        """
+        Resolve os destinatários e monta o embed da convocação, sem enviar nada
+        
+        Returns:
+            dict com servidores, destinatarios, duplicados, cargos (incluídos/excluídos por servidor),
+            embed, tempo_destruicao e canais (canais de DM já abertos), ou o texto do erro
+        """
         if not guild:
             return "❌ Este comando deve ser usado em um servidor."
+        
+        # Servidores alvo: o de origem primeiro (tem prioridade na deduplicação)
+        servidores = self._servidores_alvo(guild, autor, irmaos)
+        
+        # Resolver destinatários pelo índice de cargos (operações de conjunto)
+        alvos = []
+        for servidor in servidores:
+            if not self.role_index.has_guild(servidor.id):
+                self.role_index.build_guild(servidor)
+            incluir_servidor = self._traduzir_cargos(guild, servidor, incluir)
+            if incluir and not incluir_servidor:
+                # Nenhum dos cargos existe neste servidor: ninguém a convocar nele
+                continue
+            alvos.append((servidor.id, incluir_servidor, self._traduzir_cargos(guild, servidor, excluir)))
+        destinatarios, duplicados = self.role_index.resolve_union(alvos)
+        destinatarios.pop(autor.id, None)
+        if not destinatarios:
+            return "❌ Nenhum membro corresponde aos cargos informados."
             
+        embed, tempo_destruicao = self._montar_embed(urgencia, detalhes, autor, enviado_em)
+        
+        return {
+            "servidores": servidores,
+            "destinatarios": destinatarios,
+            "duplicados": duplicados,
+            "cargos": {servidor_id: (inc, exc) for servidor_id, inc, exc in alvos},
+            "embed": embed,
+            "tempo_destruicao": tempo_destruicao,
+            "canais": {}
+        }
+    
+    def _montar_embed(self, urgencia, detalhes, autor, enviado_em=None):
+        """Embed da DM de convocação e o tempo de auto-destruição (horas) da urgência"""
         # Mapear urgência para cores
         cores = {
             "baixa": Config.COLORS["info"],     # Azul
@@ -195,12 +675,8 @@ class WeProfit(commands.Bot):
             "alta": Config.COLORS["error"]      # Vermelho
         }
         
-        # Tempo de auto-destruição baseado na urgência
-        tempos_destruicao = {
-            "baixa": 24,    # 24 horas
-            "média": 6,     # 6 horas
-            "alta": 2       # 2 horas
-        }
+        # Tempo de auto-destruição baseado na urgência (recarregável)
+        tempos_destruicao = Config.SELF_DESTRUCT_HOURS
         
         # Verificar se é urgência média ou alta (formato original)
         if urgencia.lower() in ["media", "média"]:
@@ -229,66 +705,757 @@ class WeProfit(commands.Bot):
         tempo_destruicao = tempos_destruicao[urgencia]
         embed.add_field(
             name="Auto-Destruição",
-            value=f"⏱️ Esta mensagem se auto-destruirá em **{tempo_destruicao} horas**",
+            value=f"⏱️ Esta mensagem se auto-destruirá em **{tempo_destruicao:g} horas**",
+            inline=False
+        )
+        
+        # Instrução para confirmar presença
+        embed.add_field(
+            name="Confirmação",
+            value=f"Reaja com {Config.ACK_EMOJI} nesta mensagem para confirmar presença",
             inline=False
         )
         
         # Adicionar rodapé com informações do autor
-        embed.set_footer(text=f"Enviado por {autor.name} • {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        momento = (enviado_em or datetime.now()).strftime('%d/%m/%Y %H:%M')
+        embed.set_footer(text=f"Enviado por {autor.name} • {momento}")
         
-        # Enviar para todos os membros
-        enviadas = 0
-        falhas = 0
+        return embed, tempo_destruicao
+    
+    async def _disparar_convocacao(self, guild, urgencia, detalhes, autor, preparo):
+        """Envia uma convocação preparada e retorna (texto do resultado, ID da convocação, membros alcançados)"""
+        servidores = preparo["servidores"]
+        duplicados = preparo["duplicados"]
+        
+        # Aguarda vaga no limite global de convocações simultâneas
+        convocacao_id = uuid.uuid4().hex[:12]
+        annotate(id=convocacao_id)
+        self.ack_tracker.start(convocacao_id)
+        self.history.record_convocation(convocacao_id, guild.id, autor.id, urgencia, detalhes)
+        with span("ordenar_destinatarios"):
+            destinatarios = await self._ordenar_destinatarios(preparo["destinatarios"], convocacao_id)
+        
+        # Modo resumo: servidores com canal configurado recebem uma publicação com menções
+        canais_resumo = self._canais_resumo(urgencia)
+        resumo = {}
+        if canais_resumo:
+            destinatarios, resumo = await self._separar_resumo(destinatarios, canais_resumo)
+        
+        async with contextlib.AsyncExitStack() as pilha:
+            with span("aguardar_vaga"):
+                await pilha.enter_async_context(self.admission.fanout_slot())
+            publicado = None
+            if resumo:
+                publicado = await self._publicar_resumo(resumo, canais_resumo, preparo, convocacao_id,
+                                                        set(destinatarios.values()))
+            stats = await self._enviar_para_destinatarios(urgencia, preparo["embed"], destinatarios,
+                                                          preparo["tempo_destruicao"], convocacao_id,
+                                                          preparo["canais"])
+        if publicado is not None:
+            stats["enviadas"] += publicado["mencionados"]
+            stats["falhas"] += publicado["falhas"]
+            stats["por_servidor"].update(publicado["por_servidor"])
+        self.history.finish_convocation(convocacao_id, stats["enviadas"], stats["falhas"], stats["dm_fechada"])
         
-        for membro in guild.members:
-            # Pular bots e o próprio autor
-            if membro.bot or membro == autor:
+        # Resultado final
+        if stats["enviadas"] == 0:
+            return ("❌ Não foi possível enviar mensagens para nenhum membro. "
+                    "Certifique-se de que o bot tem permissões adequadas."), convocacao_id, 0
+        
+        resultado = (f"✅ Convocação enviada para **{stats['enviadas']}** membros! ({stats['falhas']} falhas, "
+                     f"{stats['dm_fechada']} ignorados por DM fechada)")
+        if publicado is not None and publicado["mensagens"]:
+            resultado += (f"\n📣 {publicado['mencionados']} mencionados em {publicado['mensagens']} "
+                          f"mensagens no canal de resumo, sem DM")
+        if len(servidores) > 1:
+            linhas = [
+                f"• **{servidor.name}**: {stats['por_servidor'][servidor.id]} entregues, "
+                f"{duplicados.get(servidor.id, 0)} duplicados evitados"
+                for servidor in servidores
+            ]
+            resultado += "\n" + "\n".join(linhas)
+        return resultado, convocacao_id, stats["enviadas"]
+    
+    def _canais_resumo(self, urgencia):
+        """Canais de resumo utilizáveis ({guild_id: canal}) se a urgência usa o modo resumo"""
+        if urgencia not in Config.DIGEST_URGENCIES:
+            return {}
+        canais = {}
+        for guild_id, channel_id in Config.DIGEST_CHANNELS.items():
+            canal = self.get_channel(channel_id)
+            if canal is None or getattr(canal, "guild", None) is None or canal.guild.id != guild_id:
+                logger.warning(f"Canal de resumo {channel_id} não encontrado no servidor {guild_id}; usando DMs",
+                               extra={"aggregate": "canais de resumo indisponíveis"})
                 continue
-                
+            if not canal.permissions_for(canal.guild.me).send_messages:
+                logger.warning(f"Sem permissão para publicar no canal de resumo #{canal}; usando DMs",
+                               extra={"aggregate": "canais de resumo indisponíveis"})
+                continue
+            canais[guild_id] = canal
+        return canais
+    
+    async def _separar_resumo(self, destinatarios, canais_resumo):
+        """Separa quem é mencionado no canal de resumo de quem continua recebendo DM"""
+        # Quem não vê o canal não é notificado pela menção: continua recebendo DM
+        sem_acesso = set()
+        for member_id, guild_id in destinatarios.items():
+            canal = canais_resumo.get(guild_id)
+            if canal is None:
+                continue
+            membro = canal.guild.get_member(member_id)
+            if membro is None or not canal.permissions_for(membro).view_channel:
+                sem_acesso.add(member_id)
+        
+        dm_ok = set()
+        if Config.DIGEST_DM_WINDOW_DAYS > 0:
+            candidatos = [member_id for member_id, guild_id in destinatarios.items()
+                          if guild_id in canais_resumo and member_id not in sem_acesso
+                          and not self.dm_block_cache.is_blocked(member_id)]
+            desde = time.time() - Config.DIGEST_DM_WINDOW_DAYS * 86400
             try:
-                # Enviar mensagem para o membro
-                dm_channel = await membro.create_dm()
-                mensagem = await dm_channel.send(embed=embed)
+                dm_ok = await asyncio.to_thread(self.history.delivered_since, candidatos, desde)
+            except Exception as e:
+                logger.warning(f"Histórico indisponível para selecionar DMs do modo resumo: {e}")
+        return split_recipients(destinatarios, canais_resumo, dm_ok | sem_acesso)
+    
+    def _cargos_resumo(self, canal, cargos, parcial):
+        """
+        Cargos a mencionar no lugar dos membros, ou None para mencionar membro a membro
+        Só quando a menção ao cargo atinge exatamente os convocados: cargos incluídos sem
+        exclusões, nenhum membro do servidor atendido por DM (`parcial`, o que inclui quem não
+        vê o canal) e permissão para mencioná-los
+        """
+        if not cargos or not cargos[0] or cargos[1] or parcial:
+            return None
+        roles = [canal.guild.get_role(role_id) for role_id in cargos[0]]
+        if any(role is None for role in roles):
+            return None
+        if not canal.permissions_for(canal.guild.me).mention_everyone and not all(r.mentionable for r in roles):
+            return None
+        return roles
+    
+    async def _publicar_resumo(self, resumo, canais_resumo, preparo, convocacao_id, servidores_com_dm):
+        """
+        Publica a convocação uma vez no canal de resumo de cada servidor, mencionando os
+        destinatários por cargo ou em blocos de menções abaixo do limite de tamanho
+        Cada mensagem publicada tem uma única auto-destruição
+        
+        Returns:
+            dict: contadores (mencionados, falhas, mensagens, por_servidor)
+        """
+        delete_at = datetime.now() + timedelta(hours=preparo["tempo_destruicao"])
+        mencionados = 0
+        falhas = 0
+        mensagens = 0
+        por_servidor = Counter()
+        # Com irmãos, membros deduplicados em outro servidor também seriam alcançados pelo cargo
+        varios_servidores = len(preparo["servidores"]) > 1
+        
+        for guild_id, membros in resumo.items():
+            canal = canais_resumo[guild_id]
+            parcial = varios_servidores or guild_id in servidores_com_dm
+            cargos = self._cargos_resumo(canal, preparo["cargos"].get(guild_id), parcial)
+            if cargos:
+                blocos = [(" ".join(role.mention for role in cargos), membros)]
+                mencoes = discord.AllowedMentions(everyone=False, users=False, roles=cargos)
+            else:
+                blocos = mention_chunks(membros)
+                mencoes = discord.AllowedMentions(everyone=False, users=True, roles=False)
+            
+            publicadas = []
+            alcancados = []
+            for indice, (conteudo, ids) in enumerate(blocos):
+                try:
+                    with span("publicar_resumo"):
+                        mensagem = await canal.send(conteudo, embed=preparo["embed"] if indice == 0 else None,
+                                                    allowed_mentions=mencoes)
+                except discord.HTTPException as e:
+                    logger.error(f"Erro ao publicar convocação no canal de resumo #{canal}: {e}")
+                    for member_id in (m for _, bloco in blocos[indice:] for m in bloco):
+                        self.history.record_recipient(convocacao_id, member_id, guild_id, "failed")
+                        falhas += 1
+                    break
                 
-                # Salvar a mensagem para auto-destruição
+                publicadas.append(mensagem.id)
+                alcancados.extend(ids)
                 self.alert_messages.append({
                     'message_id': mensagem.id,
-                    'channel_id': dm_channel.id,
-                    'delete_at': datetime.now() + timedelta(hours=tempo_destruicao)
+                    'channel_id': canal.id,
+                    'delete_at': delete_at
                 })
+                for member_id in ids:
+                    self.history.record_recipient(convocacao_id, member_id, guild_id, "mentioned",
+                                                  mensagem.id, canal.id, delete_at.timestamp())
+            
+            self.ack_tracker.register_digest(convocacao_id, publicadas, alcancados)
+            mensagens += len(publicadas)
+            mencionados += len(alcancados)
+            por_servidor[guild_id] += len(alcancados)
+        
+        return {
+            "mencionados": mencionados,
+            "falhas": falhas,
+            "mensagens": mensagens,
+            "por_servidor": por_servidor
+        }
+    
+    async def _ordenar_destinatarios(self, destinatarios, convocacao_id):
+        """Coloca primeiro quem tem mais chance de agir (Config.RECIPIENT_ORDER)"""
+        faixas = Config.RECIPIENT_ORDER
+        if not faixas:
+            return destinatarios
+        
+        # Presença só é conhecida com o intent privilegiado; sem ele todos aparecem offline
+        status = {}
+        if "online" in faixas and self.intents.presences:
+            for member_id, guild_id in destinatarios.items():
+                servidor = self.get_guild(guild_id)
+                membro = servidor.get_member(member_id) if servidor else None
+                if membro is not None and membro.status is not discord.Status.offline:
+                    status[member_id] = str(membro.status)
+        
+        responders = {}
+        if "responders" in faixas:
+            desde = time.time() - Config.RESPONDER_WINDOW_DAYS * 86400
+            try:
+                responders = await asyncio.to_thread(self.history.recent_responders, desde)
+            except Exception as e:
+                logger.warning(f"Histórico indisponível para ordenar destinatários: {e}")
+        
+        ordenados, contagem = order_recipients(destinatarios, faixas, status, responders)
+        logger.info(f"Convocação {convocacao_id}: ordem de envio com {contagem['online']} online, "
+                    f"{contagem['responders']} que confirmaram recentemente e {contagem['rest']} demais")
+        return ordenados
+    
+    async def agendar_comando(self, interaction: discord.Interaction, urgencia: str, horario: str,
+                              detalhes: Optional[str] = None, cargos: Optional[str] = None, irmaos: bool = False):
+        """Agenda uma convocação; destinatários e DMs são preparados minutos antes do horário"""
+        agora = datetime.now(self._fuso_agendamento())
+        try:
+            quando = parse_fire_time(horario, agora)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ Horário inválido: {e}", ephemeral=True)
+            return
+        if quando <= agora:
+            await interaction.response.send_message("❌ Esse horário já passou.", ephemeral=True)
+            return
+        if quando - agora > timedelta(days=30):
+            await interaction.response.send_message("❌ Agende com no máximo 30 dias de antecedência.",
+                                                    ephemeral=True)
+            return
+        
+        incluir, excluir, erro = self._cargos_alvo(cargos)
+        if erro:
+            await interaction.response.send_message(erro, ephemeral=True)
+            return
+        
+        recusa = self._admitir_convocacao(interaction.guild, interaction.user)
+        if recusa:
+            await interaction.response.send_message(recusa, ephemeral=True)
+            return
+        
+        item = {
+            "id": uuid.uuid4().hex[:8],
+            "guild_id": interaction.guild_id,
+            "channel_id": interaction.channel_id,
+            "author_id": interaction.user.id,
+            "urgencia": urgencia,
+            "detalhes": detalhes,
+            "incluir": incluir,
+            "excluir": excluir,
+            "irmaos": irmaos,
+            "fire_at": quando.timestamp(),
+            "created_at": time.time()
+        }
+        self.history.record_scheduled(item)
+        self.agendamentos.add(item)
+        
+        ts = int(item["fire_at"])
+        logger.info(f"Convocação {urgencia} agendada por {interaction.user} para {quando.isoformat()} ({item['id']})")
+        await interaction.response.send_message(
+            f"🗓️ Convocação **{urgencia}** agendada para <t:{ts}:F> (<t:{ts}:R>). "
+            f"ID: `{item['id']}` — use `/agendamentos cancelar:{item['id']}` para cancelar."
+        )
+    
+    async def agendamentos_comando(self, interaction: discord.Interaction, cancelar: Optional[str] = None):
+        """Lista as convocações agendadas do servidor ou cancela uma delas"""
+        if cancelar:
+            item = next((i for i in self.agendamentos.pending(interaction.guild_id) if i["id"] == cancelar.strip()),
+                        None)
+            if item is None:
+                await interaction.response.send_message("❌ Agendamento não encontrado ou já disparado.",
+                                                        ephemeral=True)
+                return
+            if item["author_id"] != interaction.user.id and not interaction.user.guild_permissions.manage_guild:
+                await interaction.response.send_message("❌ Apenas o autor ou a moderação pode cancelar.",
+                                                        ephemeral=True)
+                return
+            if self.agendamentos.cancel(item["id"]) is None:
+                await interaction.response.send_message("❌ Esse agendamento já está sendo disparado.",
+                                                        ephemeral=True)
+                return
+            self.history.set_scheduled_status(item["id"], "cancelled")
+            logger.info(f"Agendamento {item['id']} cancelado por {interaction.user}")
+            await interaction.response.send_message(f"🗑️ Agendamento `{item['id']}` cancelado.")
+            return
+        
+        pendentes = self.agendamentos.pending(interaction.guild_id)
+        if not pendentes:
+            await interaction.response.send_message("📭 Nenhuma convocação agendada.", ephemeral=True)
+            return
+        
+        linhas = ["🗓️ Convocações agendadas:"]
+        for item in pendentes[:20]:
+            linhas.append(f"• `{item['id']}` — **{item['urgencia']}** <t:{int(item['fire_at'])}:F>, "
+                          f"por <@{item['author_id']}>")
+        await interaction.response.send_message("\n".join(linhas), ephemeral=True,
+                                                allowed_mentions=discord.AllowedMentions.none())
+    
+    def _fuso_agendamento(self):
+        """Fuso horário dos horários informados em /agendar"""
+        try:
+            return ZoneInfo(Config.SCHEDULE_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Fuso horário desconhecido: {Config.SCHEDULE_TIMEZONE}; usando o do sistema")
+            return datetime.now().astimezone().tzinfo
+    
+    async def _carregar_agendamentos(self):
+        """Retoma do histórico as convocações agendadas ainda não disparadas"""
+        try:
+            pendentes = await asyncio.to_thread(self.history.pending_scheduled)
+        except Exception as e:
+            logger.error(f"Não foi possível carregar convocações agendadas: {e}")
+            return
+        for item in pendentes:
+            self.agendamentos.add(item)
+        if pendentes:
+            logger.info(f"{len(pendentes)} convocações agendadas retomadas do histórico")
+    
+    def _participantes_agendamento(self, item):
+        """Servidor e autor de um agendamento (None se não estiverem mais disponíveis)"""
+        guild = self.get_guild(item["guild_id"])
+        autor = guild.get_member(item["author_id"]) if guild else None
+        return guild, autor
+    
+    async def _preparar_agendamento(self, item):
+        """Resolve destinatários e monta o embed alguns minutos antes do horário"""
+        await self.wait_until_ready()
+        guild, autor = self._participantes_agendamento(item)
+        if autor is None:
+            return None
+        
+        preparo = self._preparar_convocacao(guild, item["urgencia"], item["detalhes"], autor,
+                                            item["incluir"], item["excluir"], item["irmaos"],
+                                            enviado_em=datetime.fromtimestamp(item["fire_at"], self._fuso_agendamento()))
+        if isinstance(preparo, str):
+            item["erro"] = preparo
+            return None
+        logger.info(f"Agendamento {item['id']}: {len(preparo['destinatarios'])} destinatários resolvidos")
+        return preparo
+    
+    async def _aquecer_convocacao(self, item, preparo):
+        """
+        Abre antecipadamente os canais de DM dos destinatários, com prioridade mínima
+        na fila de envio (pausa enquanto houver convocações em andamento)
+        """
+        canais = preparo["canais"]
+        # Servidores em modo resumo não recebem DMs em massa: nada a aquecer
+        resumo = self._canais_resumo(item["urgencia"])
+        for member_id, guild_id in list(preparo["destinatarios"].items()):
+            if member_id in canais or guild_id in resumo or self.dm_block_cache.is_blocked(member_id):
+                continue
+            servidor = self.get_guild(guild_id)
+            membro = servidor.get_member(member_id) if servidor else None
+            if membro is None:
+                continue
+            
+            canal = membro.dm_channel
+            if canal is None:
+                await self.send_scheduler.acquire("aquecimento")
+                try:
+                    canal = await membro.create_dm()
+                except discord.HTTPException as e:
+                    logger.warning(f"Erro ao abrir DM com {membro}: {e}",
+                                   extra={"aggregate": "falhas ao pré-abrir DMs"})
+                    continue
+            canais[member_id] = canal
+        
+        logger.info(f"Agendamento {item['id']}: {len(canais)} canais de DM prontos")
+    
+    async def _disparar_agendamento(self, item, preparo):
+        """Dispara uma convocação agendada e publica o resultado no canal onde foi agendada"""
+        await self.wait_until_ready()
+        guild, autor = self._participantes_agendamento(item)
+        if autor is None:
+            logger.warning(f"Agendamento {item['id']} descartado: servidor ou autor indisponível")
+            self.history.set_scheduled_status(item["id"], "failed")
+            return
+        
+        if preparo is not None:
+            with self.tracer.trace("convocacao_agendada", urgencia=item["urgencia"], agendamento=item["id"]):
+                resultado, convocacao_id, _ = await self._disparar_convocacao(guild, item["urgencia"],
+                                                                              item["detalhes"], autor, preparo)
+        elif item.get("erro"):
+            resultado, convocacao_id = item["erro"], None
+        else:
+            # Sem preparação prévia (ex.: bot iniciou depois do horário): prepara e envia agora
+            resultado, convocacao_id, _ = await self._enviar_convocacao(guild, item["urgencia"], item["detalhes"],
+                                                                        autor, item["incluir"], item["excluir"],
+                                                                        item["irmaos"])
+        self.history.set_scheduled_status(item["id"], "fired" if convocacao_id else "failed", convocacao_id)
+        
+        canal = self.get_channel(item["channel_id"]) if item["channel_id"] else None
+        if canal is None:
+            return
+        conteudo = self.ack_tracker.set_result(
+            convocacao_id, f"⏰ Convocação agendada por <@{autor.id}> (`{item['id']}`)\n{resultado}")
+        try:
+            mensagem = await canal.send(conteudo, allowed_mentions=discord.AllowedMentions.none())
+            self.ack_tracker.attach_message(convocacao_id, mensagem)
+        except discord.HTTPException as e:
+            logger.warning(f"Não foi possível publicar o resultado do agendamento {item['id']}: {e}")
+    
+    async def _expirar_agendamento(self, item):
+        """Descarta um agendamento cujo horário passou há muito tempo (ex.: bot fora do ar)"""
+        logger.warning(f"Agendamento {item['id']} expirado: horário "
+                       f"{datetime.fromtimestamp(item['fire_at']).strftime('%d/%m/%Y %H:%M')} perdido")
+        self.history.set_scheduled_status(item["id"], "expired")
+        await self.wait_until_ready()
+        canal = self.get_channel(item["channel_id"]) if item["channel_id"] else None
+        if canal is not None:
+            try:
+                await canal.send(f"⚠️ A convocação agendada `{item['id']}` para <t:{int(item['fire_at'])}:F> "
+                                 f"não foi enviada: o bot estava indisponível no horário.")
+            except discord.HTTPException:
+                pass
+    
+    def _servidores_alvo(self, guild, autor, irmaos):
+        """Servidor de origem seguido dos irmãos em que o bot e o autor estão presentes"""
+        servidores = [guild]
+        if not irmaos:
+            return servidores
+        for guild_id in Config.SISTER_GUILD_IDS:
+            irmao = self.get_guild(guild_id)
+            if irmao is None or irmao.id == guild.id:
+                continue
+            # Só convoca servidores dos quais o autor também é membro
+            if irmao.get_member(autor.id) is None:
+                logger.warning(f"{autor} não é membro de {irmao.name}; servidor ignorado na convocação")
+                continue
+            servidores.append(irmao)
+        return servidores
+    
+    @staticmethod
+    def _traduzir_cargos(origem, destino, role_ids):
+        """Mapeia cargos do servidor de origem para os cargos de mesmo nome em outro servidor"""
+        if not role_ids or origem.id == destino.id:
+            return role_ids
+        nomes = {role.name for role in (origem.get_role(rid) for rid in role_ids) if role is not None}
+        return {role.id for role in destino.roles if role.name in nomes}
+    
+    async def _enviar_para_destinatarios(self, urgencia, embed, destinatarios, tempo_destruicao,
+                                         convocacao_id, canais=None):
+        """
+        Envia a convocação em DM para cada destinatário, respeitando a fila de envio
+        
+        Args:
+            destinatarios: {member_id: guild_id} já deduplicado
+            canais: {member_id: canal de DM} abertos antecipadamente (agendamentos)
+        
+        Returns:
+            dict: contadores de envio (enviadas, falhas, dm_fechada, por_servidor)
+        """
+        enviadas = 0
+        falhas = 0
+        dm_fechada = 0
+        por_servidor = Counter()
+        
+        async with self.send_scheduler.job(urgencia):
+            for member_id, guild_id in destinatarios.items():
+                servidor = self.get_guild(guild_id)
+                membro = servidor.get_member(member_id) if servidor else None
+                if membro is None:
+                    if not self.headless:
+                        continue
+                    # Sem gateway não há cache de membros: a DM é aberta pelo ID via REST
+                    membro = discord.Object(id=member_id)
+            
+                # Pular membros que recusaram DMs recentemente (sem create_dm/send)
+                if self.dm_block_cache.is_blocked(membro.id):
+                    dm_fechada += 1
+                    self.history.record_recipient(convocacao_id, membro.id, guild_id, "dm_closed")
+                    continue
                 
-                # Registrar nos membros contatados
-                if str(membro) not in self.members_messaged:
-                    self.members_messaged[str(membro)] = []
+                # Aguarda a vez na fila de envio (convocações mais urgentes passam na frente)
+                with span("fila_envio"):
+                    await self.send_scheduler.acquire(urgencia)
                 
-                self.members_messaged[str(membro)].append({
-                    'message_id': mensagem.id,
-                    'urgencia': urgencia,
-                    'timestamp': time.time()
-                })
+                try:
+                    # Enviar mensagem para o membro (canal pré-aberto, se houver)
+                    dm_channel = canais.get(member_id) if canais else None
+                    if dm_channel is None:
+                        with span("create_dm"):
+                            dm_channel = await self.create_dm(membro)
+                    with span("send"):
+                        mensagem = await dm_channel.send(embed=embed)
                 
-                enviadas += 1
-                await asyncio.sleep(0.5)  # Pequena pausa para evitar rate limits
+                    with span("registrar_entrega"):
+                        # Salvar a mensagem para auto-destruição (também no histórico, para sobreviver a reinícios)
+                        delete_at = datetime.now() + timedelta(hours=tempo_destruicao)
+                        self.alert_messages.append({
+                            'message_id': mensagem.id,
+                            'channel_id': dm_channel.id,
+                            'delete_at': delete_at
+                        })
+                        self.history.record_recipient(convocacao_id, membro.id, guild_id, "delivered",
+                                                      mensagem.id, dm_channel.id, delete_at.timestamp())
+                    
+                        # Indexar a DM para resolver confirmações de presença
+                        self.ack_tracker.register_message(convocacao_id, mensagem.id, membro.id)
+                    
+                        # Registrar nos membros contatados
+                        if str(membro) not in self.members_messaged:
+                            self.members_messaged[str(membro)] = []
+                    
+                        self.members_messaged[str(membro)].append({
+                            'message_id': mensagem.id,
+                            'urgencia': urgencia,
+                            'timestamp': time.time()
+                        })
                 
-            except discord.Forbidden:
-                # Não tem permissão para enviar DM para este membro
-                falhas += 1
-                continue
+                    self.dm_block_cache.discard(membro.id)
+                    enviadas += 1
+                    por_servidor[guild_id] += 1
                 
-            except Exception as e:
-                logger.error(f"Erro ao enviar mensagem para {membro}: {e}")
-                falhas += 1
-                continue
+                except discord.Forbidden:
+                    # Não tem permissão para enviar DM para este membro
+                    logger.info(f"DM recusada por {membro}", extra={"aggregate": "Forbidden"})
+                    self.dm_block_cache.mark_blocked(membro.id)
+                    self.history.record_recipient(convocacao_id, membro.id, guild_id, "dm_closed")
+                    falhas += 1
+                    continue
                 
-        # Resultado final
-        if enviadas > 0:
-            return f"✅ Convocação enviada para **{enviadas}** membros! ({falhas} falhas)"
-        else:
-            return f"❌ Não foi possível enviar mensagens para nenhum membro. Certifique-se de que o bot tem permissões adequadas."
+                except Exception as e:
+                    # Agregado em resumos periódicos para não gerar uma linha por membro
+                    logger.error(f"Erro ao enviar mensagem para {membro}: {e}",
+                                 extra={"aggregate": f"falhas de envio ({type(e).__name__})"})
+                    self.history.record_recipient(convocacao_id, membro.id, guild_id, "failed")
+                    falhas += 1
+                    continue
+                    
+        # Persistir o cache de DMs fechadas fora do event loop
+        with span("salvar_cache_dm"):
+            await self._salvar_dm_block_cache()
+        
+        return {
+            "enviadas": enviadas,
+            "falhas": falhas,
+            "dm_fechada": dm_fechada,
+            "por_servidor": por_servidor
+        }
+    
+    def _admitir_convocacao(self, guild, autor):
+        """Aplica os token buckets; retorna a mensagem de recusa ou None se admitido"""
+        if not guild:
+            return None
+        admitido, escopo, espera = self.admission.try_admit(guild.id, autor.id)
+        if admitido:
+            return None
+        if escopo == "user":
+            return f"⏳ Você já fez convocações recentes. Tente novamente em **{espera:.0f}s**."
+        return f"⏳ Este servidor atingiu o limite de convocações. Tente novamente em **{espera:.0f}s**."
+    
+    def _mensagem_inicial_convocacao(self, reutilizada=False):
+        """Mensagem exibida enquanto a convocação é preparada ou aguarda na fila"""
+        if reutilizada:
+            return "♻️ Uma convocação idêntica já foi iniciada há pouco; aguardando o resultado dela..."
+        if self.admission.saturated():
+            stats = self.admission.stats()
+            return (f"⏳ Convocação na fila: {stats['in_flight']} em andamento, "
+                    f"{stats['waiting']} aguardando. Ela começará automaticamente.")
+        return "⏳ Enviando convocação para os membros..."
+    
+    def _aplicar_config(self, alterados):
+        """Aplica mudanças da configuração recarregada (executado no event loop)"""
+        if "DM_SEND_INTERVAL" in alterados:
+            self.send_scheduler.interval = Config.DM_SEND_INTERVAL
+        if "DM_BLOCK_TTL_HOURS" in alterados:
+            self.dm_block_cache.ttl = Config.DM_BLOCK_TTL_HOURS * 3600
+        if "LOOP_LAG_THRESHOLD_MS" in alterados and self.loop_monitor is not None:
+            self.loop_monitor.threshold = Config.LOOP_LAG_THRESHOLD_MS / 1000
+        if "IDEMPOTENCY_WINDOW_SECONDS" in alterados:
+            self.idempotency.window = Config.IDEMPOTENCY_WINDOW_SECONDS
+        if "ACK_EDIT_INTERVAL" in alterados:
+            self.ack_tracker.edit_interval = Config.ACK_EDIT_INTERVAL
+        if "RATELIMIT_SNAPSHOT_MINUTES" in alterados:
+            self.save_ratelimit_state.change_interval(minutes=Config.RATELIMIT_SNAPSHOT_MINUTES)
+        if "DELETION_CHECK_MINUTES" in alterados:
+            self.check_scheduled_deletions.change_interval(minutes=Config.DELETION_CHECK_MINUTES)
+        if "SCHEDULE_PREWARM_MINUTES" in alterados:
+            self.agendamentos.prewarm = Config.SCHEDULE_PREWARM_MINUTES * 60
+        if "SCHEDULE_MAX_LATE_MINUTES" in alterados:
+            self.agendamentos.max_late = Config.SCHEDULE_MAX_LATE_MINUTES * 60
+        if "SPAN_SAMPLE_RATE" in alterados:
+            self.tracer.sample_rate = Config.SPAN_SAMPLE_RATE
+        if "SPAN_EXPORT_SECONDS" in alterados:
+            self.tracer.export_interval = Config.SPAN_EXPORT_SECONDS
+        if "HEALTH_PUBLISH_SECONDS" in alterados:
+            self.publish_state.change_interval(seconds=Config.HEALTH_PUBLISH_SECONDS)
+    
+    async def _salvar_dm_block_cache(self):
+        """Grava o cache de DMs fechadas em disco sem bloquear o event loop"""
+        data = self.dm_block_cache.dumps()
+        if data is None:
+            return
+        try:
+            await asyncio.to_thread(self.dm_block_cache.write, data)
+        except OSError as e:
+            # Mantém as mudanças pendentes para a próxima gravação
+            self.dm_block_cache.mark_dirty()
+            logger.warning(f"Não foi possível salvar o cache de DMs fechadas: {e}")
+    
+    @property
+    def _ratelimit_state_path(self):
+        return os.path.join(Config.DATA_DIR, "ratelimits.json")
+    
+    def _restaurar_ratelimits(self):
+        """Reaplica ao cliente HTTP os buckets de rate limit salvos"""
+        dados = ratelimit_state.load(self._ratelimit_state_path)
+        if not dados:
+            return
+        hashes, buckets = ratelimit_state.restore(self.http, asyncio.get_running_loop(), dados)
+        idade = time.time() - dados.get("saved_at", 0)
+        logger.info(f"Rate limits restaurados: {hashes} rotas, {buckets} buckets ativos "
+                    f"(snapshot de {idade:.0f}s atrás)")
+    
+    async def _salvar_ratelimits(self):
+        """Salva os buckets de rate limit sem bloquear o event loop"""
+        dados = ratelimit_state.snapshot(self.http, asyncio.get_running_loop())
+        try:
+            await asyncio.to_thread(ratelimit_state.save, self._ratelimit_state_path, dados)
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o estado de rate limit: {e}")
+    
+    async def _persistir_estado(self):
+        """Grava em disco o estado que deve sobreviver a uma reinicialização"""
+        await self._salvar_ratelimits()
+        await self._salvar_dm_block_cache()
+        await asyncio.to_thread(self.history.flush)
+        if self.trace is not None:
+            await asyncio.to_thread(self.trace.flush)
+    
+    async def _carregar_auto_destruicoes_pendentes(self):
+        """Recarrega do histórico as DMs cuja auto-destruição ainda não foi feita"""
+        try:
+            pendentes = await asyncio.to_thread(self.history.pending_deletions)
+        except Exception as e:
+            logger.error(f"Não foi possível carregar auto-destruições pendentes: {e}")
+            return
+        
+        conhecidas = {msg['message_id'] for msg in self.alert_messages}
+        for item in pendentes:
+            if item['message_id'] in conhecidas:
+                continue
+            self.alert_messages.append({
+                'message_id': item['message_id'],
+                'channel_id': item['channel_id'],
+                'delete_at': datetime.fromtimestamp(item['delete_at'])
+            })
+        if pendentes:
+            logger.info(f"{len(pendentes)} auto-destruições pendentes retomadas do histórico")
+    
+    def _atividade_em_andamento(self):
+        """
+        Sonda de atividade para o auto_restart (chamada em outra thread)
+        Retorna o motivo para adiar um reinício, ou None se o bot está ocioso
+        """
+        admissao = self.admission.stats()
+        if admissao["in_flight"] or admissao["waiting"]:
+            return f"{admissao['in_flight']} convocação(ões) em andamento, {admissao['waiting']} na fila"
+        if self._auto_destruicao_ativa:
+            return "varredura de auto-destruição em andamento"
+        
+        # Convocação agendada em preparação ou prestes a disparar
+        proximo = self.agendamentos.stats()["next_fire_in_seconds"]
+        if proximo is not None and proximo <= self.agendamentos.prewarm + Config.MEMORY_SAMPLE_INTERVAL:
+            return "convocação agendada prestes a disparar"
+        
+        # Auto-destruições que vencem antes da próxima varredura terminar
+        limite = datetime.now() + timedelta(minutes=Config.DELETION_CHECK_MINUTES)
+        vencendo = sum(1 for msg in list(self.alert_messages) if msg['delete_at'] <= limite)
+        if vencendo:
+            return f"{vencendo} auto-destruição(ões) vencendo"
+        return None
+    
+    def _persistir_estado_threadsafe(self, loop, timeout=10):
+        """Executa _persistir_estado no loop do bot a partir de outra thread (ex.: auto_restart)"""
+        if loop.is_closed() or not loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._persistir_estado(), loop).result(timeout=timeout)
+    
+    async def close(self):
+        """Persiste o estado antes de encerrar a conexão"""
+        try:
+            await self._persistir_estado()
+        except Exception as e:
+            logger.error(f"Erro ao persistir estado no encerramento: {e}")
+        await super().close()
+        if self.trace is not None:
+            await asyncio.to_thread(self.trace.close)
+        await asyncio.to_thread(self.tracer.close)
+    
+    def _publicar_estado(self):
+        """Publica o snapshot de estado lido pelos endpoints de saúde (executado no event loop)"""
+        # KeepAliveHandler é interno do discord.py; sem ele, a readiness ignora o heartbeat
+        keep_alive = getattr(self.ws, "_keep_alive", None)
+        ultimo_ack = getattr(keep_alive, "_last_ack", None)
+        heartbeat_ack_at = time.time() - (time.perf_counter() - ultimo_ack) if ultimo_ack else None
+        
+        latencia = self.latency
+        admissao = self.admission.stats()
+        bot_state.publish(
+            ready=self.is_ready(),
+            connected=self.ws is not None and not self.is_closed() and self.ws.open,
+            latency_ms=round(latencia * 1000, 1) if math.isfinite(latencia) else None,
+            heartbeat_ack_at=heartbeat_ack_at,
+            guilds=len(self.guilds),
+            members=sum(guild.member_count or 0 for guild in self.guilds),
+            convocations_in_flight=admissao["in_flight"],
+            convocations_waiting=admissao["waiting"],
+            send_jobs=sum(self.send_scheduler.stats()["active_jobs"].values()),
+            pending_deletions=len(self.alert_messages)
+        )
+    
+    @tasks.loop(seconds=5)
+    async def publish_state(self):
+        """Publica periodicamente o estado do bot (um snapshot parado indica loop travado)"""
+        self._publicar_estado()
+        if self.shared_metrics is not None:
+            self.shared_metrics.write(blob=json.dumps(collect_metrics(), default=str).encode('utf-8'))
+    
+    @tasks.loop(minutes=5)
+    async def save_ratelimit_state(self):
+        """Salva periodicamente os buckets de rate limit aprendidos"""
+        await self._salvar_ratelimits()
+    
+    @save_ratelimit_state.before_loop
+    async def before_save_ratelimit_state(self):
+        await self.wait_until_ready()
     
     @tasks.loop(minutes=5)
     async def check_scheduled_deletions(self):
         """Verifica periodicamente mensagens para auto-destruição"""
+        inicio = time.perf_counter()
+        self._auto_destruicao_ativa = True
+        try:
+            await self._processar_auto_destruicao()
+        finally:
+            self._auto_destruicao_ativa = False
+            if self.dispatch_stats is not None:
+                self.dispatch_stats.record("task", "check_scheduled_deletions", time.perf_counter() - inicio)
+    
+    async def _processar_auto_destruicao(self):
+        """Exclui as mensagens de alerta cujo prazo de auto-destruição já passou"""
         now = datetime.now()
         mensagens_para_deletar = []
         
@@ -297,28 +1464,49 @@ class WeProfit(commands.Bot):
             if now >= msg['delete_at']:
                 mensagens_para_deletar.append(msg)
                 
-        # Remove mensagens
-        for msg in mensagens_para_deletar:
-            try:
-                channel = self.get_channel(msg['channel_id'])
-                if not channel:
-                    # Tenta obter o canal como canal de DM
-                    channel = await self.fetch_channel(msg['channel_id'])
-                    
-                if channel:
-                    # Tenta excluir a mensagem
-                    try:
-                        message = await channel.fetch_message(msg['message_id'])
-                        await message.delete()
-                        logger.info(f"Mensagem {msg['message_id']} auto-destruída com sucesso")
-                    except Exception as e:
-                        logger.warning(f"Não foi possível excluir mensagem {msg['message_id']}: {e}")
-                        
-            except Exception as e:
-                logger.error(f"Erro ao processar auto-destruição: {e}")
+        if not mensagens_para_deletar:
+            return
+        
+        with self.tracer.trace("auto_destruicao", mensagens=len(mensagens_para_deletar)):
+            await self._excluir_alertas(mensagens_para_deletar)
+        
+        # Remove da lista de mensagens pendentes
+        removidas = {msg['message_id'] for msg in mensagens_para_deletar}
+        self.alert_messages = [msg for msg in self.alert_messages if msg['message_id'] not in removidas]
+    
+    async def _excluir_alertas(self, mensagens):
+        """
+        Exclui DMs de alerta, até Config.DELETION_CONCURRENCY em paralelo
+        Cada exclusão é uma única chamada REST (mensagem parcial, sem buscar canal nem mensagem);
+        os rate limits por rota são tratados pelo discord.py
+        
+        Returns:
+            Counter: excluidas, falhas
+        """
+        limite = asyncio.Semaphore(Config.DELETION_CONCURRENCY)
+        resultado = Counter()
+        
+        async def excluir(msg):
+            async with limite:
+                try:
+                    canal = self.get_partial_messageable(msg['channel_id'])
+                    with span("delete"):
+                        await canal.get_partial_message(msg['message_id']).delete()
+                    resultado["excluidas"] += 1
+                    logger.info(f"Mensagem {msg['message_id']} auto-destruída com sucesso",
+                                extra={"aggregate": "mensagens auto-destruídas"})
+                except Exception as e:
+                    resultado["falhas"] += 1
+                    logger.warning(f"Não foi possível excluir mensagem {msg['message_id']}: {e}",
+                                   extra={"aggregate": f"falhas de auto-destruição ({type(e).__name__})"})
                 
-            # Remove da lista de mensagens pendentes
-            self.alert_messages.remove(msg)
+                # Não é tentada de novo: mensagens apagadas pelo usuário falhariam para sempre
+                with span("registrar_exclusao"):
+                    self.ack_tracker.forget_message(msg['message_id'])
+                    self.history.mark_deleted(msg['message_id'])
+        
+        await asyncio.gather(*(excluir(msg) for msg in mensagens))
+        return resultado
     
     @check_scheduled_deletions.before_loop
     async def before_scheduled_deletions(self):
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Snapshot do estado do bot para os endpoints de saúde
+O bot publica periodicamente (e a cada conexão/desconexão) um dicionário imutável
+com o estado do gateway, contagens e trabalho pendente. A publicação apenas troca
+a referência do snapshot, então o servidor web lê sem locks e sem tocar no event loop.
+Com um segmento compartilhado (shared_metrics) anexado, o snapshot também é gravado
+em mmap para servidores web rodando em outros processos (SharedBotState).
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import time
+from types import MappingProxyType
+
+from config import Config
+
+
+class BotState:
+    """Snapshot do estado do bot (um escritor: o event loop; vários leitores)"""
+
+    def __init__(self):
+        self._snapshot = MappingProxyType({"published_at": None, "started_at": time.time(),
+                                           "ready": False, "connected": False})
+        self._threads = {}
+        self._writer = None
+
+    def attach_writer(self, writer):
+        """Passa a gravar cada snapshot publicado também no segmento compartilhado"""
+        self._writer = writer
+
+    def publish(self, **campos):
+        """Publica um novo snapshot, mantendo os campos não informados"""
+        novo = dict(self._snapshot)
+        novo.update(campos)
+        novo["published_at"] = time.time()
+        self._snapshot = MappingProxyType(novo)
+        if self._writer is not None:
+            self._writer.write(gauges=novo)
+
+    def snapshot(self):
+        """Snapshot atual (imutável)"""
+        return self._snapshot
+
+    def register_thread(self, nome, thread):
+        """Registra uma thread essencial, verificada pelo endpoint de liveness"""
+        if thread is not None:
+            self._threads[nome] = thread
+
+    def threads(self):
+        return {nome: thread.is_alive() for nome, thread in list(self._threads.items())}
+
+    def liveness(self):
+        """
+        O processo está funcional? Falha se uma thread essencial morreu
+        ou se o event loop parou de publicar (travado)
+
+        Returns:
+            tuple: (ok, motivos)
+        """
+        motivos = [f"thread {nome} encerrada" for nome, viva in self.threads().items() if not viva]
+
+        publicado = self.snapshot()["published_at"]
+        if publicado is not None and time.time() - publicado > Config.HEALTH_STALE_SECONDS:
+            motivos.append(f"estado não publicado há {time.time() - publicado:.0f}s")
+
+        return not motivos, motivos
+
+    def readiness(self):
+        """
+        O bot pode atender convocações? Exige liveness, gateway conectado
+        e heartbeat confirmado recentemente
+
+        Returns:
+            tuple: (ok, motivos)
+        """
+        _, motivos = self.liveness()
+        snap = self.snapshot()
+
+        if snap["published_at"] is None:
+            motivos.append("estado ainda não publicado")
+        elif not snap["ready"]:
+            motivos.append("bot ainda não está pronto")
+        elif not snap["connected"]:
+            motivos.append("gateway desconectado")
+        else:
+            ack = snap.get("heartbeat_ack_at")
+            if ack is not None and time.time() - ack > Config.HEALTH_MAX_HEARTBEAT_AGE:
+                motivos.append(f"último heartbeat confirmado há {time.time() - ack:.0f}s")
+
+        return not motivos, motivos
+
+
+class SharedBotState(BotState):
+    """Estado publicado pelo bot em outro processo, lido do segmento compartilhado"""
+
+    def __init__(self, reader):
+        super().__init__()
+        self._reader = reader
+
+    def publish(self, **campos):
+        raise RuntimeError("SharedBotState é somente leitura")
+
+    def snapshot(self):
+        dados = self._reader.read()
+        if dados is None:
+            return self._snapshot
+        return MappingProxyType(dados)
+
+
+# Instância compartilhada pelo bot, pelo servidor web e pelo main
+state = BotState()
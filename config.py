@@ -3,8 +3,16 @@
 
 """
 Configuration settings for the Discord bot
+Valores operacionais podem ser ajustados em tempo de execução pelo arquivo
+CONFIG_FILE (JSON), que é monitorado e validado sem reiniciar o bot
 """
 import os
+import json
+import time
+import logging
+import threading
+
+from recipient_order import TIERS
 
 # Tentar carregar variáveis de ambiente do arquivo .env, se existir
 try:
@@ -27,13 +35,23 @@ class Config:
     # Se não for especificado, o bot usará todos os servidores onde está presente
     GUILD_ID = int(os.getenv("GUILD_ID", "0")) if os.getenv("GUILD_ID") else None
     
+    # Servidores irmãos incluídos nas convocações multi-servidor (IDs separados por vírgula)
+    SISTER_GUILD_IDS = [int(gid) for gid in os.getenv("SISTER_GUILD_IDS", "").replace(" ", "").split(",") if gid]
+    
     # Presença do bot
     ACTIVITY_TYPE = "playing"  # playing, listening, watching
     ACTIVITY_NAME = "help"  # Sem prefixo para mostrar como 'Hashz' ao invés de '!Hashz'
     
     # Cooldown entre comandos (em segundos)
+    # Nas convocações, é o tempo para repor uma ficha do balde de cada usuário
     DEFAULT_COMMAND_COOLDOWN = 3
     
+    # Controle de admissão das convocações
+    CONVOCAR_USER_BURST = 2               # Convocações seguidas permitidas por usuário
+    CONVOCAR_GUILD_BURST = 3              # Convocações seguidas permitidas por servidor
+    CONVOCAR_GUILD_REFILL_SECONDS = 120   # Tempo para repor uma ficha do servidor
+    MAX_CONCURRENT_FANOUTS = 2            # Convocações enviando DMs ao mesmo tempo
+    
     # Cores para embeds
     COLORS = {
         "primary": 0x3498db,   # Blue
@@ -43,9 +61,301 @@ class Config:
         "info": 0x9b59b6       # Purple
     }
     
+    # Tempo de auto-destruição (em horas) por nível de urgência
+    SELF_DESTRUCT_HOURS = {
+        "baixa": 24,
+        "média": 6,
+        "alta": 2
+    }
+    
+    # Intervalo (em minutos) da verificação de mensagens para auto-destruição
+    DELETION_CHECK_MINUTES = 5
+    DELETION_CONCURRENCY = 4  # Exclusões simultâneas (bot e maintenance.py)
+    
+    # Modo resumo: uma publicação com menções no canal do servidor em vez de uma DM por membro
+    DIGEST_CHANNELS = {}  # {guild_id: channel_id}; servidores sem canal continuam recebendo DMs
+    DIGEST_URGENCIES = ["baixa"]  # Urgências entregues em modo resumo
+    DIGEST_DM_WINDOW_DAYS = 0  # > 0: ainda envia DM a quem recebeu uma DM com sucesso nesse período
+    
+    # Janela (em segundos) em que uma convocação idêntica reutiliza a anterior em vez de reenviar
+    IDEMPOTENCY_WINDOW_SECONDS = 600
+    
+    # Confirmação de presença por reação nas DMs de convocação
+    ACK_EMOJI = "✅"
+    ACK_EDIT_INTERVAL = 5  # Intervalo mínimo (segundos) entre edições da contagem de presenças
+    
+    # Instrumentação de latência de eventos/comandos (opcional, exposta em /metrics/dispatch)
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "false").lower() in ("1", "true", "yes")
+    
+    # Monitor de lag do event loop (exposto em /metrics/loop_lag)
+    LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+    LOOP_LAG_THRESHOLD_MS = 250  # Bloqueio do loop a partir do qual a pilha é capturada
+    
+    # Token para o endpoint de profiling /debug/profile e para os incidentes de lag em /metrics
+    # (vazio = profiler desativado e incidentes ocultos)
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+    
+    # Intervalo (em minutos) para salvar o estado de rate limit aprendido
+    RATELIMIT_SNAPSHOT_MINUTES = 5
+    
+    # Endpoints de saúde (/health/live e /health/ready)
+    HEALTH_PUBLISH_SECONDS = 5  # Intervalo de publicação do estado do bot
+    HEALTH_STALE_SECONDS = 60  # Estado mais antigo que isso indica event loop travado
+    HEALTH_MAX_HEARTBEAT_AGE = 90  # Idade máxima do último heartbeat confirmado pelo gateway
+    
     # Intervalo para o serviço de ping (em segundos)
     PING_INTERVAL = 5 * 60  # 5 minutos
     
     # Configuração de reinicialização automática
     AUTO_RESTART_INTERVAL = 12 * 60 * 60  # 12 horas
-    MEMORY_THRESHOLD_MB = 500  # Limiar de uso de memória para reiniciar
\ No newline at end of file
+    MEMORY_THRESHOLD_MB = 500  # Limiar de uso de memória para reiniciar
+    MEMORY_SAMPLE_INTERVAL = 60  # Intervalo (segundos) entre amostras de memória (RSS)
+    MEMORY_FORECAST_HORIZON = 30 * 60  # Reinicia na próxima janela tranquila se o limiar for previsto dentro deste prazo
+    MEMORY_HARD_LIMIT_FACTOR = 1.5  # Acima de limiar x fator, reinicia mesmo com atividade em andamento
+    
+    # Logging
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text ou json
+    LOG_AGGREGATE_WINDOW = int(os.getenv("LOG_AGGREGATE_WINDOW", "10"))  # Janela de agregação de erros repetidos (segundos)
+    
+    # Diretório para dados persistidos entre reinicializações
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    
+    # Banco SQLite com o histórico de convocações
+    HISTORY_DB = os.getenv("HISTORY_DB", os.path.join(DATA_DIR, "history.sqlite3"))
+    
+    # Gravação do tráfego do gateway e REST para reprodução offline (trace_replay.py)
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() == "true"
+    TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(DATA_DIR, "traces"))
+    TRACE_MAX_MB = int(os.getenv("TRACE_MAX_MB", "200"))  # Tamanho máximo (comprimido) de cada trace
+    
+    # Spans das etapas de convocações e auto-destruição (formato Chrome Trace, ui.perfetto.dev)
+    SPAN_SAMPLE_RATE = float(os.getenv("SPAN_SAMPLE_RATE", "0.2"))  # Fração das operações registradas (0 = desativado)
+    SPAN_DIR = os.getenv("SPAN_DIR", os.path.join(DATA_DIR, "spans"))
+    SPAN_FILE_MAX_MB = int(os.getenv("SPAN_FILE_MAX_MB", "20"))  # Tamanho para rotacionar o arquivo
+    SPAN_FILE_BACKUPS = 5  # Arquivos rotacionados mantidos
+    SPAN_EXPORT_SECONDS = 5  # Intervalo de agrupamento da exportação
+    
+    # Manifesto de extensões (cogs) carregadas sob demanda e cache de falhas de carregamento
+    EXTENSIONS_MANIFEST = os.getenv("EXTENSIONS_MANIFEST", "extensions.json")
+    EXTENSIONS_BACKGROUND_LOAD = os.getenv("EXTENSIONS_BACKGROUND_LOAD", "true").lower() == "true"
+    
+    # Convocações agendadas (/agendar)
+    SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE", "America/Sao_Paulo")  # Fuso dos horários informados
+    SCHEDULE_PREWARM_MINUTES = 5  # Antecedência para resolver destinatários e abrir os canais de DM
+    SCHEDULE_MAX_LATE_MINUTES = 30  # Após reinício, agendamentos mais atrasados que isso expiram
+    
+    # Segmento mmap com estado e métricas do bot para servidores web em outros processos
+    # (vazio = desativado; use um caminho em /dev/shm para mantê-lo apenas em memória)
+    SHARED_METRICS_FILE = os.getenv("SHARED_METRICS_FILE", "")
+    
+    # Token para a API de histórico em /api/history (vazio = API desativada)
+    HISTORY_API_TOKEN = os.getenv("HISTORY_API_TOKEN", "")
+    
+    # Tempo (em horas) que um membro com DM fechada é ignorado antes de ser testado novamente
+    DM_BLOCK_TTL_HOURS = float(os.getenv("DM_BLOCK_TTL_HOURS", "24"))
+    
+    # Ordem de envio das DMs: faixas priorizadas (online, responders); os demais vão por último
+    RECIPIENT_ORDER = ["online", "responders"]
+    RESPONDER_WINDOW_DAYS = 30  # Janela de confirmações de presença que coloca o membro na faixa responders
+    # Intent privilegiado de presença (habilite também no portal do Discord); necessário para a faixa online
+    PRESENCE_INTENT = os.getenv("PRESENCE_INTENT", "false").lower() == "true"
+    
+    # Intervalo mínimo (em segundos) entre DMs, compartilhado entre convocações simultâneas
+    DM_SEND_INTERVAL = float(os.getenv("DM_SEND_INTERVAL", "0.5"))
+    
+    # Arquivo de configuração recarregável em tempo de execução
+    CONFIG_FILE = os.getenv("CONFIG_FILE", "config.json")
+    CONFIG_RELOAD_INTERVAL = 5  # Intervalo de verificação do arquivo (segundos)
+
+
+logger = logging.getLogger('config')
+
+
+def _number(minimo, maximo, tipo=float):
+    """Cria um validador para valores numéricos dentro de um intervalo"""
+    def validar(valor):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise ValueError("deve ser numérico")
+        if not minimo <= valor <= maximo:
+            raise ValueError(f"deve estar entre {minimo} e {maximo}")
+        return tipo(valor)
+    return validar
+
+
+def _self_destruct_hours(valor):
+    if not isinstance(valor, dict):
+        raise ValueError("deve ser um objeto {urgência: horas}")
+    faltando = set(Config.SELF_DESTRUCT_HOURS) - set(valor)
+    if faltando:
+        raise ValueError(f"faltam as urgências {sorted(faltando)}")
+    validar_horas = _number(0.01, 24 * 14)
+    return {urgencia: validar_horas(horas) for urgencia, horas in valor.items()
+            if urgencia in Config.SELF_DESTRUCT_HOURS}
+
+
+def _recipient_order(valor):
+    if not isinstance(valor, list) or any(faixa not in TIERS for faixa in valor):
+        raise ValueError(f"deve ser uma lista com faixas de {list(TIERS)}")
+    if len(set(valor)) != len(valor):
+        raise ValueError("não pode repetir faixas")
+    return valor
+
+
+def _digest_channels(valor):
+    if not isinstance(valor, dict):
+        raise ValueError("deve ser um objeto {guild_id: channel_id}")
+    try:
+        return {int(guild_id): int(channel_id) for guild_id, channel_id in valor.items()}
+    except (TypeError, ValueError):
+        raise ValueError("IDs de servidor e canal devem ser numéricos")
+
+
+def _urgencies(valor):
+    if not isinstance(valor, list) or any(urgencia not in Config.SELF_DESTRUCT_HOURS for urgencia in valor):
+        raise ValueError(f"deve ser uma lista com urgências de {list(Config.SELF_DESTRUCT_HOURS)}")
+    return valor
+
+
+def _log_format(valor):
+    if valor not in ("text", "json"):
+        raise ValueError("deve ser 'text' ou 'json'")
+    return valor
+
+
+# Chaves ajustáveis em tempo de execução e seus validadores
+RELOADABLE = {
+    "PING_INTERVAL": _number(10, 24 * 3600, int),
+    "AUTO_RESTART_INTERVAL": _number(60, 30 * 24 * 3600, int),
+    "MEMORY_THRESHOLD_MB": _number(16, 64 * 1024),
+    "MEMORY_SAMPLE_INTERVAL": _number(5, 3600, int),
+    "MEMORY_FORECAST_HORIZON": _number(0, 24 * 3600, int),
+    "MEMORY_HARD_LIMIT_FACTOR": _number(1, 10),
+    "DEFAULT_COMMAND_COOLDOWN": _number(0, 3600),
+    "CONVOCAR_USER_BURST": _number(1, 100, int),
+    "CONVOCAR_GUILD_BURST": _number(1, 100, int),
+    "CONVOCAR_GUILD_REFILL_SECONDS": _number(0, 24 * 3600),
+    "MAX_CONCURRENT_FANOUTS": _number(1, 50, int),
+    "SELF_DESTRUCT_HOURS": _self_destruct_hours,
+    "DELETION_CHECK_MINUTES": _number(0.1, 24 * 60),
+    "DELETION_CONCURRENCY": _number(1, 50, int),
+    "DIGEST_CHANNELS": _digest_channels,
+    "DIGEST_URGENCIES": _urgencies,
+    "DIGEST_DM_WINDOW_DAYS": _number(0, 365),
+    "DM_SEND_INTERVAL": _number(0, 60),
+    "RECIPIENT_ORDER": _recipient_order,
+    "RESPONDER_WINDOW_DAYS": _number(1, 365),
+    "ACK_EDIT_INTERVAL": _number(1, 600),
+    "IDEMPOTENCY_WINDOW_SECONDS": _number(0, 24 * 3600),
+    "LOOP_LAG_THRESHOLD_MS": _number(20, 60000),
+    "RATELIMIT_SNAPSHOT_MINUTES": _number(0.5, 24 * 60),
+    "HEALTH_PUBLISH_SECONDS": _number(1, 300),
+    "SCHEDULE_PREWARM_MINUTES": _number(0, 120),
+    "SCHEDULE_MAX_LATE_MINUTES": _number(0, 24 * 60),
+    "HEALTH_STALE_SECONDS": _number(5, 3600),
+    "HEALTH_MAX_HEARTBEAT_AGE": _number(10, 3600),
+    "DM_BLOCK_TTL_HOURS": _number(0, 24 * 365),
+    "SPAN_SAMPLE_RATE": _number(0, 1),
+    "SPAN_EXPORT_SECONDS": _number(0, 300),
+    "LOG_AGGREGATE_WINDOW": _number(1, 3600, int),
+    "LOG_FORMAT": _log_format,
+}
+
+_listeners = []
+_watcher_thread = None
+_watcher_lock = threading.Lock()
+_last_mtime = None
+
+
+def add_config_listener(callback):
+    """
+    Registra uma função chamada com {chave: (antigo, novo)} quando a configuração muda
+    A função é chamada na thread do monitor; código assíncrono deve usar call_soon_threadsafe
+    """
+    _listeners.append(callback)
+
+
+def validate_config(data):
+    """Valida o conteúdo do arquivo e retorna apenas as chaves reconhecidas"""
+    if not isinstance(data, dict):
+        raise ValueError("o arquivo deve conter um objeto JSON")
+
+    validos = {}
+    erros = []
+    for chave, valor in data.items():
+        validar = RELOADABLE.get(chave)
+        if validar is None:
+            logger.warning(f"Configuração desconhecida ou não recarregável ignorada: {chave}")
+            continue
+        try:
+            validos[chave] = validar(valor)
+        except ValueError as e:
+            erros.append(f"{chave} {e}")
+
+    if erros:
+        raise ValueError("; ".join(erros))
+    return validos
+
+
+def reload_config():
+    """
+    Lê CONFIG_FILE, valida e aplica os valores alterados
+    Um arquivo inválido é rejeitado por inteiro e a configuração atual é mantida
+    """
+    global _last_mtime
+
+    try:
+        mtime = os.stat(Config.CONFIG_FILE).st_mtime
+    except FileNotFoundError:
+        return {}
+    if mtime == _last_mtime:
+        return {}
+    _last_mtime = mtime
+
+    try:
+        with open(Config.CONFIG_FILE, 'r', encoding='utf-8') as f:
+            novos = validate_config(json.load(f))
+    except (OSError, ValueError) as e:
+        logger.error(f"Configuração em {Config.CONFIG_FILE} rejeitada: {e}")
+        return {}
+
+    alterados = {}
+    for chave, valor in novos.items():
+        antigo = getattr(Config, chave)
+        if antigo != valor:
+            setattr(Config, chave, valor)
+            alterados[chave] = (antigo, valor)
+
+    if alterados:
+        logger.info(f"Configuração recarregada: {', '.join(sorted(alterados))}")
+        for callback in list(_listeners):
+            try:
+                callback(alterados)
+            except Exception as e:
+                logger.error(f"Erro ao notificar mudança de configuração: {e}")
+
+    return alterados
+
+
+def _watch_config():
+    while True:
+        try:
+            reload_config()
+        except Exception as e:
+            logger.error(f"Erro no monitor de configuração: {e}")
+        time.sleep(Config.CONFIG_RELOAD_INTERVAL)
+
+
+def start_config_watcher():
+    """Inicia (uma única vez por processo) a thread que monitora CONFIG_FILE"""
+    global _watcher_thread
+
+    with _watcher_lock:
+        if _watcher_thread is not None:
+            return _watcher_thread
+        _watcher_thread = threading.Thread(target=_watch_config, name="config-watcher", daemon=True)
+        _watcher_thread.start()
+        return _watcher_thread
+
+
+# Aplica o arquivo já na importação para que os valores iniciais venham dele
+reload_config()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modo resumo das convocações
+Para as urgências em Config.DIGEST_URGENCIES, servidores com canal de resumo
+configurado recebem a convocação uma única vez no canal, com menções (por cargo
+ou em blocos de menções de membros) no lugar de uma DM por membro. Cada mensagem
+publicada tem uma única auto-destruição. Membros com DM entregue recentemente
+podem continuar recebendo a DM (Config.DIGEST_DM_WINDOW_DAYS).
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+# Limite de caracteres do conteúdo de uma mensagem do Discord
+MESSAGE_LIMIT = 2000
+
+
+def split_recipients(destinatarios, digest_guilds, dm_ok=()):
+    """
+    Separa quem recebe DM de quem é mencionado no canal de resumo
+
+    Args:
+        destinatarios: {member_id: guild_id} (a ordem é mantida)
+        digest_guilds: servidores com canal de resumo
+        dm_ok: membros de servidores com resumo que ainda devem receber DM
+    Returns:
+        tuple: ({member_id: guild_id} por DM, {guild_id: [member_id]} por menção)
+    """
+    por_dm = {}
+    resumo = {}
+    for member_id, guild_id in destinatarios.items():
+        if guild_id in digest_guilds and member_id not in dm_ok:
+            resumo.setdefault(guild_id, []).append(member_id)
+        else:
+            por_dm[member_id] = guild_id
+    return por_dm, resumo
+
+
+def mention_chunks(member_ids, limit=MESSAGE_LIMIT):
+    """
+    Divide as menções em mensagens dentro do limite de tamanho
+
+    Returns:
+        list: [(conteúdo, [member_id, ...]), ...]
+    """
+    blocos = []
+    atual, ids, tamanho = [], [], 0
+    for member_id in member_ids:
+        mencao = f"<@{member_id}>"
+        if atual and tamanho + 1 + len(mencao) > limit:
+            blocos.append((" ".join(atual), ids))
+            atual, ids, tamanho = [], [], 0
+        tamanho += len(mencao) + (1 if atual else 0)
+        atual.append(mencao)
+        ids.append(member_id)
+    if atual:
+        blocos.append((" ".join(atual), ids))
+    return blocos
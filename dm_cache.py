@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache negativo de membros que recusam mensagens diretas
+Membros com DM fechada são ignorados pelas convocações até o TTL expirar,
+evitando create_dm/send que certamente falhariam (e contam como requisições inválidas)
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger('dm_cache')
+
+
+class DMNegativeCache:
+    """Conjunto de IDs de usuários com DM fechada, com expiração por entrada"""
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl = ttl_seconds
+        # user_id -> timestamp (time.time) em que a entrada expira
+        self._entries = {}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_blocked(self, user_id):
+        """Retorna True se o usuário recusou DMs recentemente"""
+        expires_at = self._entries.get(user_id)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            # Expirou: remove para que o membro seja testado novamente
+            del self._entries[user_id]
+            self._dirty = True
+            return False
+        return True
+
+    def mark_blocked(self, user_id):
+        """Registra que o usuário recusou uma DM"""
+        self._entries[user_id] = time.time() + self.ttl
+        self._dirty = True
+
+    def discard(self, user_id):
+        """Remove o usuário do cache (ex.: DM entregue com sucesso)"""
+        if self._entries.pop(user_id, None) is not None:
+            self._dirty = True
+
+    def prune(self):
+        """Remove entradas expiradas"""
+        now = time.time()
+        expirados = [uid for uid, exp in self._entries.items() if exp <= now]
+        for uid in expirados:
+            del self._entries[uid]
+        if expirados:
+            self._dirty = True
+        return len(expirados)
+
+    def load(self):
+        """Carrega o cache do disco, descartando entradas expiradas"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Não foi possível carregar o cache de DMs fechadas: {e}")
+            return
+
+        now = time.time()
+        self._entries = {int(uid): exp for uid, exp in data.items() if exp > now}
+        self._dirty = False
+        logger.info(f"Cache de DMs fechadas carregado: {len(self._entries)} membros")
+
+    def dumps(self):
+        """
+        Serializa o cache se houve mudanças desde a última gravação
+        Deve ser chamado na thread que altera o cache (o event loop do bot);
+        se a gravação falhar, chame mark_dirty() para tentar de novo na próxima
+        """
+        if not self._dirty:
+            return None
+
+        self.prune()
+        self._dirty = False
+        return json.dumps({str(uid): exp for uid, exp in self._entries.items()})
+
+    def mark_dirty(self):
+        """Marca o cache como pendente de gravação (ex.: a última gravação falhou)"""
+        self._dirty = True
+
+    def write(self, data):
+        """Grava o conteúdo serializado em disco (escrita atômica); pode rodar em outra thread"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """Grava o cache em disco, apenas se houve mudanças"""
+        data = self.dumps()
+        if data is not None:
+            try:
+                self.write(data)
+            except OSError:
+                self.mark_dirty()
+                raise
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Carregamento sob demanda de extensões (cogs) a partir de um manifesto
+Nenhuma extensão é importada antes do gateway ficar pronto: cada uma é carregada
+na primeira vez que um de seus comandos de texto é usado, ou em segundo plano
+após o on_ready. Falhas de carregamento são gravadas em disco e não são
+repetidas nas próximas inicializações enquanto o arquivo da extensão não mudar.
+
+Formato do manifesto (JSON):
+    [{"name": "cogs.exemplo", "commands": ["exemplo"], "background": true}, ...]
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import json
+import asyncio
+import logging
+import importlib.util
+
+logger = logging.getLogger('extension_loader')
+
+
+def _fingerprint(name):
+    """Identifica a versão do arquivo da extensão (None se o módulo não existir)"""
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not os.path.exists(spec.origin):
+        return None
+    stat = os.stat(spec.origin)
+    return f"{spec.origin}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ExtensionLoader:
+    """Carrega as extensões do manifesto quando necessário, lembrando as que falharam"""
+
+    def __init__(self, bot, manifest_path, failures_path):
+        self.bot = bot
+        self.manifest_path = manifest_path
+        self.failures_path = failures_path
+        self._extensions = {}  # nome -> entrada do manifesto
+        self._commands = {}    # comando de texto -> nome da extensão
+        self._failures = {}    # nome -> {"fingerprint", "error"}
+        self._locks = {}
+        self._background = None
+        self.loaded = 0
+
+    def load_manifest(self):
+        """Lê o manifesto e o cache de falhas (rápido: nenhuma extensão é importada)"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                entradas = json.load(f)
+        except FileNotFoundError:
+            entradas = []
+        except (OSError, ValueError) as e:
+            logger.error(f"Manifesto de extensões inválido ({self.manifest_path}): {e}")
+            entradas = []
+
+        for entrada in entradas:
+            if isinstance(entrada, str):
+                entrada = {"name": entrada}
+            nome = entrada.get("name")
+            if not nome:
+                continue
+            self._extensions[nome] = {"commands": entrada.get("commands", []),
+                                      "background": entrada.get("background", True)}
+            for comando in self._extensions[nome]["commands"]:
+                self._commands[comando.lower()] = nome
+
+        try:
+            with open(self.failures_path, 'r', encoding='utf-8') as f:
+                self._failures = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de falhas de extensões ignorado: {e}")
+
+        logger.info(f"{len(self._extensions)} extensões no manifesto "
+                    f"({len(self._failures)} com falha registrada)")
+
+    def owner_of(self, command_name):
+        """Extensão que fornece um comando de texto ainda não carregado"""
+        return self._commands.get(command_name.lower()) if command_name else None
+
+    async def ensure_loaded(self, name):
+        """Carrega a extensão se ainda não estiver carregada; retorna True se disponível"""
+        if name in self.bot.extensions:
+            return True
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self.bot.extensions:
+                return True
+
+            # Falhou antes e o arquivo não mudou desde então: não tenta de novo
+            falha = self._failures.get(name)
+            fingerprint = await asyncio.to_thread(_fingerprint, name)
+            if falha is not None and falha.get("fingerprint") == fingerprint:
+                return False
+
+            try:
+                await self.bot.load_extension(name)
+            except Exception as e:
+                logger.error(f"Erro ao carregar extensão {name}: {e}")
+                self._failures[name] = {"fingerprint": fingerprint, "error": str(e)}
+                await self._salvar_falhas()
+                return False
+
+            self.loaded += 1
+            logger.info(f"Extensão carregada: {name}")
+            if self._failures.pop(name, None) is not None:
+                await self._salvar_falhas()
+            return True
+
+    async def load_for_command(self, command_name):
+        """Carrega a extensão dona de um comando invocado pela primeira vez"""
+        nome = self.owner_of(command_name)
+        return nome is not None and await self.ensure_loaded(nome)
+
+    def start_background(self):
+        """Agenda o carregamento das demais extensões (uma vez, após o on_ready)"""
+        if self._background is None:
+            self._background = asyncio.get_running_loop().create_task(self._load_background())
+
+    async def _load_background(self):
+        comandos_antes = len(self.bot.tree.get_commands())
+        for nome, entrada in list(self._extensions.items()):
+            if entrada["background"]:
+                await self.ensure_loaded(nome)
+
+        # Extensões com comandos slash exigem nova sincronização
+        if len(self.bot.tree.get_commands()) != comandos_antes:
+            try:
+                await self.bot.tree.sync()
+                logger.info("Comandos slash das extensões sincronizados")
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar comandos slash das extensões: {e}")
+
+    async def _salvar_falhas(self):
+        data = json.dumps(self._failures, ensure_ascii=False, indent=2)
+        try:
+            await asyncio.to_thread(self._write, data)
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar o cache de falhas de extensões: {e}")
+
+    def _write(self, data):
+        os.makedirs(os.path.dirname(self.failures_path) or '.', exist_ok=True)
+        tmp_path = f"{self.failures_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.failures_path)
+
+    def stats(self):
+        return {
+            "manifest": len(self._extensions),
+            "loaded": [nome for nome in self._extensions if nome in self.bot.extensions],
+            "failed": {nome: falha.get("error") for nome, falha in self._failures.items()}
+        }
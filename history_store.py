@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Histórico persistente de convocações (SQLite)
+Guarda convocações, destinatários, resultado da entrega, confirmação de presença,
+o estado da auto-destruição de cada DM e as convocações agendadas. Índices por servidor/tempo e por usuário
+mantêm as consultas em milissegundos mesmo com meses de histórico.
+
+As gravações são enfileiradas e aplicadas em lote por uma thread dedicada,
+sem bloquear o event loop. As leituras usam uma conexão por thread (modo WAL),
+podendo ser feitas pelo servidor web ou por outro processo.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger('history_store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS convocations (
+    id TEXT PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    urgencia TEXT NOT NULL,
+    detalhes TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    enviadas INTEGER NOT NULL DEFAULT 0,
+    falhas INTEGER NOT NULL DEFAULT 0,
+    dm_fechada INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_conv_guild_time ON convocations (guild_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conv_guild_urgencia_time ON convocations (guild_id, urgencia, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS recipients (
+    convocation_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    outcome TEXT NOT NULL,          -- delivered, failed, dm_closed, mentioned (modo resumo)
+    message_id INTEGER,
+    channel_id INTEGER,
+    delete_at REAL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    acked_at REAL,
+    PRIMARY KEY (convocation_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_recipients_user_time ON recipients (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_recipients_message ON recipients (message_id) WHERE message_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_recipients_pending_delete ON recipients (delete_at)
+    WHERE deleted = 0 AND message_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_recipients_acked ON recipients (acked_at) WHERE acked_at IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS scheduled (
+    id TEXT PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    author_id INTEGER NOT NULL,
+    urgencia TEXT NOT NULL,
+    detalhes TEXT,
+    incluir TEXT,                   -- JSON: IDs de cargos
+    excluir TEXT,
+    irmaos INTEGER NOT NULL DEFAULT 0,
+    fire_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, fired, cancelled, expired, failed
+    convocation_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_pending ON scheduled (fire_at) WHERE status = 'pending';
+"""
+
+MAX_PAGE_SIZE = 200
+
+# Operação especial da fila de escrita: sinaliza um evento quando tudo antes dela foi gravado
+_FLUSH = object()
+
+
+class HistoryStore:
+    """Histórico de convocações com escrita assíncrona em lote"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._schema_ready = False
+        self.writes = 0
+
+    # ------------------------------------------------------------------ conexões
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ------------------------------------------------------------------ escrita
+
+    def _submit(self, sql, params):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put((sql, params))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            lote = [self._queue.get()]
+            # Agrupa tudo o que já está na fila em uma única transação
+            while len(lote) < 1000:
+                try:
+                    lote.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            eventos = []
+            try:
+                with conn:
+                    for item in lote:
+                        if item[0] is _FLUSH:
+                            eventos.append(item[1])
+                            continue
+                        conn.execute(*item)
+                self.writes += len(lote) - len(eventos)
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar histórico ({len(lote)} operações descartadas): {e}")
+            finally:
+                for evento in eventos:
+                    evento.set()
+
+    def flush(self, timeout=10):
+        """Aguarda (bloqueando) a gravação de tudo o que foi enfileirado até agora"""
+        if self._writer is None:
+            return True
+        evento = threading.Event()
+        self._queue.put((_FLUSH, evento))
+        return evento.wait(timeout)
+
+    def record_convocation(self, convocation_id, guild_id, author_id, urgencia, detalhes, created_at=None):
+        self._submit(
+            "INSERT OR REPLACE INTO convocations (id, guild_id, author_id, urgencia, detalhes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (convocation_id, guild_id, author_id, urgencia, detalhes, created_at or time.time())
+        )
+
+    def finish_convocation(self, convocation_id, enviadas, falhas, dm_fechada):
+        self._submit(
+            "UPDATE convocations SET finished_at = ?, enviadas = ?, falhas = ?, dm_fechada = ? WHERE id = ?",
+            (time.time(), enviadas, falhas, dm_fechada, convocation_id)
+        )
+
+    def record_resend(self, convocation_id, recuperadas):
+        """Reenvio às falhas de uma convocação: `recuperadas` passam de falhas a enviadas"""
+        self._submit(
+            "UPDATE convocations SET enviadas = enviadas + ?, falhas = MAX(falhas - ?, 0) WHERE id = ?",
+            (recuperadas, recuperadas, convocation_id)
+        )
+
+    def record_recipient(self, convocation_id, user_id, guild_id, outcome,
+                         message_id=None, channel_id=None, delete_at=None):
+        self._submit(
+            "INSERT OR REPLACE INTO recipients "
+            "(convocation_id, user_id, guild_id, created_at, outcome, message_id, channel_id, delete_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (convocation_id, user_id, guild_id, time.time(), outcome, message_id, channel_id, delete_at)
+        )
+
+    def record_ack(self, message_id, user_id, acked):
+        # Filtra pelo usuário: no modo resumo, uma mensagem de canal menciona vários membros
+        self._submit(
+            "UPDATE recipients SET acked_at = ? WHERE message_id = ? AND user_id = ?",
+            (time.time() if acked else None, message_id, user_id)
+        )
+
+    def record_convocation_ack(self, convocation_id, user_id, acked):
+        """Confirmação pelo par convocação/membro (publicações do modo resumo mencionam vários membros)"""
+        self._submit(
+            "UPDATE recipients SET acked_at = ? WHERE convocation_id = ? AND user_id = ?",
+            (time.time() if acked else None, convocation_id, user_id)
+        )
+
+    def mark_deleted(self, message_id):
+        self._submit("UPDATE recipients SET deleted = 1 WHERE message_id = ?", (message_id,))
+
+    def record_scheduled(self, item):
+        """Registra uma convocação agendada (dict no formato de pending_scheduled)"""
+        self._submit(
+            "INSERT OR REPLACE INTO scheduled (id, guild_id, channel_id, author_id, urgencia, detalhes, "
+            "incluir, excluir, irmaos, fire_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (item["id"], item["guild_id"], item["channel_id"], item["author_id"], item["urgencia"],
+             item["detalhes"], json.dumps(sorted(item["incluir"])), json.dumps(sorted(item["excluir"])),
+             int(item["irmaos"]), item["fire_at"], item.get("created_at") or time.time())
+        )
+
+    def set_scheduled_status(self, scheduled_id, status, convocation_id=None):
+        self._submit(
+            "UPDATE scheduled SET status = ?, convocation_id = COALESCE(?, convocation_id) WHERE id = ?",
+            (status, convocation_id, scheduled_id)
+        )
+
+    # ------------------------------------------------------------------ leitura
+
+    def pending_deletions(self, until=None, guild_id=None, convocation_id=None):
+        """
+        Mensagens ainda não auto-destruídas: [{message_id, channel_id, delete_at}]
+        Com `until`, apenas as vencidas até esse instante. Publicações do modo resumo
+        (uma linha por membro mencionado) aparecem uma única vez
+        """
+        sql = ("SELECT message_id, channel_id, MIN(delete_at) AS delete_at FROM recipients "
+               "WHERE deleted = 0 AND message_id IS NOT NULL")
+        params = []
+        if until is not None:
+            sql += " AND delete_at <= ?"
+            params.append(until)
+        if guild_id is not None:
+            sql += " AND guild_id = ?"
+            params.append(guild_id)
+        if convocation_id is not None:
+            sql += " AND convocation_id = ?"
+            params.append(convocation_id)
+        sql += " GROUP BY message_id, channel_id ORDER BY delete_at"
+        rows = self._reader().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def delivered_since(self, user_ids, since):
+        """Membros, dentre `user_ids`, que receberam uma DM com sucesso desde `since`"""
+        user_ids = list(user_ids)
+        entregues = set()
+        # Lotes abaixo do limite de parâmetros do SQLite; usa o índice por usuário
+        for inicio in range(0, len(user_ids), 500):
+            lote = user_ids[inicio:inicio + 500]
+            rows = self._reader().execute(
+                f"SELECT DISTINCT user_id FROM recipients WHERE outcome = 'delivered' AND created_at >= ? "
+                f"AND user_id IN ({','.join('?' * len(lote))})",
+                [since] + lote
+            ).fetchall()
+            entregues.update(row[0] for row in rows)
+        return entregues
+
+    def get_convocation(self, convocation_id):
+        row = self._reader().execute("SELECT * FROM convocations WHERE id = ?", (convocation_id,)).fetchone()
+        return dict(row) if row else None
+
+    def failed_recipients(self, convocation_id):
+        """Destinatários cuja entrega falhou: {user_id: guild_id}"""
+        rows = self._reader().execute(
+            "SELECT user_id, guild_id FROM recipients WHERE convocation_id = ? AND outcome = 'failed'",
+            (convocation_id,)
+        ).fetchall()
+        return {user_id: guild_id for user_id, guild_id in rows}
+
+    def pending_scheduled(self):
+        """Convocações agendadas ainda não disparadas, da mais próxima para a mais distante"""
+        rows = self._reader().execute(
+            "SELECT id, guild_id, channel_id, author_id, urgencia, detalhes, incluir, excluir, irmaos, "
+            "fire_at, created_at FROM scheduled WHERE status = 'pending' ORDER BY fire_at"
+        ).fetchall()
+        itens = []
+        for row in rows:
+            item = dict(row)
+            item["incluir"] = set(json.loads(item["incluir"] or "[]"))
+            item["excluir"] = set(json.loads(item["excluir"] or "[]"))
+            item["irmaos"] = bool(item["irmaos"])
+            itens.append(item)
+        return itens
+
+    def recent_responders(self, since):
+        """Membros que confirmaram presença desde `since`: {user_id: instante da última confirmação}"""
+        rows = self._reader().execute(
+            "SELECT user_id, MAX(acked_at) FROM recipients WHERE acked_at >= ? GROUP BY user_id",
+            (since,)
+        ).fetchall()
+        return {user_id: ultimo for user_id, ultimo in rows}
+
+    def list_convocations(self, guild_id, urgencia=None, before=None, limit=20):
+        """
+        Convocações de um servidor, das mais recentes para as mais antigas
+        Paginação por cursor: passe em `before` o `next_cursor` da página anterior
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        sql = "SELECT * FROM convocations WHERE guild_id = ?"
+        params = [guild_id]
+        if urgencia:
+            sql += " AND urgencia = ?"
+            params.append(urgencia)
+        if before is not None:
+            sql += " AND created_at < ?"
+            params.append(float(before))
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = [dict(row) for row in self._reader().execute(sql, params).fetchall()]
+        next_cursor = rows[limit - 1]["created_at"] if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    def missed(self, guild_id, urgencia=None, last=5, limit=50, offset=0):
+        """
+        Membros que não confirmaram presença nas últimas `last` convocações
+        (não entregues também contam como ausência)
+        """
+        last = max(1, min(int(last), 1000))
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        filtro = "guild_id = ?" + (" AND urgencia = ?" if urgencia else "")
+        params = [guild_id] + ([urgencia] if urgencia else []) + [last, limit + 1, max(0, int(offset))]
+
+        rows = self._reader().execute(
+            f"""
+            WITH ultimas AS (
+                SELECT id FROM convocations WHERE {filtro} ORDER BY created_at DESC LIMIT ?
+            )
+            SELECT user_id, COUNT(*) AS convocado, SUM(acked_at IS NULL) AS faltas
+            FROM recipients
+            WHERE convocation_id IN (SELECT id FROM ultimas)
+            GROUP BY user_id
+            HAVING faltas > 0
+            ORDER BY faltas DESC, user_id
+            LIMIT ? OFFSET ?
+            """,
+            params
+        ).fetchall()
+
+        items = [dict(row) for row in rows]
+        next_offset = offset + limit if len(items) > limit else None
+        return {"items": items[:limit], "next_offset": next_offset}
+
+    def user_history(self, user_id, before=None, limit=20):
+        """Convocações recebidas por um usuário, das mais recentes para as mais antigas"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        sql = (
+            "SELECT r.convocation_id, r.guild_id, r.created_at, r.outcome, r.acked_at, c.urgencia, c.detalhes "
+            "FROM recipients r JOIN convocations c ON c.id = r.convocation_id WHERE r.user_id = ?"
+        )
+        params = [user_id]
+        if before is not None:
+            sql += " AND r.created_at < ?"
+            params.append(float(before))
+        sql += " ORDER BY r.created_at DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = [dict(row) for row in self._reader().execute(sql, params).fetchall()]
+        next_cursor = rows[limit - 1]["created_at"] if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "writes": self.writes}
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chaves de idempotência para convocações
+Uma convocação repetida (interação reenviada, oficial que envia o comando duas vezes)
+gera a mesma chave a partir de servidor, autor, urgência, detalhes e público.
+Enquanto a convocação está em andamento, e durante a janela configurada após sua
+conclusão, a segunda requisição se associa a ela e reutiliza seu resultado, em vez
+de iniciar outro envio. Convocações que falharam (exceção ou resultado recusado por
+`reusable`) não são reaproveitadas.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import time
+import asyncio
+import hashlib
+
+
+def make_key(*partes):
+    """Gera uma chave estável a partir das partes (conjuntos são ordenados)"""
+    normalizadas = []
+    for parte in partes:
+        if isinstance(parte, (set, frozenset)):
+            parte = ",".join(str(p) for p in sorted(parte))
+        elif isinstance(parte, str):
+            parte = " ".join(parte.lower().split())
+        elif parte is None:
+            parte = ""
+        normalizadas.append(str(parte))
+    return hashlib.sha256("\x1f".join(normalizadas).encode("utf-8")).hexdigest()[:32]
+
+
+class IdempotencyRegistry:
+    """Associa chaves a tarefas de convocação até uma janela de tempo após a conclusão"""
+
+    def __init__(self, window_seconds, reusable=None):
+        self.window = window_seconds
+        # Recebe o resultado da tarefa; False descarta a entrada (ex.: nada foi entregue)
+        self.reusable = reusable
+        self._entries = {}  # chave -> (concluída em ou None se em andamento, asyncio.Task)
+        self.hits = 0
+
+    def get(self, key):
+        """Retorna a tarefa associada à chave, se em andamento ou concluída dentro da janela"""
+        self._prune()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def start(self, key, coro):
+        """Inicia a convocação como tarefa e a associa à chave"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._entries[key] = (None, task)
+        task.add_done_callback(lambda t: self._on_done(key, t))
+        return task
+
+    def _on_done(self, key, task):
+        entry = self._entries.get(key)
+        if entry is None or entry[1] is not task:
+            return
+        # Falhas não são reaproveitadas: uma nova tentativa deve executar de novo
+        if (task.cancelled() or task.exception() is not None
+                or (self.reusable is not None and not self.reusable(task.result()))):
+            del self._entries[key]
+        else:
+            # A janela conta a partir da conclusão (envios longos podem exceder a janela)
+            self._entries[key] = (time.monotonic(), task)
+
+    def _prune(self):
+        limite = time.monotonic() - self.window
+        for key in [k for k, (concluida, _) in self._entries.items()
+                    if concluida is not None and concluida < limite]:
+            del self._entries[key]
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "tracked": len(self._entries),
+            "running": sum(1 for _, task in self._entries.values() if not task.done()),
+            "hits": self.hits
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentação de latência do bot (opcional)
+Mantém em memória, por tipo de evento, comando e tarefa, a contagem de chamadas
+e um histograma de latência com buckets fixos em escala logarítmica.
+Registrar uma medida custa um log2 e alguns incrementos de inteiros.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import math
+
+# Limites superiores dos buckets em milissegundos: 0.05ms, 0.1ms, 0.2ms ... ~105s
+BUCKET_BOUNDS_MS = [0.05 * (2 ** i) for i in range(22)]
+
+
+class LatencyHistogram:
+    """Histograma de latências com buckets em potências de 2"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        if ms <= BUCKET_BOUNDS_MS[0]:
+            index = 0
+        else:
+            index = min(math.ceil(math.log2(ms / BUCKET_BOUNDS_MS[0])), len(BUCKET_BOUNDS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p, buckets=None):
+        """Estimativa do percentil p (0-100) pelo limite superior do bucket"""
+        buckets = buckets if buckets is not None else self.buckets
+        total = sum(buckets)
+        if total == 0:
+            return 0.0
+        alvo = total * p / 100.0
+        acumulado = 0
+        for index, quantidade in enumerate(buckets):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def snapshot(self):
+        buckets = list(self.buckets)
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": round(self.total / count, 3) if count else 0.0,
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(50, buckets),
+            "p95_ms": self.percentile(95, buckets),
+            "p99_ms": self.percentile(99, buckets),
+            "buckets": {
+                (f"le_{BUCKET_BOUNDS_MS[i]:g}ms" if i < len(BUCKET_BOUNDS_MS) else "inf"): n
+                for i, n in enumerate(buckets) if n
+            }
+        }
+
+
+class DispatchStats:
+    """Histogramas agrupados por categoria (event, command, task) e nome"""
+
+    def __init__(self):
+        self._groups = {}
+
+    def record(self, kind, name, seconds):
+        group = self._groups.get(kind)
+        if group is None:
+            group = self._groups[kind] = {}
+        histogram = group.get(name)
+        if histogram is None:
+            histogram = group[name] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def snapshot(self):
+        """Cópia das métricas; pode ser chamada de outra thread"""
+        return {
+            kind: {name: histogram.snapshot() for name, histogram in list(group.items())}
+            for kind, group in list(self._groups.items())
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline de logging assíncrono para o Bot Discord
+Os registros são enfileirados e escritos por uma thread em segundo plano,
+tirando o I/O de stdout do event loop do bot
+
+Registros marcados com extra={"aggregate": "<chave>"} não são escritos um a um:
+são contados e emitidos como um resumo periódico (ex.: "412 Forbidden nos últimos 10s")
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+
+from config import Config, add_config_listener
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+# Estado global do pipeline (configurado apenas uma vez por processo)
+_listener = None
+_aggregator = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata registros como uma linha JSON por evento"""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for campo in ("aggregate", "count", "window"):
+            if hasattr(record, campo):
+                payload[campo] = getattr(record, campo)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class AggregatingHandler(logging.Handler):
+    """
+    Encaminha registros para o handler de destino, agregando os que possuem
+    o atributo `aggregate` em resumos emitidos a cada `window` segundos
+    """
+
+    def __init__(self, target, window=10):
+        super().__init__()
+        self.target = target
+        self.window = window
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="log-aggregator", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        key = getattr(record, "aggregate", None)
+        if key is None:
+            self.target.handle(record)
+            return
+
+        with self._lock:
+            entrada = self._counts.get((record.name, record.levelno, key))
+            if entrada is None:
+                self._counts[(record.name, record.levelno, key)] = [1, record]
+            else:
+                entrada[0] += 1
+                entrada[1] = record
+
+    def flush_summaries(self):
+        """Emite um resumo por chave agregada e zera os contadores"""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+
+        for (name, levelno, key), (count, ultimo) in counts.items():
+            resumo = logging.LogRecord(
+                name, levelno, ultimo.pathname, ultimo.lineno,
+                "%d %s nos últimos %ds (último: %s)",
+                (count, key, self.window, ultimo.getMessage()),
+                None
+            )
+            resumo.aggregate = key
+            resumo.count = count
+            resumo.window = self.window
+            self.target.handle(resumo)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.window):
+            try:
+                self.flush_summaries()
+            except Exception:
+                pass
+
+    def close(self):
+        self._stop.set()
+        self.flush_summaries()
+        self.target.close()
+        super().close()
+
+
+def setup_logging(level=logging.INFO):
+    """
+    Configura o logging do processo para passar por uma fila
+    Pode ser chamada por todos os módulos; apenas a primeira chamada tem efeito
+    """
+    global _listener, _aggregator
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler()
+        if Config.LOG_FORMAT == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        _aggregator = AggregatingHandler(stream, window=Config.LOG_AGGREGATE_WINDOW)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, _aggregator, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        add_config_listener(_on_config_change)
+
+
+def _on_config_change(alterados):
+    """Aplica mudanças de formato e janela de agregação sem reiniciar"""
+    aggregator = _aggregator
+    if aggregator is None:
+        return
+    if "LOG_FORMAT" in alterados:
+        formatter = JsonFormatter() if Config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+        aggregator.target.setFormatter(formatter)
+    if "LOG_AGGREGATE_WINDOW" in alterados:
+        aggregator.window = Config.LOG_AGGREGATE_WINDOW
+
+
+def shutdown_logging():
+    """Esvazia a fila e emite os resumos pendentes"""
+    global _listener, _aggregator
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _aggregator.close()
+        _listener = None
+        _aggregator = None
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Monitor de atraso (lag) do event loop do bot
+Uma corrotina mede continuamente quanto cada tick atrasa em relação ao esperado.
+Uma thread vigia os ticks: quando o loop fica parado além do limite, ela captura
+a pilha da thread do loop (o callback que está bloqueando) e registra um incidente.
+Os incidentes mais recentes ficam em um buffer circular.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+
+from instrumentation import LatencyHistogram
+
+logger = logging.getLogger('loop_monitor')
+
+
+class LoopLagMonitor:
+    """Mede o lag do event loop e captura a pilha de callbacks bloqueantes"""
+
+    def __init__(self, interval=0.1, threshold=0.25, max_incidents=50):
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = LatencyHistogram()
+        self.incidents = deque(maxlen=max_incidents)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._current = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Inicia a medição no event loop atual e a thread de vigilância"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Monitor de lag do event loop iniciado (limite {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            esperado = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.histogram.record(max(0.0, loop.time() - esperado))
+            self._last_beat = time.monotonic()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            parado = time.monotonic() - self._last_beat - self.interval
+
+            if parado > self.threshold and self._current is None:
+                self._current = self._capture(parado)
+            elif self._current is not None:
+                if parado > self.threshold:
+                    self._current["stall_ms"] = round(parado * 1000, 1)
+                else:
+                    # O loop voltou a responder: encerra o incidente
+                    incidente, self._current = self._current, None
+                    self.incidents.append(incidente)
+                    logger.warning(
+                        f"Event loop bloqueado por ~{incidente['stall_ms']:.0f}ms em "
+                        f"{incidente['location']}"
+                    )
+
+    def _capture(self, parado):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        local = "desconhecido"
+        if frame is not None:
+            local = f"{frame.f_code.co_filename}:{frame.f_lineno} ({frame.f_code.co_name})"
+        return {
+            "detected_at": datetime.now().isoformat(timespec="milliseconds"),
+            "stall_ms": round(parado * 1000, 1),
+            "location": local,
+            "stack": [linha.rstrip() for linha in stack]
+        }
+
+    def stats(self):
+        """Histograma de lag e incidentes recentes; pode ser chamado de outra thread"""
+        atual = self._current
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "lag": self.histogram.snapshot(),
+            "stalled_now": atual is not None,
+            "incident_count": len(self.incidents),
+            "current_incident": dict(atual) if atual is not None else None,
+            "incidents": list(self.incidents)
+        }
@@ -15,14 +15,11 @@ import time
 import threading
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+from bot_state import state as bot_state
+
+# Configurar logging (fila + escrita em segundo plano)
+from log_pipeline import setup_logging
+setup_logging()
 logger = logging.getLogger('main')
 
 def start_bot():
@@ -34,7 +31,7 @@ def start_bot():
         logger.info("Iniciando o Bot Discord...")
         
         # Criar uma thread para o bot
-        bot_thread = threading.Thread(target=run_bot)
+        bot_thread = threading.Thread(target=run_bot, name="bot")
         bot_thread.daemon = True
         bot_thread.start()
         
@@ -67,8 +64,13 @@ def main():
     """Função principal que coordena o início de todos os sistemas"""
     logger.info("Iniciando sistemas We Profit")
     
+    # Monitorar o arquivo de configuração para ajustes sem reiniciar
+    from config import start_config_watcher
+    start_config_watcher()
+    
     # Iniciar servidor web para anti-suspensão
     web_thread = start_web_server()
+    bot_state.register_thread("web", web_thread)
     
     # Verificar token do Discord
     token = os.environ.get("DISCORD_TOKEN")
@@ -88,14 +90,20 @@ def main():
         # Iniciar o bot Discord
         bot_thread = start_bot()
         if bot_thread:
+            bot_state.register_thread("bot", bot_thread)
             logger.info("Bot Discord iniciado com sucesso")
         else:
             logger.error("Falha ao iniciar o bot Discord")
     
-    # Manter o programa principal em execução
+    # Manter o programa principal em execução, vigiando as threads essenciais
+    encerradas = set()
     try:
         while True:
             time.sleep(1)
+            for nome, viva in bot_state.threads().items():
+                if not viva and nome not in encerradas:
+                    encerradas.add(nome)
+                    logger.error(f"Thread '{nome}' encerrou inesperadamente; /health/live passará a falhar")
     except KeyboardInterrupt:
         logger.info("Encerrando sistemas...")
         sys.exit(0)
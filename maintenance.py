@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Manutenção em massa sem iniciar o bot completo
+Usa apenas a API REST do Discord: sem IDENTIFY no gateway, sem chunking de membros
+e sem o servidor web. Reaproveita a lógica de envio e exclusão do bot (mesma fila
+de envio, mesmo limite de convocações simultâneas, mesmos buckets de rate limit
+persistidos) e os dados do histórico.
+
+Uso:
+    python maintenance.py backfill                      # exclui alertas vencidos (ex.: após o bot ficar fora do ar)
+    python maintenance.py purge [--guild ID] [--convocation ID]   # exclui alertas pendentes, vencidos ou não
+    python maintenance.py resend CONVOCACAO_ID          # reenvia a convocação aos membros cuja entrega falhou
+    python maintenance.py --dry-run purge               # apenas mostra o que seria feito
+
+DMs reenviadas entram no histórico com a auto-destruição agendada; um bot já em
+execução só as conhece após reiniciar (ou com um novo `backfill` depois do prazo).
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+from bot import WeProfit
+from config import Config
+
+
+async def excluir_alertas(bot, args):
+    """backfill (vencidos) e purge (todos os pendentes)"""
+    ate = time.time() if args.comando == "backfill" else None
+    pendentes = await asyncio.to_thread(bot.history.pending_deletions, ate,
+                                        getattr(args, "guild", None), getattr(args, "convocation", None))
+    print(f"{len(pendentes)} alertas a excluir")
+    if args.dry_run or not pendentes:
+        return 0
+
+    inicio = time.perf_counter()
+    resultado = await bot._excluir_alertas(pendentes)
+    print(f"✅ {resultado['excluidas']} excluídos, {resultado['falhas']} falhas "
+          f"em {time.perf_counter() - inicio:.1f}s")
+    return 0
+
+
+async def reenviar(bot, args):
+    """Reenvia uma convocação aos destinatários com entrega falha"""
+    convocacao = await asyncio.to_thread(bot.history.get_convocation, args.convocacao_id)
+    if convocacao is None:
+        print(f"❌ Convocação {args.convocacao_id} não encontrada no histórico", file=sys.stderr)
+        return 1
+
+    destinatarios = await asyncio.to_thread(bot.history.failed_recipients, args.convocacao_id)
+    print(f"{len(destinatarios)} destinatários com entrega falha na convocação {args.convocacao_id}")
+    if args.dry_run or not destinatarios:
+        return 0
+
+    # Mesmo embed da convocação original (autor e horário incluídos)
+    autor = await bot.fetch_user(convocacao["author_id"])
+    embed, tempo_destruicao = bot._montar_embed(convocacao["urgencia"], convocacao["detalhes"], autor,
+                                                datetime.fromtimestamp(convocacao["created_at"]))
+
+    inicio = time.perf_counter()
+    async with bot.admission.fanout_slot():
+        stats = await bot._enviar_para_destinatarios(convocacao["urgencia"], embed, destinatarios,
+                                                     tempo_destruicao, args.convocacao_id)
+    bot.history.record_resend(args.convocacao_id, stats["enviadas"])
+    print(f"✅ Reenviada para {stats['enviadas']} membros ({stats['falhas']} falhas, "
+          f"{stats['dm_fechada']} ignorados por DM fechada) em {time.perf_counter() - inicio:.1f}s")
+    return 0
+
+
+COMANDOS = {
+    "backfill": excluir_alertas,
+    "purge": excluir_alertas,
+    "resend": reenviar,
+}
+
+
+async def executar(args):
+    bot = WeProfit(headless=True)
+    try:
+        # Apenas autenticação REST (setup_hook em modo headless não inicia tarefas)
+        await bot.login(Config.TOKEN)
+        return await COMANDOS[args.comando](bot, args)
+    finally:
+        # Grava histórico, cache de DMs fechadas e buckets de rate limit aprendidos
+        await bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do bot We Profit via API REST (sem gateway)")
+    parser.add_argument("--dry-run", action="store_true", help="apenas mostrar o que seria feito")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser("backfill", help="excluir alertas com auto-destruição vencida")
+
+    purge = subparsers.add_parser("purge", help="excluir todos os alertas pendentes")
+    purge.add_argument("--guild", type=int, help="apenas alertas deste servidor")
+    purge.add_argument("--convocation", help="apenas alertas desta convocação")
+
+    resend = subparsers.add_parser("resend", help="reenviar uma convocação aos membros com entrega falha")
+    resend.add_argument("convocacao_id")
+
+    args = parser.parse_args()
+
+    if not Config.TOKEN:
+        print("❌ DISCORD_TOKEN não configurado", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(asyncio.run(executar(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registro de fontes de métricas do processo
+Componentes do bot registram funções que retornam um dicionário de contadores;
+o servidor web (ping_service) as expõe sem precisar importar o bot
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import logging
+
+logger = logging.getLogger('metrics_registry')
+
+_sources = {}
+
+
+def register_metrics(name, provider):
+    """Registra (ou substitui) uma função sem argumentos que retorna um dict de métricas"""
+    _sources[name] = provider
+
+
+def unregister_metrics(name):
+    _sources.pop(name, None)
+
+
+def collect_metrics(name=None):
+    """
+    Coleta as métricas registradas
+    Chamado a partir de outras threads: os provedores devem apenas copiar valores
+    """
+    nomes = [name] if name is not None else list(_sources)
+    resultado = {}
+    for nome in nomes:
+        provider = _sources.get(nome)
+        if provider is None:
+            continue
+        try:
+            resultado[nome] = provider()
+        except Exception as e:
+            logger.warning(f"Erro ao coletar métricas de {nome}: {e}")
+            resultado[nome] = {"error": str(e)}
+    return resultado
@@ -7,35 +7,72 @@ Fornece endpoints simples para manter o bot online
 """
 
 import os
+import json
 import time
 import threading
 import datetime
 import logging
+import hmac
 import socket
 import psutil
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Configurar logging (fila + escrita em segundo plano)
+from log_pipeline import setup_logging
+setup_logging()
 logger = logging.getLogger('ping_service')
 
 try:
-    from flask import Flask, jsonify, render_template_string
+    from flask import Flask, Response, jsonify, render_template_string, request
 except ImportError:
     logger.error("Flask não está instalado. Instale usando: pip install flask")
     raise
 
+from config import Config
+from metrics_registry import collect_metrics
+from sampler import ProfilerBusy, sample, format_collapsed
+from history_store import HistoryStore
+from bot_state import state as bot_state, SharedBotState
+from shared_metrics import SharedMetricsReader
+
 # Registra a hora de início do serviço
 start_time = time.time()
 
+# Segmento compartilhado com o bot quando o servidor roda em processos separados (ver app.py)
+shared_metrics = None
+
 # Cria a aplicação Flask
 app = Flask(__name__)
 
+# Leitor do histórico de convocações (mesmo arquivo SQLite gravado pelo bot)
+history = HistoryStore(Config.HISTORY_DB)
+
+def use_shared_state(path):
+    """
+    Passa a ler o estado e as métricas do segmento mmap gravado pelo bot
+    Usado quando o servidor web roda fora do processo do bot (gunicorn/waitress)
+    """
+    global bot_state, shared_metrics
+    shared_metrics = SharedMetricsReader(path)
+    bot_state = SharedBotState(shared_metrics)
+    logger.info(f"Servidor web lendo o estado do bot de {path}")
+
+def bot_start_time():
+    """Início do processo do bot (no modo compartilhado, o do processo que publica o segmento)"""
+    return bot_state.snapshot().get("started_at") or start_time
+
+def coletar_metricas(name=None):
+    """Métricas registradas no processo do bot, em memória ou pelo segmento compartilhado"""
+    if shared_metrics is None:
+        return collect_metrics(name)
+    blob = shared_metrics.read_blob()
+    dados = json.loads(blob) if blob else {}
+    return dados if name is None else {k: v for k, v in dados.items() if k == name}
+
+def token_valido(esperado):
+    """Compara o token Bearer da requisição com o esperado em tempo constante"""
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return hmac.compare_digest(token.encode(), esperado.encode())
+
 def format_uptime(seconds):
     """Formata o tempo de atividade em formato legível"""
     minutes, seconds = divmod(seconds, 60)
@@ -54,7 +91,7 @@ def format_uptime(seconds):
 @app.route('/')
 def home():
     """Página inicial"""
-    uptime = time.time() - start_time
+    uptime = time.time() - bot_start_time()
     formatted_uptime = format_uptime(uptime)
     
     # Obter uso de memória e CPU
@@ -180,11 +217,13 @@ def home():
 @app.route('/ping')
 def ping():
     """Endpoint para serviço de ping - mantém o bot online"""
-    uptime = time.time() - start_time
+    uptime = time.time() - bot_start_time()
     formatted_uptime = format_uptime(uptime)
     
+    pronto, _ = bot_state.readiness()
+    
     return jsonify({
-        "status": "online",
+        "status": "online" if pronto else "degradado",
         "timestamp": datetime.datetime.now().isoformat(),
         "uptime": formatted_uptime
     })
@@ -192,7 +231,7 @@ def ping():
 @app.route('/status')
 def status():
     """Endpoint para verificar o status do bot"""
-    uptime = time.time() - start_time
+    uptime = time.time() - bot_start_time()
     
     # Obter informações de sistema
     process = psutil.Process(os.getpid())
@@ -205,11 +244,15 @@ def status():
     except:
         ip_address = "Desconhecido"
     
+    pronto, motivos = bot_state.readiness()
+    
     return jsonify({
-        "status": "online",
+        "status": "online" if pronto else "degradado",
+        "problems": motivos,
+        "bot": dict(bot_state.snapshot()),
         "uptime_seconds": int(uptime),
         "uptime_formatted": format_uptime(uptime),
-        "started_at": datetime.datetime.fromtimestamp(start_time).isoformat(),
+        "started_at": datetime.datetime.fromtimestamp(bot_start_time()).isoformat(),
         "current_time": datetime.datetime.now().isoformat(),
         "hostname": hostname,
         "ip_address": ip_address,
@@ -217,6 +260,101 @@ def status():
         "cpu_percent": round(process.cpu_percent(interval=0.1), 2)
     })
 
+@app.route('/health/live')
+def health_live():
+    """Liveness: threads essenciais vivas e event loop publicando estado (503 se não)"""
+    ok, motivos = bot_state.liveness()
+    return jsonify({"status": "ok" if ok else "falha", "problems": motivos,
+                    "threads": bot_state.threads()}), 200 if ok else 503
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness: bot pronto, gateway conectado e heartbeat recente (503 se não)"""
+    ok, motivos = bot_state.readiness()
+    return jsonify({"status": "ok" if ok else "indisponível", "problems": motivos,
+                    "bot": dict(bot_state.snapshot())}), 200 if ok else 503
+
+def ocultar_incidentes(dados):
+    """Remove os incidentes de lag do loop (pilhas do código bloqueante), mantendo histograma e contagens"""
+    lag = dados.get("loop_lag")
+    if not isinstance(lag, dict):
+        return dados
+    lag = {k: v for k, v in lag.items() if k not in ("incidents", "current_incident")}
+    return {**dados, "loop_lag": lag}
+
+@app.route('/metrics')
+@app.route('/metrics/<name>')
+def metrics(name=None):
+    """
+    Endpoint com os contadores publicados pelos componentes do bot
+    Os incidentes de lag do loop (com pilhas) só são incluídos com o PROFILER_TOKEN
+    """
+    dados = coletar_metricas(name)
+    if name is not None and not dados:
+        return jsonify({"error": f"Métricas '{name}' não encontradas"}), 404
+    if not (Config.PROFILER_TOKEN and token_valido(Config.PROFILER_TOKEN)):
+        dados = ocultar_incidentes(dados)
+    return jsonify(dados)
+
+@app.route('/debug/profile')
+def profile():
+    """
+    Profiler por amostragem de todas as threads do processo por N segundos
+    Retorna collapsed stacks (compatível com flamegraph.pl/speedscope); requer PROFILER_TOKEN
+    """
+    if not Config.PROFILER_TOKEN:
+        return jsonify({"error": "Profiler desativado (configure PROFILER_TOKEN)"}), 404
+    
+    if not token_valido(Config.PROFILER_TOKEN):
+        return jsonify({"error": "Não autorizado"}), 401
+    
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz = int(request.args.get("hz", 100))
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos: seconds e hz devem ser numéricos"}), 400
+    
+    try:
+        pilhas = sample(seconds, hz)
+    except ProfilerBusy:
+        return jsonify({"error": "Já existe uma amostragem em andamento"}), 409
+    
+    logger.info(f"Perfil coletado: {sum(pilhas.values())} amostras em {seconds:g}s")
+    return Response(format_collapsed(pilhas), mimetype="text/plain")
+
+@app.route('/api/history/<consulta>')
+@app.route('/api/history/users/<int:user_id>')
+def history_api(consulta="users", user_id=None):
+    """
+    API paginada do histórico de convocações
+      /api/history/convocations?guild_id=&urgencia=&limit=&cursor=
+      /api/history/missed?guild_id=&urgencia=&last=5&limit=&offset=
+      /api/history/users/<user_id>?limit=&cursor=
+    Requer HISTORY_API_TOKEN (dados de membros e presenças)
+    """
+    if not Config.HISTORY_API_TOKEN:
+        return jsonify({"error": "API de histórico desativada (configure HISTORY_API_TOKEN)"}), 404
+    
+    if not token_valido(Config.HISTORY_API_TOKEN):
+        return jsonify({"error": "Não autorizado"}), 401
+    
+    args = request.args
+    try:
+        if consulta == "users" and user_id is not None:
+            return jsonify(history.user_history(user_id, args.get("cursor"), args.get("limit", 20)))
+        
+        guild_id = int(args["guild_id"])
+        if consulta == "convocations":
+            return jsonify(history.list_convocations(guild_id, args.get("urgencia"), args.get("cursor"),
+                                                     args.get("limit", 20)))
+        if consulta == "missed":
+            return jsonify(history.missed(guild_id, args.get("urgencia"), args.get("last", 5),
+                                          args.get("limit", 50), int(args.get("offset", 0))))
+    except (KeyError, ValueError):
+        return jsonify({"error": "Parâmetros inválidos: guild_id é obrigatório e os demais numéricos"}), 400
+    
+    return jsonify({"error": f"Consulta '{consulta}' desconhecida"}), 404
+
 def start_ping_service():
     """Inicia o serviço web para anti-suspensão"""
     logger.info("Iniciando serviço de ping...")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistência do estado de rate limit aprendido pelo cliente HTTP do discord.py
+Após uma reinicialização o cliente não sabe mais a qual bucket cada rota pertence
+nem quantas requisições restam em cada um, e reaprende isso tomando 429s.
+Este módulo salva periodicamente (e no desligamento) os hashes de bucket por rota,
+o restante e o horário de reset de cada bucket ainda válido, e os restaura ao iniciar.
+
+Usa atributos internos do HTTPClient (_bucket_hashes, _buckets e Ratelimit);
+se a versão do discord.py mudar esses nomes, a restauração é ignorada com um aviso.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger('ratelimit_state')
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot(http, loop):
+    """
+    Captura o estado atual dos buckets (deve rodar no event loop do bot)
+
+    Returns:
+        dict serializável em JSON
+    """
+    agora_loop = loop.time()
+    agora = time.time()
+    buckets = {}
+
+    for key, ratelimit in list(getattr(http, "_buckets", {}).items()):
+        expires = getattr(ratelimit, "expires", None)
+        # Buckets sem reset pendente não carregam informação útil além do hash
+        if expires is None or expires <= agora_loop:
+            continue
+        buckets[key] = {
+            "limit": ratelimit.limit,
+            "remaining": ratelimit.remaining,
+            "reset_at": agora + (expires - agora_loop),
+            "reset_after": ratelimit.reset_after
+        }
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": agora,
+        "bucket_hashes": dict(getattr(http, "_bucket_hashes", {})),
+        "buckets": buckets
+    }
+
+
+def restore(http, loop, data):
+    """
+    Reaplica um snapshot ao HTTPClient (deve rodar no event loop do bot)
+
+    Returns:
+        tuple: (hashes de rota restaurados, buckets restaurados)
+    """
+    if not data or data.get("version") != SNAPSHOT_VERSION:
+        return 0, 0
+
+    try:
+        hashes = data.get("bucket_hashes", {})
+        http._bucket_hashes.update(hashes)
+
+        agora = time.time()
+        restaurados = 0
+        for key, estado in data.get("buckets", {}).items():
+            restante = estado["reset_at"] - agora
+            # Bucket esgotado: o discord.py só acorda quem espera ao fim de uma requisição em
+            # andamento, que não existe após reiniciar; sem restaurá-lo, o bucket é reaprendido
+            if restante <= 0 or estado["remaining"] <= 0:
+                continue
+            ratelimit = http.get_ratelimit(key)
+            ratelimit.limit = estado["limit"]
+            ratelimit.remaining = estado["remaining"]
+            ratelimit.reset_after = restante
+            ratelimit.expires = loop.time() + restante
+            ratelimit.dirty = True
+            restaurados += 1
+    except (AttributeError, KeyError, TypeError) as e:
+        logger.warning(f"Estado de rate limit incompatível com esta versão do discord.py: {e}")
+        return 0, 0
+
+    return len(hashes), restaurados
+
+
+def load(path):
+    """Lê o snapshot do disco (None se não existir ou estiver corrompido)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Não foi possível carregar o estado de rate limit: {e}")
+        return None
+
+
+def save(path, data):
+    """Grava o snapshot em disco (escrita atômica); pode rodar fora do event loop"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
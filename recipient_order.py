@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ordem de envio das DMs de uma convocação
+Quem tem mais chance de agir recebe o alerta nos primeiros segundos de um envio
+longo: membros conectados (com o intent de presença ativo), depois quem confirmou
+presença recentemente no histórico e, por fim, os demais. Dentro de cada faixa a
+ordem original (servidor de origem primeiro) é mantida.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+from collections import Counter
+
+# Faixas configuráveis em Config.RECIPIENT_ORDER; quem não cai em nenhuma vai por último
+TIERS = ("online", "responders")
+
+# Dentro da faixa online: disponíveis antes de ausentes e não perturbe
+STATUS_RANK = {"online": 0, "idle": 1, "dnd": 2}
+
+
+def order_recipients(destinatarios, tiers, status=None, responders=None):
+    """
+    Reordena os destinatários pelas faixas de prioridade
+
+    Args:
+        destinatarios: {member_id: guild_id}
+        tiers: faixas em ordem de prioridade (subconjunto de TIERS); vazio mantém a ordem
+        status: {member_id: "online" | "idle" | "dnd"} dos membros conectados
+        responders: {member_id: instante da última confirmação de presença}
+    Returns:
+        tuple: ({member_id: guild_id} reordenado, Counter de destinatários por faixa)
+    """
+    status = status or {}
+    responders = responders or {}
+
+    def chave(member_id):
+        for posicao, faixa in enumerate(tiers):
+            if faixa == "online" and member_id in status:
+                return posicao, STATUS_RANK.get(status[member_id], len(STATUS_RANK)), faixa
+            if faixa == "responders" and member_id in responders:
+                # Confirmações mais recentes primeiro
+                return posicao, -responders[member_id], faixa
+        return len(tiers), 0, "rest"
+
+    chaves = {member_id: chave(member_id) for member_id in destinatarios}
+    # sorted é estável: empates mantêm a ordem original
+    ordem = sorted(destinatarios, key=lambda member_id: chaves[member_id][:2])
+    contagem = Counter(chaves[member_id][2] for member_id in ordem)
+    return {member_id: destinatarios[member_id] for member_id in ordem}, contagem
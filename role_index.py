@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice cargo -> membros para convocações direcionadas
+O índice é montado uma vez por servidor e mantido pelos eventos de membros,
+permitindo resolver destinatários com operações de conjunto em vez de
+percorrer guild.members a cada convocação
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import re
+import logging
+
+logger = logging.getLogger('role_index')
+
+# Menção de cargo (<@&id>) ou ID numérico, opcionalmente precedido de - ou ! para excluir
+ROLE_TOKEN = re.compile(r'^([-!]?)(?:<@&(\d{15,20})>|(\d{15,20}))$')
+
+
+def parse_role_tokens(texto):
+    """
+    Separa menções de cargo do início de um texto
+
+    Returns:
+        tuple: (ids incluídos, ids excluídos, restante do texto ou None)
+    """
+    incluir, excluir = set(), set()
+    if not texto:
+        return incluir, excluir, texto
+
+    partes = texto.split()
+    consumidos = 0
+    for parte in partes:
+        match = ROLE_TOKEN.match(parte)
+        if not match:
+            break
+        role_id = int(match.group(2) or match.group(3))
+        (excluir if match.group(1) else incluir).add(role_id)
+        consumidos += 1
+
+    restante = " ".join(partes[consumidos:]) or None
+    return incluir, excluir, restante
+
+
+class RoleIndex:
+    """Mantém, por servidor, os conjuntos de IDs de membros (não-bots) de cada cargo"""
+
+    def __init__(self):
+        self._roles = {}    # guild_id -> {role_id: set(member_id)}
+        self._members = {}  # guild_id -> set(member_id)
+
+    def has_guild(self, guild_id):
+        return guild_id in self._members
+
+    def build_guild(self, guild):
+        """Monta o índice de um servidor a partir do cache de membros"""
+        roles = {}
+        members = set()
+        for membro in guild.members:
+            if membro.bot:
+                continue
+            members.add(membro.id)
+            for role in membro.roles:
+                roles.setdefault(role.id, set()).add(membro.id)
+
+        self._roles[guild.id] = roles
+        self._members[guild.id] = members
+        logger.info(f"Índice de cargos montado para {guild.name}: {len(members)} membros, {len(roles)} cargos")
+
+    def remove_guild(self, guild_id):
+        self._roles.pop(guild_id, None)
+        self._members.pop(guild_id, None)
+
+    def add_member(self, member):
+        if member.bot or member.guild.id not in self._members:
+            return
+        self._members[member.guild.id].add(member.id)
+        roles = self._roles[member.guild.id]
+        for role in member.roles:
+            roles.setdefault(role.id, set()).add(member.id)
+
+    def remove_member(self, guild_id, member_id):
+        if guild_id not in self._members:
+            return
+        self._members[guild_id].discard(member_id)
+        for ids in self._roles[guild_id].values():
+            ids.discard(member_id)
+
+    def update_member(self, before, after):
+        """Aplica apenas a diferença de cargos entre os dois estados do membro"""
+        if after.bot or after.guild.id not in self._members:
+            return
+        antes = {role.id for role in before.roles}
+        depois = {role.id for role in after.roles}
+        if antes == depois:
+            return
+
+        roles = self._roles[after.guild.id]
+        for role_id in depois - antes:
+            roles.setdefault(role_id, set()).add(after.id)
+        for role_id in antes - depois:
+            ids = roles.get(role_id)
+            if ids is not None:
+                ids.discard(after.id)
+
+    def remove_role(self, guild_id, role_id):
+        if guild_id in self._roles:
+            self._roles[guild_id].pop(role_id, None)
+
+    def resolve(self, guild_id, incluir=None, excluir=None):
+        """
+        Resolve os IDs de destinatários de um servidor
+
+        Args:
+            incluir: IDs de cargos; membros de qualquer um deles são incluídos
+                     (vazio = todos os membros)
+            excluir: IDs de cargos cujos membros são removidos do resultado
+        """
+        roles = self._roles.get(guild_id, {})
+        if incluir:
+            destinatarios = set().union(*(roles.get(role_id, ()) for role_id in incluir))
+        else:
+            destinatarios = set(self._members.get(guild_id, ()))
+
+        if excluir:
+            destinatarios.difference_update(*(roles.get(role_id, ()) for role_id in excluir))
+
+        return destinatarios
+
+    def resolve_union(self, alvos):
+        """
+        Resolve destinatários de vários servidores sem duplicatas
+
+        Args:
+            alvos: lista de (guild_id, incluir, excluir) em ordem de prioridade;
+                   quem está em vários servidores fica com o primeiro da lista
+
+        Returns:
+            tuple: ({member_id: guild_id}, {guild_id: duplicados evitados})
+        """
+        destinatarios = {}
+        duplicados = {}
+        for guild_id, incluir, excluir in alvos:
+            ids = self.resolve(guild_id, incluir, excluir)
+            novos = ids.difference(destinatarios)
+            duplicados[guild_id] = len(ids) - len(novos)
+            destinatarios.update(dict.fromkeys(novos, guild_id))
+        return destinatarios, duplicados
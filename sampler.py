@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profiler por amostragem para uso em produção
+Coleta periodicamente a pilha de todas as threads (loop do bot, Flask, monitores)
+com sys._current_frames() e agrega no formato "collapsed stacks"
+(uma linha "thread;func1;func2 contagem"), aceito por flamegraph.pl, speedscope etc.
+Não instala hooks de tracing: o custo é proporcional à frequência de amostragem.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# Limites de segurança para o endpoint
+MAX_DURATION = 60
+MAX_HZ = 1000
+
+# Apenas um perfil por vez no processo
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Já existe uma amostragem em andamento"""
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    partes = []
+    while frame is not None:
+        partes.append(_frame_label(frame))
+        frame = frame.f_back
+    partes.reverse()
+    return ";".join(partes)
+
+
+def sample(duration, hz=100):
+    """
+    Amostra as pilhas de todas as threads (exceto a própria) por `duration` segundos
+
+    Returns:
+        Counter: pilha colapsada -> número de amostras
+    Raises:
+        ProfilerBusy: se outra amostragem já estiver em andamento
+    """
+    duration = max(0.1, min(float(duration), MAX_DURATION))
+    hz = max(1, min(int(hz), MAX_HZ))
+    intervalo = 1.0 / hz
+
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+
+    try:
+        proprio = threading.get_ident()
+        pilhas = Counter()
+        nomes = {}
+        fim = time.monotonic() + duration
+        proxima = time.monotonic()
+
+        while True:
+            agora = time.monotonic()
+            if agora >= fim:
+                break
+            if len(nomes) != threading.active_count():
+                nomes = {t.ident: t.name for t in threading.enumerate()}
+
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                nome = nomes.get(ident, f"thread-{ident}").replace(";", "_").replace(" ", "_")
+                pilhas[f"{nome};{_collapse(frame)}"] += 1
+
+            # Intervalo fixo entre amostras, sem acumular atraso
+            proxima += intervalo
+            espera = proxima - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                proxima = time.monotonic()
+
+        return pilhas
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(pilhas):
+    """Converte o resultado de sample() em texto no formato collapsed stacks"""
+    return "\n".join(f"{pilha} {contagem}" for pilha, contagem in pilhas.most_common()) + "\n"
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Convocações agendadas com fan-out pré-aquecido
+Cada agendamento vira uma tarefa que dorme até alguns minutos antes do horário,
+prepara a convocação (destinatários resolvidos, embed montado), abre os canais
+de DM com prioridade mínima na fila de envio e, no horário, dispara usando o
+orçamento de rate limit apenas para os envios.
+
+Os agendamentos são persistidos no histórico (tabela scheduled) pelo bot;
+este módulo cuida apenas do tempo de cada etapa.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import re
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger('scheduled_convocations')
+
+# "+90m", "+2h", "+1h30m"
+RELATIVO = re.compile(r'^\+(?:(\d+)h)?(?:(\d+)m(?:in)?)?$')
+
+# Maior passo de espera: mantém a tarefa em dia com ajustes do relógio do sistema
+MAX_SLEEP = 60
+
+
+def parse_fire_time(texto, agora):
+    """
+    Interpreta o horário de disparo
+
+    Formatos: "HH:MM" (hoje, ou amanhã se já passou), "DD/MM HH:MM" (este ano, ou o
+    próximo se já passou), "DD/MM/AAAA HH:MM", "+90m", "+2h", "+1h30m"
+
+    Args:
+        agora: datetime de referência (com fuso horário)
+    Returns:
+        datetime no mesmo fuso de `agora`
+    Raises:
+        ValueError: formato não reconhecido
+    """
+    texto = texto.strip().lower()
+
+    relativo = RELATIVO.match(texto)
+    if relativo and any(relativo.groups()):
+        horas, minutos = (int(g or 0) for g in relativo.groups())
+        return agora + timedelta(hours=horas, minutes=minutos)
+
+    for formato in ("%H:%M", "%d/%m %H:%M", "%d/%m/%Y %H:%M"):
+        try:
+            # Sem ano, lê em um ano bissexto para aceitar 29/02
+            lido = (datetime.strptime(f"{texto} 2000", f"{formato} %Y") if formato == "%d/%m %H:%M"
+                    else datetime.strptime(texto, formato))
+        except ValueError:
+            continue
+        if formato == "%H:%M":
+            horario = agora.replace(hour=lido.hour, minute=lido.minute, second=0, microsecond=0)
+            return horario if horario > agora else horario + timedelta(days=1)
+        if formato == "%d/%m/%Y %H:%M":
+            return agora.replace(year=lido.year, month=lido.month, day=lido.day, hour=lido.hour,
+                                 minute=lido.minute, second=0, microsecond=0)
+        # Sem ano: a próxima ocorrência da data (este ano ou o seguinte)
+        for ano in range(agora.year, agora.year + 5):
+            try:
+                horario = agora.replace(year=ano, month=lido.month, day=lido.day, hour=lido.hour,
+                                        minute=lido.minute, second=0, microsecond=0)
+            except ValueError:
+                # 29/02 fora de ano bissexto
+                continue
+            if horario > agora:
+                return horario
+
+    raise ValueError("use HH:MM, DD/MM HH:MM, DD/MM/AAAA HH:MM ou +90m")
+
+
+async def sleep_until(timestamp):
+    """Dorme até o horário (epoch), em passos curtos"""
+    while (restante := timestamp - time.time()) > 0:
+        await asyncio.sleep(min(restante, MAX_SLEEP))
+
+
+class ConvocationSchedule:
+    """
+    Executa os agendamentos em três etapas, chamando funções do bot:
+        preparar(item) -> preparo ou None     (alguns minutos antes)
+        aquecer(item, preparo)                (em segundo plano até o horário)
+        disparar(item, preparo)               (no horário; preparo pode ser None)
+        expirar(item)                         (horário perdido há mais que max_late)
+    """
+
+    def __init__(self, preparar, aquecer, disparar, expirar, prewarm_seconds=300, max_late_seconds=1800):
+        self.preparar = preparar
+        self.aquecer = aquecer
+        self.disparar = disparar
+        self.expirar = expirar
+        self.prewarm = prewarm_seconds
+        self.max_late = max_late_seconds
+        self._items = {}  # id -> item
+        self._tasks = {}  # id -> asyncio.Task
+        self.fired = 0
+        self.expired = 0
+
+    def add(self, item):
+        """Agenda a execução de um item (dict com id, guild_id e fire_at)"""
+        self._items[item["id"]] = item
+        task = asyncio.get_running_loop().create_task(self._executar(item))
+        self._tasks[item["id"]] = task
+        task.add_done_callback(lambda t: self._on_done(item["id"], t))
+
+    def cancel(self, scheduled_id):
+        """Cancela um agendamento ainda não disparado; retorna o item ou None"""
+        item = self._items.get(scheduled_id)
+        task = self._tasks.get(scheduled_id)
+        if item is None or task is None or item.get("disparando"):
+            return None
+        task.cancel()
+        return item
+
+    def pending(self, guild_id=None):
+        itens = [item for item in self._items.values() if guild_id is None or item["guild_id"] == guild_id]
+        return sorted(itens, key=lambda item: item["fire_at"])
+
+    def _on_done(self, scheduled_id, task):
+        self._items.pop(scheduled_id, None)
+        self._tasks.pop(scheduled_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erro no agendamento {scheduled_id}: {task.exception()}")
+
+    async def _executar(self, item):
+        if time.time() - item["fire_at"] > self.max_late:
+            self.expired += 1
+            await self.expirar(item)
+            return
+
+        # Preparação: destinatários e embed alguns minutos antes do horário
+        await sleep_until(item["fire_at"] - self.prewarm)
+        preparo = await self.preparar(item)
+
+        aquecimento = None
+        if preparo is not None:
+            aquecimento = asyncio.get_running_loop().create_task(self.aquecer(item, preparo))
+        try:
+            await sleep_until(item["fire_at"])
+        finally:
+            # No horário (ou no cancelamento), o que faltou aquecer fica para o envio
+            if aquecimento is not None and not aquecimento.done():
+                aquecimento.cancel()
+
+        item["disparando"] = True
+        self.fired += 1
+        await self.disparar(item, preparo)
+
+    def stats(self):
+        proximo = min((item["fire_at"] for item in list(self._items.values())), default=None)
+        return {
+            "pending": len(self._items),
+            "next_fire_in_seconds": round(proximo - time.time()) if proximo else None,
+            "fired": self.fired,
+            "expired": self.expired
+        }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fila de envio compartilhada entre convocações concorrentes
+Cada envio de DM pede uma vaga ao agendador, que libera vagas em ritmo fixo
+(orçamento de rate limit compartilhado) e sempre na ordem de urgência:
+alta > média > baixa. Enquanto houver uma convocação mais urgente em andamento,
+as de menor prioridade ficam pausadas.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import math
+import heapq
+import asyncio
+import logging
+import itertools
+import contextlib
+from collections import Counter
+
+logger = logging.getLogger('send_scheduler')
+
+# Menor valor = maior prioridade
+# "aquecimento" (abertura antecipada de DMs de agendamentos) só avança sem convocações ativas
+PRIORIDADES = {
+    "alta": 0,
+    "média": 1,
+    "baixa": 2,
+    "aquecimento": 3
+}
+
+
+def prioridade(urgencia):
+    """Converte o nível de urgência em prioridade numérica"""
+    urgencia = urgencia.lower()
+    if urgencia == "media":
+        urgencia = "média"
+    return PRIORIDADES.get(urgencia, PRIORIDADES["baixa"])
+
+
+class SendScheduler:
+    """Libera vagas de envio por prioridade, com intervalo mínimo entre envios"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._waiters = []  # heap de (prioridade, seq, future)
+        self._seq = itertools.count()
+        self._active_jobs = Counter()  # prioridade -> convocações em andamento
+        self._changed = asyncio.Event()
+        self._next_slot = 0.0
+        self._dispatcher = None
+        self.granted = Counter()  # prioridade -> vagas concedidas
+
+    @contextlib.asynccontextmanager
+    async def job(self, urgencia):
+        """Registra uma convocação em andamento durante o bloco"""
+        prio = prioridade(urgencia)
+        self._active_jobs[prio] += 1
+        self._changed.set()
+        try:
+            yield
+        finally:
+            self._active_jobs[prio] -= 1
+            if self._active_jobs[prio] <= 0:
+                del self._active_jobs[prio]
+            self._changed.set()
+
+    async def acquire(self, urgencia):
+        """Aguarda a vez de enviar a próxima mensagem"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (prioridade(urgencia), next(self._seq), future))
+        self._ensure_dispatcher()
+        self._changed.set()
+        await future
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _highest_active(self):
+        """Prioridade da convocação ativa mais urgente (infinito sem convocações: tudo é liberado)"""
+        return min(self._active_jobs) if self._active_jobs else math.inf
+
+    async def _wait_change(self):
+        self._changed.clear()
+        await self._changed.wait()
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Descarta pedidos cancelados (ex.: convocação interrompida)
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+
+            if not self._waiters:
+                await self._wait_change()
+                continue
+
+            # Pausa pedidos de menor prioridade enquanto houver convocação mais urgente ativa
+            if self._waiters[0][0] > self._highest_active():
+                await self._wait_change()
+                continue
+
+            delay = self._next_slot - loop.time()
+            if delay > 0:
+                # Reavalia após a espera: um pedido mais urgente pode ter chegado
+                await asyncio.sleep(delay)
+                continue
+
+            prio, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
+            self.granted[prio] += 1
+            self._next_slot = loop.time() + self.interval
+
+    def stats(self):
+        """Retorna contadores para monitoramento"""
+        nomes = {v: k for k, v in PRIORIDADES.items()}
+        return {
+            "interval": self.interval,
+            "waiting": sum(1 for w in self._waiters if not w[2].done()),
+            "active_jobs": {nomes[p]: n for p, n in self._active_jobs.items()},
+            "granted": {nomes[p]: n for p, n in self.granted.items()}
+        }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Segmento de métricas compartilhado via mmap
+O bot grava o snapshot de estado (gauges numéricos em posições fixas) e o JSON das
+métricas registradas em um arquivo mapeado em memória. Processos do servidor web
+(gunicorn/waitress com vários workers) leem o segmento sem importar o bot, sem
+sockets e sem disputar o GIL do processo do bot.
+
+Layout (little-endian):
+    cabeçalho   magic(8) versão(H) campos(H) capacidade_json(I) pid(q) seq(Q)
+    gauges      FIELDS x float64 (NaN = ausente)
+    json        tamanho(I) + bytes
+
+A consistência usa um seqlock: o escritor deixa `seq` ímpar durante a gravação e o
+leitor repete a leitura se `seq` estiver ímpar ou mudar no meio.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import math
+import mmap
+import struct
+import logging
+
+logger = logging.getLogger('shared_metrics')
+
+MAGIC = b"WPMETR01"
+VERSION = 1
+
+# Gauges publicados pelo bot, em ordem fixa (acrescente apenas no final e suba VERSION)
+FIELDS = (
+    "published_at",
+    "started_at",
+    "ready",
+    "connected",
+    "latency_ms",
+    "heartbeat_ack_at",
+    "guilds",
+    "members",
+    "convocations_in_flight",
+    "convocations_waiting",
+    "send_jobs",
+    "pending_deletions",
+)
+BOOL_FIELDS = {"ready", "connected"}
+INT_FIELDS = {"guilds", "members", "convocations_in_flight", "convocations_waiting", "send_jobs",
+              "pending_deletions"}
+
+HEADER = struct.Struct("<8sHHIqQ")
+SEQ_OFFSET = 24
+VALUES = struct.Struct(f"<{len(FIELDS)}d")
+VALUES_OFFSET = HEADER.size
+BLOB_LEN = struct.Struct("<I")
+BLOB_OFFSET = VALUES_OFFSET + VALUES.size
+SEQ = struct.Struct("<Q")
+
+DEFAULT_BLOB_CAPACITY = 256 * 1024
+MAX_READ_ATTEMPTS = 100
+
+
+class SharedMetricsWriter:
+    """Lado do bot: cria o segmento e publica gauges e o JSON de métricas"""
+
+    def __init__(self, path, blob_capacity=DEFAULT_BLOB_CAPACITY):
+        self.path = path
+        self.blob_capacity = blob_capacity
+        self._seq = 0
+        self._gauges = {}
+        self._blob = b""
+        self._blob_truncado = False
+
+        # Cria em um arquivo temporário e troca atomicamente: leitores nunca veem um cabeçalho parcial
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        tamanho = BLOB_OFFSET + BLOB_LEN.size + blob_capacity
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, tamanho)
+            self._mm = mmap.mmap(fd, tamanho)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, len(FIELDS), blob_capacity, os.getpid(), 0)
+        VALUES.pack_into(self._mm, VALUES_OFFSET, *([math.nan] * len(FIELDS)))
+        BLOB_LEN.pack_into(self._mm, BLOB_OFFSET, 0)
+        os.replace(tmp_path, path)
+
+    def write(self, gauges=None, blob=None):
+        """Atualiza gauges (campos conhecidos de FIELDS) e/ou o JSON de métricas"""
+        if gauges is not None:
+            self._gauges.update((k, v) for k, v in gauges.items() if k in FIELDS)
+        if blob is not None:
+            if len(blob) > self.blob_capacity:
+                if not self._blob_truncado:
+                    logger.warning(f"Métricas ({len(blob)} bytes) excedem o segmento compartilhado "
+                                   f"({self.blob_capacity} bytes); JSON não publicado")
+                    self._blob_truncado = True
+                blob = b""
+            self._blob = blob
+
+        valores = [_encode(self._gauges.get(campo)) for campo in FIELDS]
+
+        self._seq += 1
+        SEQ.pack_into(self._mm, SEQ_OFFSET, self._seq)
+        VALUES.pack_into(self._mm, VALUES_OFFSET, *valores)
+        if blob is not None:
+            BLOB_LEN.pack_into(self._mm, BLOB_OFFSET, len(self._blob))
+            self._mm[BLOB_OFFSET + BLOB_LEN.size:BLOB_OFFSET + BLOB_LEN.size + len(self._blob)] = self._blob
+        self._seq += 1
+        SEQ.pack_into(self._mm, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        self._mm.close()
+
+
+class SharedMetricsReader:
+    """Lado do servidor web: lê o segmento publicado pelo bot (reabre se o bot recriá-lo)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = None
+        self._inode = None
+        self.pid = None
+
+    def _mapa(self):
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self._fechar()
+            return None
+
+        if self._mm is None or inode != self._inode:
+            self._fechar()
+            try:
+                with open(self.path, 'rb') as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Não foi possível mapear {self.path}: {e}")
+                return None
+
+            magic, versao, campos, _, pid, _ = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or versao != VERSION or campos != len(FIELDS):
+                logger.warning(f"Segmento de métricas incompatível em {self.path} (versão {versao})")
+                mm.close()
+                return None
+            self._mm, self._inode, self.pid = mm, inode, pid
+        return self._mm
+
+    def _fechar(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = self._inode = None
+
+    def _ler(self, leitura):
+        mm = self._mapa()
+        if mm is None:
+            return None
+        for _ in range(MAX_READ_ATTEMPTS):
+            antes = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+            if antes % 2:
+                continue
+            resultado = leitura(mm)
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == antes:
+                return resultado
+        return None
+
+    def read(self):
+        """Gauges publicados pelo bot ({campo: valor}), ou None se o segmento não existir"""
+        valores = self._ler(lambda mm: VALUES.unpack_from(mm, VALUES_OFFSET))
+        if valores is None:
+            return None
+        return {campo: _decode(campo, valor) for campo, valor in zip(FIELDS, valores)}
+
+    def read_blob(self):
+        """Bytes do JSON de métricas publicado pelo bot, ou None"""
+        def leitura(mm):
+            tamanho = BLOB_LEN.unpack_from(mm, BLOB_OFFSET)[0]
+            inicio = BLOB_OFFSET + BLOB_LEN.size
+            return bytes(mm[inicio:inicio + tamanho])
+        return self._ler(leitura)
+
+
+def _encode(valor):
+    if valor is None:
+        return math.nan
+    return float(valor)
+
+
+def _decode(campo, valor):
+    if math.isnan(valor):
+        return None
+    if campo in BOOL_FIELDS:
+        return bool(valor)
+    if campo in INT_FIELDS:
+        return int(valor)
+    return valor
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Spans de tempo das etapas de uma convocação e da auto-destruição
+Cada operação raiz (uma convocação, uma varredura de exclusões) é amostrada com
+probabilidade SPAN_SAMPLE_RATE; só as amostradas registram spans. Fora de uma
+operação amostrada, span() devolve um objeto vazio reutilizado (custo de um
+ContextVar.get).
+
+As operações concluídas são exportadas em lote por uma thread dedicada para um
+arquivo no formato Chrome Trace Event (JSON), aberto por ui.perfetto.dev,
+chrome://tracing ou speedscope. Cada operação aparece em uma linha própria. O
+arquivo é mantido como JSON válido a cada lote e rotacionado por tamanho
+(spans.json, spans.1.json, ...).
+
+Uso:
+    with tracer.trace("convocacao", urgencia="alta"):
+        with span("create_dm"):
+            ...
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import logging
+import itertools
+import threading
+import contextlib
+import contextvars
+
+logger = logging.getLogger('span_tracer')
+
+# Limite de spans guardados por operação (uma convocação grande gera vários por membro)
+MAX_SPANS_PER_TRACE = 20000
+
+_HEAD = b"[\n"
+_TAIL = b"\n]\n"
+
+_current = contextvars.ContextVar("span_trace", default=None)
+
+
+class _NoopSpan:
+    """Span de operações não amostradas: não mede nada"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+    def set(self, **args):
+        """Acrescenta atributos ao span (aparecem em "args" no visualizador)"""
+        self.args.update(args)
+
+
+class _Trace:
+    """Spans de uma operação amostrada, guardados até ela terminar"""
+    __slots__ = ("tid", "name", "root", "spans", "dropped")
+
+    def __init__(self, tid, name):
+        self.tid = tid
+        self.name = name
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, name, start, end, args):
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append((name, start, end, args))
+        else:
+            self.dropped += 1
+
+
+def span(name, **args):
+    """Mede um trecho dentro da operação amostrada atual (ou nada, se não houver)"""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, args)
+
+
+def annotate(**args):
+    """Acrescenta atributos ao span raiz da operação atual (ex.: ID da convocação)"""
+    trace = _current.get()
+    if trace is not None and trace.root is not None:
+        trace.root.args.update(args)
+
+
+class SpanTracer:
+    """Amostragem das operações raiz e exportação em lote para arquivo rotativo"""
+
+    def __init__(self, directory, sample_rate=0.2, max_bytes=20 * 1024 * 1024, backups=5, export_interval=5):
+        self.path = os.path.join(directory, "spans.json")
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.export_interval = export_interval
+        self._pid = os.getpid()
+        self._tids = itertools.count(1)
+        # Converte perf_counter_ns em tempo de parede (linhas comparáveis entre reinícios)
+        self._offset_ns = time.time_ns() - time.perf_counter_ns()
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.sampled = 0
+        self.exported = 0
+        self.dropped = 0
+
+    @contextlib.contextmanager
+    def trace(self, name, **args):
+        """
+        Operação raiz: decide a amostragem e exporta os spans ao terminar
+        Dentro de outra operação amostrada, vira apenas um span dela
+        """
+        if _current.get() is not None:
+            with span(name, **args) as interno:
+                yield interno
+            return
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            yield _NOOP
+            return
+
+        self.sampled += 1
+        atual = _Trace(next(self._tids), name)
+        raiz = atual.root = _Span(atual, name, args)
+        token = _current.set(atual)
+        try:
+            with raiz:
+                yield raiz
+        finally:
+            _current.reset(token)
+            self._enviar(atual)
+
+    def _enviar(self, atual):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="span-exporter", daemon=True)
+                    self._writer.start()
+        self._queue.put(atual)
+
+    def _eventos(self, atual):
+        """Converte uma operação em eventos do formato Chrome Trace"""
+        rotulo = atual.name + (f" {atual.root.args['id']}" if "id" in atual.root.args else "")
+        eventos = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": atual.tid,
+                    "args": {"name": rotulo}}]
+        for nome, inicio, fim, args in atual.spans:
+            evento = {"name": nome, "cat": atual.name, "ph": "X", "pid": self._pid, "tid": atual.tid,
+                      "ts": (inicio + self._offset_ns) // 1000, "dur": (fim - inicio) // 1000}
+            if args:
+                evento["args"] = args
+            eventos.append(evento)
+        if atual.dropped:
+            self.dropped += atual.dropped
+            eventos[-1].setdefault("args", {})["spans_descartados"] = atual.dropped
+        return eventos
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            lote = [item]
+            # Acumula as operações que terminarem no intervalo e grava de uma vez
+            limite = time.monotonic() + self.export_interval
+            fim = False
+            while (restante := limite - time.monotonic()) > 0:
+                try:
+                    item = self._queue.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is None:
+                    fim = True
+                    break
+                lote.append(item)
+            try:
+                self._gravar([evento for atual in lote for evento in self._eventos(atual)])
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Falha ao exportar spans: {e}", extra={"aggregate": "falhas ao exportar spans"})
+            if fim:
+                return
+
+    def _gravar(self, eventos):
+        corpo = ",\n".join(json.dumps(e, separators=(",", ":"), ensure_ascii=False, default=str)
+                           for e in eventos).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            tamanho = os.path.getsize(self.path)
+        except FileNotFoundError:
+            tamanho = 0
+        if tamanho >= self.max_bytes:
+            self._rotacionar()
+            tamanho = 0
+
+        if tamanho < len(_HEAD) + len(_TAIL):
+            with open(self.path, 'wb') as f:
+                f.write(_HEAD + corpo + _TAIL)
+        else:
+            # Substitui o "]" final: o arquivo continua sendo um JSON válido após cada lote
+            with open(self.path, 'r+b') as f:
+                f.seek(-len(_TAIL), os.SEEK_END)
+                f.write(b",\n" + corpo + _TAIL)
+        self.exported += len(eventos)
+
+    def _rotacionar(self):
+        base, ext = os.path.splitext(self.path)
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{base}.{i}{ext}"):
+                os.replace(f"{base}.{i}{ext}", f"{base}.{i + 1}{ext}")
+        if self.backups > 0:
+            os.replace(self.path, f"{base}.1{ext}")
+        else:
+            os.remove(self.path)
+
+    def close(self, timeout=10):
+        """Exporta o que falta (chamado no encerramento)"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "exported_events": self.exported,
+            "dropped_spans": self.dropped,
+            "queued": self._queue.qsize()
+        }
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("psutil")
+
+import auto_restart
+
+
+def test_memory_optimization_runs_once_per_deferral(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(auto_restart, "optimize_memory_usage", lambda bot=None: chamadas.append(1))
+    monkeypatch.setattr(auto_restart, "get_memory_usage", lambda: auto_restart.MEMORY_THRESHOLD_MB * 1.2)
+    monkeypatch.setattr(auto_restart, "RESTART_STATE", {"pending_reason": None, "deferred_since": None,
+                                                        "deferred_by": []})
+
+    memoria = auto_restart.MEMORY_THRESHOLD_MB * 1.2
+    assert auto_restart.restart_reason(memoria)
+    assert len(chamadas) == 1
+
+    # Reinício adiado: as próximas verificações não repetem a coleta
+    auto_restart.RESTART_STATE["deferred_since"] = 1.0
+    for _ in range(3):
+        assert auto_restart.restart_reason(memoria)
+    assert len(chamadas) == 1
@@ -0,0 +1,36 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from digest import split_recipients, mention_chunks
+
+
+def test_split_recipients_keeps_dm_for_other_guilds_and_dm_ok():
+    por_dm, resumo = split_recipients({1: 10, 2: 10, 3: 20}, {10}, dm_ok={2})
+    assert por_dm == {2: 10, 3: 20}
+    assert resumo == {10: [1]}
+
+
+def test_mention_chunks_respect_limit():
+    blocos = mention_chunks(range(1000, 1100), limit=60)
+    assert all(len(conteudo) <= 60 for conteudo, _ in blocos)
+    assert [m for _, ids in blocos for m in ids] == list(range(1000, 1100))
+
+
+def test_members_who_cannot_view_digest_channel_get_dm():
+    pytest.importorskip("discord")
+    from bot import WeProfit
+
+    visiveis = {1}
+    membros = {member_id: SimpleNamespace(id=member_id) for member_id in (1, 2)}
+    canal = SimpleNamespace(
+        guild=SimpleNamespace(get_member=membros.get),
+        permissions_for=lambda membro: SimpleNamespace(view_channel=membro.id in visiveis)
+    )
+    bot = SimpleNamespace()
+
+    # 3 não está no cache de membros: também recebe DM
+    por_dm, resumo = asyncio.run(WeProfit._separar_resumo(bot, {1: 10, 2: 10, 3: 10}, {10: canal}))
+    assert resumo == {10: [1]}
+    assert por_dm == {2: 10, 3: 10}
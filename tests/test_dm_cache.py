@@ -0,0 +1,21 @@
+import pytest
+
+from dm_cache import DMNegativeCache
+
+
+def test_failed_save_keeps_changes_pending(tmp_path):
+    # O diretório pai é um arquivo: a gravação falha
+    bloqueio = tmp_path / "arquivo"
+    bloqueio.write_text("")
+    cache = DMNegativeCache(str(bloqueio / "dm_blocked.json"), 3600)
+    cache.mark_blocked(1)
+
+    with pytest.raises(OSError):
+        cache.save()
+
+    cache.path = str(tmp_path / "dm_blocked.json")
+    cache.save()
+
+    recarregado = DMNegativeCache(cache.path, 3600)
+    recarregado.load()
+    assert recarregado.is_blocked(1)
@@ -0,0 +1,26 @@
+import time
+
+from history_store import HistoryStore
+
+
+def test_digest_ack_recorded_on_any_post_of_the_convocation(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite3"))
+    history.record_convocation("c1", 9, 100, "baixa", None)
+    # Membro 2 foi mencionado na segunda publicação (11), mas reagiu à primeira (10)
+    history.record_recipient("c1", 1, 9, "mentioned", 10, 5, time.time() + 60)
+    history.record_recipient("c1", 2, 9, "mentioned", 11, 5, time.time() + 60)
+    history.record_convocation_ack("c1", 2, True)
+    history.flush()
+
+    assert set(history.recent_responders(0)) == {2}
+    faltas = history.missed(9)["items"]
+    assert [item["user_id"] for item in faltas] == [1]
+
+
+def test_digest_posts_are_pending_once(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.sqlite3"))
+    for user_id in (1, 2, 3):
+        history.record_recipient("c1", user_id, 9, "mentioned", 10, 5, time.time() - 1)
+    history.flush()
+
+    assert [item["message_id"] for item in history.pending_deletions(time.time())] == [10]
@@ -0,0 +1,63 @@
+import asyncio
+
+from idempotency import IdempotencyRegistry
+
+
+def test_running_convocation_outlives_the_window():
+    async def cenario():
+        registro = IdempotencyRegistry(window_seconds=0.05)
+        liberar = asyncio.Event()
+
+        async def convocacao():
+            await liberar.wait()
+            return "ok"
+
+        tarefa = registro.start("chave", convocacao())
+        await asyncio.sleep(0.1)
+        assert registro.get("chave") is tarefa
+
+        liberar.set()
+        await tarefa
+        assert registro.get("chave") is tarefa
+        await asyncio.sleep(0.1)
+        assert registro.get("chave") is None
+
+    asyncio.run(cenario())
+
+
+def test_failed_convocation_is_not_reused():
+    async def cenario():
+        registro = IdempotencyRegistry(window_seconds=60)
+
+        async def falha():
+            raise RuntimeError("erro")
+
+        tarefa = registro.start("chave", falha())
+        await asyncio.gather(tarefa, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert registro.get("chave") is None
+
+    asyncio.run(cenario())
+
+
+def test_convocation_that_reached_nobody_is_retried():
+    async def cenario():
+        registro = IdempotencyRegistry(window_seconds=60, reusable=lambda resultado: resultado[2] > 0)
+        execucoes = []
+
+        async def convocacao(entregues):
+            execucoes.append(entregues)
+            return "resultado", None, entregues
+
+        await registro.start("chave", convocacao(0))
+        await asyncio.sleep(0)
+        assert registro.get("chave") is None
+
+        # Nova tentativa (ex.: cargos corrigidos) executa de novo e passa a ser reaproveitada
+        tarefa = registro.start("chave", convocacao(5))
+        await tarefa
+        await asyncio.sleep(0)
+        assert registro.get("chave") is tarefa
+        assert execucoes == [0, 5]
+
+    asyncio.run(cenario())
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import ping_service
+from config import Config
+
+
+def _metricas(name=None):
+    incidente = {"stall_ms": 300.0, "location": "bot.py:1 (x)", "stack": ["  File \"bot.py\", line 1"]}
+    return {"loop_lag": {"lag": {}, "stalled_now": False, "incident_count": 1,
+                         "current_incident": None, "incidents": [incidente]}}
+
+
+def test_loop_lag_incidents_require_profiler_token(monkeypatch):
+    monkeypatch.setattr(ping_service, "coletar_metricas", _metricas)
+    monkeypatch.setattr(Config, "PROFILER_TOKEN", "segredo")
+    cliente = ping_service.app.test_client()
+
+    aberto = cliente.get("/metrics").get_json()["loop_lag"]
+    assert aberto["incident_count"] == 1
+    assert "incidents" not in aberto and "current_incident" not in aberto
+
+    autorizado = cliente.get("/metrics", headers={"Authorization": "Bearer segredo"}).get_json()
+    assert autorizado["loop_lag"]["incidents"][0]["stack"]
+
+
+def test_loop_lag_incidents_hidden_without_profiler_token(monkeypatch):
+    monkeypatch.setattr(ping_service, "coletar_metricas", _metricas)
+    monkeypatch.setattr(Config, "PROFILER_TOKEN", "")
+    dados = ping_service.app.test_client().get("/metrics", headers={"Authorization": "Bearer "}).get_json()
+    assert "incidents" not in dados["loop_lag"]
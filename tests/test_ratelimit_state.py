@@ -0,0 +1,55 @@
+import time
+import asyncio
+
+import pytest
+
+import ratelimit_state
+
+
+def _snapshot(remaining, reset_in):
+    return {
+        "version": ratelimit_state.SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "bucket_hashes": {},
+        "buckets": {
+            "bucket:1": {"limit": 5, "remaining": remaining, "reset_at": time.time() + reset_in, "reset_after": reset_in}
+        }
+    }
+
+
+def test_exhausted_bucket_is_not_restored():
+    discord_http = pytest.importorskip("discord.http")
+
+    async def cenario():
+        loop = asyncio.get_running_loop()
+        http = discord_http.HTTPClient(loop)
+        try:
+            _, restaurados = ratelimit_state.restore(http, loop, _snapshot(remaining=0, reset_in=1))
+            assert restaurados == 0
+
+            # Após o reset original, o bucket precisa ser adquirido sem ficar bloqueado
+            await asyncio.sleep(1.1)
+            ratelimit = http.get_ratelimit("bucket:1")
+            await asyncio.wait_for(ratelimit.acquire(), timeout=2)
+        finally:
+            await http.close()
+
+    asyncio.run(cenario())
+
+
+def test_bucket_with_remaining_requests_is_restored():
+    discord_http = pytest.importorskip("discord.http")
+
+    async def cenario():
+        loop = asyncio.get_running_loop()
+        http = discord_http.HTTPClient(loop)
+        try:
+            _, restaurados = ratelimit_state.restore(http, loop, _snapshot(remaining=3, reset_in=5))
+            assert restaurados == 1
+            ratelimit = http.get_ratelimit("bucket:1")
+            assert ratelimit.remaining == 3
+            await asyncio.wait_for(ratelimit.acquire(), timeout=1)
+        finally:
+            await http.close()
+
+    asyncio.run(cenario())
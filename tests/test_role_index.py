@@ -0,0 +1,30 @@
+import pytest
+
+from role_index import parse_role_tokens
+
+
+def test_parse_role_tokens_returns_unrecognized_text():
+    incluir, excluir, restante = parse_role_tokens("<@&123456789012345678> -<@&223456789012345678> @Cargo")
+    assert incluir == {123456789012345678}
+    assert excluir == {223456789012345678}
+    assert restante == "@Cargo"
+
+
+def test_short_role_mention_is_not_a_role():
+    assert parse_role_tokens("<@&12>") == (set(), set(), "<@&12>")
+
+
+@pytest.mark.parametrize("cargos", ["@Cargo", "<@&123456789012345678> typo", "<@&12>"])
+def test_invalid_role_option_is_refused(cargos):
+    pytest.importorskip("discord")
+    from bot import WeProfit
+
+    _, _, erro = WeProfit._cargos_alvo(None, cargos)
+    assert erro and erro.startswith("❌")
+
+
+def test_missing_role_option_targets_everyone():
+    pytest.importorskip("discord")
+    from bot import WeProfit
+
+    assert WeProfit._cargos_alvo(None, None) == (set(), set(), None)
@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from scheduled_convocations import parse_fire_time
+
+AGORA = datetime(2025, 12, 30, 22, 0, tzinfo=timezone.utc)
+
+
+def test_day_month_already_past_rolls_over_to_next_year():
+    assert parse_fire_time("02/01 20:00", AGORA) == datetime(2026, 1, 2, 20, 0, tzinfo=timezone.utc)
+
+
+def test_day_month_still_ahead_stays_in_current_year():
+    assert parse_fire_time("31/12 09:30", AGORA) == datetime(2025, 12, 31, 9, 30, tzinfo=timezone.utc)
+
+
+def test_february_29_uses_next_leap_year():
+    assert parse_fire_time("29/02 10:00", AGORA) == datetime(2028, 2, 29, 10, 0, tzinfo=timezone.utc)
+
+
+def test_explicit_year_is_kept():
+    assert parse_fire_time("02/01/2026 20:00", AGORA).year == 2026
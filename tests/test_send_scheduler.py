@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from send_scheduler import SendScheduler
+
+
+def test_warmup_is_granted_while_idle():
+    async def cenario():
+        scheduler = SendScheduler(interval=0)
+        await asyncio.wait_for(scheduler.acquire("aquecimento"), timeout=1)
+        assert scheduler.stats()["granted"] == {"aquecimento": 1}
+
+    asyncio.run(cenario())
+
+
+def test_warmup_waits_for_active_convocations():
+    async def cenario():
+        scheduler = SendScheduler(interval=0)
+        async with scheduler.job("baixa"):
+            aquecimento = asyncio.ensure_future(scheduler.acquire("aquecimento"))
+            await asyncio.sleep(0.05)
+            assert not aquecimento.done()
+        await asyncio.wait_for(aquecimento, timeout=1)
+
+    asyncio.run(cenario())
+
+
+def test_warmup_opens_dm_channels_while_idle(tmp_path):
+    pytest.importorskip("discord")
+    from bot import WeProfit
+    from dm_cache import DMNegativeCache
+
+    class Membro:
+        dm_channel = None
+
+        def __init__(self, member_id):
+            self.id = member_id
+
+        async def create_dm(self):
+            return f"dm-{self.id}"
+
+    membros = {1: Membro(1), 2: Membro(2)}
+    servidor = SimpleNamespace(get_member=membros.get)
+    bot = SimpleNamespace(
+        send_scheduler=SendScheduler(interval=0),
+        dm_block_cache=DMNegativeCache(str(tmp_path / "dm_blocked.json"), 3600),
+        get_guild=lambda guild_id: servidor,
+        _canais_resumo=lambda urgencia: {}
+    )
+    item = {"id": "ag1", "urgencia": "alta"}
+    preparo = {"destinatarios": {1: 10, 2: 10}, "canais": {}}
+
+    asyncio.run(asyncio.wait_for(WeProfit._aquecer_convocacao(bot, item, preparo), timeout=2))
+    assert preparo["canais"] == {1: "dm-1", 2: "dm-2"}
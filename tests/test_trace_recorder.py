@@ -0,0 +1,74 @@
+import json
+
+from trace_recorder import redact
+
+
+def _dm_da_convocacao():
+    """MESSAGE_CREATE de uma DM de convocação enviada pelo bot"""
+    return {
+        "id": "1300000000000000001",
+        "channel_id": "1300000000000000002",
+        "author": {"id": "1200000000000000000", "username": "WeProfit", "bot": True, "avatar": "abc"},
+        "content": "",
+        "embeds": [{
+            "type": "rich",
+            "title": "🚨 ALERTA DE URGÊNCIA 🔴 ALTA - We Profit",
+            "description": "Você está sendo convocado para uma atividade do grupo!",
+            "color": 15158332,
+            "fields": [
+                {"name": "Detalhes", "value": "Reunião secreta na sala 42", "inline": False},
+                {"name": "Auto-Destruição", "value": "⏱️ Esta mensagem se auto-destruirá em **2 horas**"}
+            ],
+            "footer": {"text": "Enviado por joao.silva • 01/01/2025 10:00",
+                       "icon_url": "https://cdn.discordapp.com/avatars/1/abc.png"},
+            "author": {"name": "joao.silva", "url": "https://example.com/joao"}
+        }]
+    }
+
+
+def test_embeds_of_bot_sent_dm_are_redacted():
+    resultado = redact(_dm_da_convocacao(), "!")
+    texto = json.dumps(resultado, ensure_ascii=False)
+
+    for segredo in ("Reunião secreta", "joao.silva", "ALERTA", "convocado", "example.com", "avatars"):
+        assert segredo not in texto
+
+    embed = resultado["embeds"][0]
+    # Estrutura mantida para a reprodução
+    assert len(embed["fields"]) == 2
+    assert embed["color"] == 15158332
+    assert embed["fields"][0]["inline"] is False
+    assert resultado["id"] == "1300000000000000001"
+
+
+def test_prefix_command_keeps_command_and_first_argument():
+    resultado = redact({"content": "!convocar alta reunião às 20h"}, "!")
+    assert resultado["content"].startswith("!convocar alta ")
+    assert "reunião" not in resultado["content"]
+
+
+def test_free_text_outside_messages_is_redacted():
+    payload = {
+        "guild": {"id": "1", "description": "Servidor secreto da guilda"},
+        "channel": {"id": "2", "topic": "Senha do cofre: 1234"},
+        "message": {"id": "3", "attachments": [{
+            "id": "4", "filename": "plano_de_ataque.png", "size": 10,
+            "url": "https://cdn.discordapp.com/attachments/2/4/plano_de_ataque.png",
+            "proxy_url": "https://media.discordapp.net/attachments/2/4/plano_de_ataque.png"
+        }]},
+        "presence": {"user": {"id": "5"}, "activities": [{
+            "type": 0, "name": "Jogo", "state": "Na sala 42", "details": "Caçando com joao.silva",
+            "assets": {"large_text": "Mapa secreto"}
+        }]}
+    }
+    resultado = redact(payload, "!")
+    texto = json.dumps(resultado, ensure_ascii=False)
+
+    for segredo in ("secreto", "Senha", "plano_de_ataque", "discordapp", "sala 42", "joao.silva"):
+        assert segredo not in texto
+
+    anexo = resultado["message"]["attachments"][0]
+    assert anexo["url"] is None and anexo["proxy_url"] is None
+    assert anexo["filename"] == "x" * len("plano_de_ataque.png")
+    assert anexo["size"] == 10
+    assert resultado["presence"]["activities"][0]["type"] == 0
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gravação opcional do tráfego real do bot para reprodução offline (trace_replay.py)
+Registra os eventos recebidos do gateway e as chamadas REST feitas pelo bot, com
+o instante de cada um, em JSON Lines comprimido (gzip). O parse, a anonimização
+e a escrita acontecem em uma thread dedicada; o event loop apenas enfileira.
+
+Formato (uma lista JSON por linha):
+    {"version": 1, "started_at": ...}                  cabeçalho
+    [ms, "G", "MESSAGE_CREATE", {dados anonimizados}]   evento do gateway
+    [ms, "R", "POST", "/channels/{channel_id}/messages", duração_ms, status]
+
+Anonimização: textos livres (nomes, apelidos, conteúdo de mensagens e embeds, detalhes
+de convocação, tópicos de canal, descrições, status de atividades, nomes de anexos) são
+substituídos; tokens de interação e de sessão, e-mails, imagens e links são descartados. IDs, nomes de comandos e a estrutura dos payloads são mantidos para que
+a reprodução tenha a mesma forma (mesmos membros, cargos e comandos).
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import gzip
+import json
+import time
+import queue
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger('trace_recorder')
+
+TRACE_VERSION = 1
+
+# Campos com texto livre de usuários: substituídos por pseudônimos estáveis
+PSEUDONYM_KEYS = {"username", "global_name", "nick", "name", "display_name"}
+# Credenciais: substituídas por um marcador (o discord.py exige a presença de algumas)
+SECRET_KEYS = {"token", "session_id", "resume_gateway_url"}
+# Dados pessoais ou inúteis para a reprodução: anulados
+NULL_KEYS = {"email", "avatar", "banner", "icon", "splash", "avatar_decoration_data", "bio", "phone",
+             "url", "proxy_url"}
+# Outros textos livres (tópico do canal, descrição do servidor, status de atividades, anexos): mascarados
+MASK_KEYS = {"topic", "description", "state", "details", "filename", "title", "large_text", "small_text"}
+# Opções de comandos slash com texto livre
+REDACT_OPTIONS = {"detalhes"}
+# Embeds: textos (detalhes da convocação, rodapé com o autor) mascarados, links anulados
+EMBED_TEXT_KEYS = {"title", "description", "name", "value", "text"}
+EMBED_URL_KEYS = {"url", "icon_url", "proxy_icon_url", "proxy_url"}
+
+# Operação especial da fila: sinaliza um evento quando tudo antes dela foi gravado
+_FLUSH = object()
+
+
+def _pseudonym(valor):
+    return "anon-" + hashlib.sha256(valor.encode("utf-8")).hexdigest()[:8]
+
+
+def _mask(texto):
+    return "x" * len(texto)
+
+
+def redact_content(content, prefix):
+    """Mantém o comando e o primeiro argumento de mensagens de comando; mascara o resto"""
+    if not content:
+        return content
+    if not content.startswith(prefix):
+        return _mask(content)
+    partes = content.split(" ")
+    return " ".join(partes[:2] + [_mask(p) for p in partes[2:]])
+
+
+def _redact_option(opcao):
+    opcao = dict(opcao)
+    if "options" in opcao:
+        opcao["options"] = [_redact_option(sub) for sub in opcao["options"]]
+    if opcao.get("name") in REDACT_OPTIONS and isinstance(opcao.get("value"), str):
+        opcao["value"] = _mask(opcao["value"])
+    return opcao
+
+
+def _redact_embed(obj):
+    """Embeds de mensagens (ex.: DMs de convocação enviadas pelo bot)"""
+    if isinstance(obj, list):
+        return [_redact_embed(item) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    resultado = {}
+    for chave, valor in obj.items():
+        if chave in EMBED_TEXT_KEYS and isinstance(valor, str):
+            resultado[chave] = _mask(valor)
+        elif chave in EMBED_URL_KEYS:
+            resultado[chave] = None
+        else:
+            resultado[chave] = _redact_embed(valor)
+    return resultado
+
+
+def _redact_command(data, prefix):
+    """Dados de um comando slash: mantém nomes de comando/opções, mascara opções de texto livre"""
+    resultado = {}
+    for chave, valor in data.items():
+        if chave == "options":
+            resultado[chave] = [_redact_option(opcao) for opcao in valor]
+        elif chave == "resolved":
+            resultado[chave] = redact(valor, prefix)
+        else:
+            resultado[chave] = valor
+    return resultado
+
+
+def redact(obj, prefix):
+    """Anonimiza recursivamente um payload do gateway"""
+    if isinstance(obj, list):
+        return [redact(item, prefix) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+
+    # Interação: o campo "data" descreve o comando invocado
+    interacao = "token" in obj and "application_id" in obj
+
+    resultado = {}
+    for chave, valor in obj.items():
+        if chave in SECRET_KEYS:
+            resultado[chave] = "redacted"
+        elif chave in NULL_KEYS:
+            resultado[chave] = None
+        elif chave in PSEUDONYM_KEYS and isinstance(valor, str):
+            resultado[chave] = _pseudonym(valor)
+        elif chave == "content" and isinstance(valor, str):
+            resultado[chave] = redact_content(valor, prefix)
+        elif chave in MASK_KEYS and isinstance(valor, str):
+            resultado[chave] = _mask(valor)
+        elif chave == "embeds":
+            resultado[chave] = _redact_embed(valor)
+        elif chave in ("emoji", "emojis"):
+            # Emojis de reação identificam a confirmação de presença (ACK_EMOJI)
+            resultado[chave] = valor
+        elif chave == "data" and interacao and isinstance(valor, dict):
+            resultado[chave] = _redact_command(valor, prefix)
+        else:
+            resultado[chave] = redact(valor, prefix)
+    return resultado
+
+
+class TraceRecorder:
+    """Grava o trace em segundo plano; para ao atingir o tamanho máximo"""
+
+    def __init__(self, directory, max_bytes, command_prefix="!"):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, time.strftime("trace-%Y%m%d-%H%M%S.jsonl.gz"))
+        self.max_bytes = max_bytes
+        self.prefix = command_prefix
+        self._t0 = time.perf_counter()
+        self._queue = queue.SimpleQueue()
+        self._raw = open(self.path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        self._write({"version": TRACE_VERSION, "started_at": time.time()})
+        self._stopped = False
+        self.gateway_events = 0
+        self.rest_calls = 0
+        self._thread = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Gravando trace de tráfego em {self.path}")
+
+    def _elapsed_ms(self, instante=None):
+        return round(((instante or time.perf_counter()) - self._t0) * 1000, 1)
+
+    def record_gateway(self, raw):
+        """Enfileira uma mensagem bruta do gateway (str JSON); o parse é feito na thread de escrita"""
+        if not self._stopped:
+            self._queue.put(("G", self._elapsed_ms(), raw))
+
+    def record_rest(self, method, path, started, duration, status):
+        """Enfileira uma chamada REST (path é o modelo da rota, sem IDs)"""
+        if not self._stopped:
+            self._queue.put(("R", self._elapsed_ms(started), method, path, round(duration * 1000, 1), status))
+
+    def _write(self, registro):
+        self._gzip.write(json.dumps(registro, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        self._gzip.write(b"\n")
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if item[0] is _FLUSH:
+                self._gzip.flush()
+                item[1].set()
+                continue
+            if self._stopped:
+                continue
+            try:
+                if item[0] == "G":
+                    payload = json.loads(item[2])
+                    if payload.get("op") != 0:
+                        continue
+                    self._write([item[1], "G", payload["t"], redact(payload.get("d"), self.prefix)])
+                    self.gateway_events += 1
+                else:
+                    self._write(list(item[1:2]) + ["R"] + list(item[2:]))
+                    self.rest_calls += 1
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Registro de trace descartado: {e}",
+                               extra={"aggregate": "registros de trace descartados"})
+                continue
+
+            if self._raw.tell() >= self.max_bytes:
+                self._stopped = True
+                self._gzip.flush()
+                logger.warning(f"Trace atingiu {self.max_bytes // (1024 * 1024)}MB; gravação interrompida")
+
+    def flush(self, timeout=10):
+        """Aguarda a gravação de tudo o que foi enfileirado (o arquivo continua aberto)"""
+        evento = threading.Event()
+        self._queue.put((_FLUSH, evento))
+        return evento.wait(timeout)
+
+    def close(self, timeout=10):
+        """Grava o que falta e finaliza o arquivo gzip"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._stopped = True
+        self._gzip.close()
+        self._raw.close()
+        logger.info(f"Trace finalizado: {self.gateway_events} eventos do gateway, {self.rest_calls} chamadas REST")
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "recording": not self._stopped,
+            "gateway_events": self.gateway_events,
+            "rest_calls": self.rest_calls,
+            "queued": self._queue.qsize()
+        }
+
+
+def read_trace(path):
+    """
+    Lê um trace gravado, tolerando arquivos não finalizados (ex.: reinício via os.execl)
+
+    Returns:
+        tuple: (cabeçalho, lista de registros)
+    """
+    cabecalho = None
+    registros = []
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for linha in f:
+                registro = json.loads(linha)
+                if cabecalho is None:
+                    cabecalho = registro
+                else:
+                    registros.append(registro)
+    except (EOFError, json.JSONDecodeError):
+        logger.warning(f"Trace {path} incompleto; usando {len(registros)} registros lidos")
+    return cabecalho or {}, registros
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reprodução offline de um trace gravado com TRACE_ENABLED
+Sobe uma API falsa do Discord em localhost, inicia o WeProfit apontando para ela
+(sem gateway real) e entrega os eventos gravados aos parsers do discord.py no
+ritmo original acelerado de 1x a 100x. As chamadas REST do bot são respondidas
+pela API falsa com a latência mediana gravada para cada rota.
+
+Ao final, imprime um relatório JSON: atraso máximo da reprodução em relação ao
+trace, eventos por tipo, chamadas REST feitas versus gravadas e as métricas
+registradas pelo bot (com INSTRUMENTATION_ENABLED=true, inclui os histogramas
+de latência por evento/comando).
+
+Uso:
+    python trace_replay.py data/traces/trace-AAAAMMDD-HHMMSS.jsonl.gz --speed 10
+
+Os dados do bot (histórico, caches) são gravados em um diretório temporário,
+nunca no DATA_DIR de produção. Usa atributos internos do discord.py
+(Route.BASE, ConnectionState.parsers, Client.ws) para dispensar a conexão real.
+
+Desenvolvido por Resetsui para We Profit - 2025
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+import statistics
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+DISCORD_EPOCH = 1420070400000
+
+
+def _configurar_ambiente(data_dir):
+    """Isola o bot reproduzido dos dados de produção (antes de importar config)"""
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["HISTORY_DB"] = os.path.join(data_dir, "history.sqlite3")
+    os.environ["TRACE_ENABLED"] = "false"
+    os.environ["SHARED_METRICS_FILE"] = ""
+
+
+def _rota_regex(modelo):
+    """/channels/{channel_id}/messages -> regex com grupos nomeados"""
+    partes = re.split(r'(\{\w+\})', modelo)
+    return re.compile("^" + "".join(
+        f"(?P<{p[1:-1]}>[^/]+)" if p.startswith("{") else re.escape(p) for p in partes
+    ) + "$")
+
+
+# Rotas usadas pelo bot que precisam de uma resposta com formato específico
+ROTAS = [
+    ("GET", "/users/@me"),
+    ("GET", "/oauth2/applications/@me"),
+    ("PUT", "/applications/{application_id}/commands"),
+    ("PUT", "/applications/{application_id}/guilds/{guild_id}/commands"),
+    ("POST", "/users/@me/channels"),
+    ("GET", "/channels/{channel_id}"),
+    ("POST", "/channels/{channel_id}/messages"),
+    ("GET", "/channels/{channel_id}/messages/{message_id}"),
+    ("PATCH", "/channels/{channel_id}/messages/{message_id}"),
+    ("POST", "/interactions/{interaction_id}/{interaction_token}/callback"),
+    ("POST", "/webhooks/{webhook_id}/{webhook_token}"),
+    ("PATCH", "/webhooks/{webhook_id}/{webhook_token}/messages/{message_id}"),
+]
+
+
+class FakeGateway:
+    """Substitui o websocket do gateway durante a reprodução"""
+    open = True
+    latency = 0.0
+    shard_id = None
+    _keep_alive = None
+
+    async def change_presence(self, **kwargs):
+        pass
+
+    async def request_chunks(self, *args, **kwargs):
+        pass
+
+    async def close(self, code=1000):
+        self.open = False
+
+
+class FakeDiscordAPI:
+    """API REST falsa: respostas mínimas válidas e latência gravada por rota"""
+
+    def __init__(self, bot_user, latencias):
+        self.bot_user = bot_user
+        self.latencias = latencias  # (método, modelo) -> segundos
+        self.calls = Counter()
+        self._seq = itertools.count()
+        self._dm_channels = {}
+        modelos = set(ROTAS) | set(latencias)
+        # Modelos mais específicos (menos parâmetros) primeiro
+        self._rotas = sorted(((metodo, modelo, _rota_regex(modelo)) for metodo, modelo in modelos),
+                             key=lambda rota: rota[1].count("{"))
+
+    def snowflake(self):
+        agora = int(time.time() * 1000) - DISCORD_EPOCH
+        return str((agora << 22) + next(self._seq) % 4096)
+
+    def _identificar(self, metodo, caminho):
+        for metodo_rota, modelo, regex in self._rotas:
+            if metodo_rota == metodo:
+                match = regex.match(caminho)
+                if match:
+                    return modelo, match.groupdict()
+        return caminho, {}
+
+    def _usuario(self, user_id):
+        return {"id": str(user_id), "username": f"anon-{user_id}", "discriminator": "0",
+                "global_name": None, "avatar": None, "bot": False}
+
+    def _mensagem(self, channel_id, corpo, message_id=None, webhook_id=None):
+        mensagem = {
+            "id": message_id or self.snowflake(), "channel_id": str(channel_id), "type": 0,
+            "content": corpo.get("content") or "", "author": self.bot_user, "attachments": [],
+            "embeds": corpo.get("embeds") or [], "mentions": [], "mention_roles": [],
+            "mention_everyone": False, "pinned": False, "tts": False, "flags": 0, "components": [],
+            "timestamp": datetime.now(timezone.utc).isoformat(), "edited_timestamp": None
+        }
+        if webhook_id:
+            mensagem["webhook_id"] = str(webhook_id)
+        return mensagem
+
+    def _responder(self, metodo, modelo, params, corpo):
+        """Resposta para cada rota conhecida; None = 204 sem conteúdo"""
+        if modelo == "/users/@me":
+            return self.bot_user
+        if modelo == "/oauth2/applications/@me":
+            return {"id": self.bot_user["id"], "name": "WeProfit (replay)", "icon": None, "description": "",
+                    "rpc_origins": [], "bot_public": False, "bot_require_code_grant": False,
+                    "owner": self.bot_user, "team": None, "verify_key": "0" * 64, "summary": "", "flags": 0}
+        if modelo.endswith("/commands") and metodo == "PUT":
+            return [dict(comando, id=self.snowflake(), application_id=self.bot_user["id"], version="1")
+                    for comando in corpo or []]
+        if modelo == "/users/@me/channels":
+            recipient = str(corpo.get("recipient_id"))
+            canal = self._dm_channels.setdefault(recipient, self.snowflake())
+            return {"id": canal, "type": 1, "last_message_id": None, "recipients": [self._usuario(recipient)]}
+        if modelo == "/channels/{channel_id}":
+            return {"id": params["channel_id"], "type": 1, "last_message_id": None,
+                    "recipients": [self._usuario(params["channel_id"])]}
+        if modelo.startswith("/channels/{channel_id}/messages") and metodo in ("POST", "GET", "PATCH"):
+            return self._mensagem(params["channel_id"], corpo, params.get("message_id"))
+        if modelo.endswith("/callback"):
+            mensagem = self._mensagem(self.snowflake(), (corpo or {}).get("data") or {})
+            return {"interaction": {"id": params["interaction_id"], "type": 2,
+                                    "response_message_id": mensagem["id"],
+                                    "response_message_loading": corpo.get("type") == 5,
+                                    "response_message_ephemeral": False},
+                    "resource": {"type": corpo.get("type", 4), "message": mensagem}}
+        if modelo.startswith("/webhooks/"):
+            return self._mensagem(self.snowflake(), corpo, params.get("message_id"), params.get("webhook_id"))
+        if metodo in ("DELETE", "PUT"):
+            return None
+        return {}
+
+    async def handle(self, request):
+        from aiohttp import web
+
+        caminho = "/" + request.match_info["path"]
+        modelo, params = self._identificar(request.method, caminho)
+        self.calls[(request.method, modelo)] += 1
+
+        atraso = self.latencias.get((request.method, modelo))
+        if atraso:
+            await asyncio.sleep(atraso)
+
+        corpo = {}
+        if request.can_read_body and request.content_type == "application/json":
+            corpo = await request.json()
+
+        resposta = self._responder(request.method, modelo, params, corpo)
+        if resposta is None:
+            return web.Response(status=204)
+        return web.json_response(resposta)
+
+
+def _latencias_gravadas(registros):
+    """Mediana da duração gravada de cada rota REST"""
+    duracoes = defaultdict(list)
+    for registro in registros:
+        if registro[1] == "R":
+            _, _, metodo, modelo, duracao_ms, _ = registro
+            duracoes[(metodo, modelo)].append(duracao_ms / 1000)
+    return {rota: statistics.median(valores) for rota, valores in duracoes.items()}
+
+
+async def _reproduzir(bot, eventos, speed):
+    """Entrega os eventos aos parsers do discord.py no ritmo do trace acelerado"""
+    loop = asyncio.get_running_loop()
+    parsers = bot._connection.parsers
+    por_tipo = Counter()
+    erros = Counter()
+    atraso_max = 0.0
+
+    inicio = loop.time()
+    base = eventos[0][0] if eventos else 0
+    for ms, _, nome, dados in eventos:
+        alvo = inicio + (ms - base) / 1000 / speed
+        espera = alvo - loop.time()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        else:
+            atraso_max = max(atraso_max, -espera)
+
+        parser = parsers.get(nome)
+        if parser is None:
+            erros[f"{nome} (sem parser)"] += 1
+            continue
+        try:
+            parser(dados)
+            por_tipo[nome] += 1
+        except Exception as e:
+            erros[f"{nome} ({type(e).__name__})"] += 1
+        # Cede o loop a cada evento, como o gateway real
+        await asyncio.sleep(0)
+
+    return {"events": dict(por_tipo.most_common()), "errors": dict(erros),
+            "max_lag_ms": round(atraso_max * 1000, 1), "wall_seconds": round(loop.time() - inicio, 2)}
+
+
+async def _drenar(bot, timeout):
+    """Aguarda o fim das convocações disparadas pelos eventos reproduzidos"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        admissao = bot.admission.stats()
+        if not admissao["in_flight"] and not admissao["waiting"]:
+            return True
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def replay(args):
+    import discord
+    from aiohttp import web
+    from bot import WeProfit
+    from metrics_registry import collect_metrics
+    from trace_recorder import read_trace
+
+    cabecalho, registros = read_trace(args.trace)
+    eventos = [r for r in registros if r[1] == "G"]
+    gravadas = Counter((r[2], r[3]) for r in registros if r[1] == "R")
+    if not eventos:
+        print("Trace sem eventos do gateway", file=sys.stderr)
+        return 1
+
+    # O usuário do bot vem do READY gravado, para que IDs de autoria coincidam
+    ready = next((r[3] for r in eventos if r[2] == "READY"), None)
+    bot_id = (ready or {}).get("user", {}).get("id") or "100000000000000000"
+    bot_user = {"id": bot_id, "username": "WeProfit (replay)", "discriminator": "0", "global_name": None,
+                "avatar": None, "bot": True, "verified": True, "mfa_enabled": False, "flags": 0}
+
+    api = FakeDiscordAPI(bot_user, {} if args.no_latency else _latencias_gravadas(registros))
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_route("*", "/api/v10/{path:.*}", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    porta = runner.addresses[0][1]
+
+    # Direciona REST e webhooks (respostas de interação) para a API falsa
+    base = f"http://127.0.0.1:{porta}/api/v10"
+    discord.http.Route.BASE = base
+    try:
+        from discord.webhook import async_ as webhook_async
+        webhook_async.Route.BASE = base
+    except (ImportError, AttributeError):
+        pass
+
+    bot = WeProfit()
+    bot._connection._chunk_guilds = False  # sem gateway para pedir chunks de membros
+    relatorio = {"trace": args.trace, "recorded_at": cabecalho.get("started_at"), "speed": args.speed}
+    try:
+        await bot.login("replay")
+        bot.ws = FakeGateway()
+
+        relatorio["replay"] = await _reproduzir(bot, eventos, args.speed)
+        relatorio["drained"] = await _drenar(bot, args.drain)
+        relatorio["rest"] = {
+            f"{metodo} {modelo}": {"replay": api.calls.get((metodo, modelo), 0), "recorded": gravadas.get((metodo, modelo), 0)}
+            for metodo, modelo in sorted(set(api.calls) | set(gravadas))
+        }
+        relatorio["metrics"] = collect_metrics()
+    finally:
+        await bot.close()
+        await runner.cleanup()
+
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False, default=str)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(saida)
+    else:
+        print(saida)
+    return 0
+
+
+def _velocidade(valor):
+    valor = float(valor)
+    if not 1 <= valor <= 100:
+        raise argparse.ArgumentTypeError("deve estar entre 1 e 100")
+    return valor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz um trace gravado contra uma API falsa local")
+    parser.add_argument("trace", help="arquivo trace-*.jsonl.gz gravado com TRACE_ENABLED=true")
+    parser.add_argument("--speed", type=_velocidade, default=1.0, help="aceleração de 1x a 100x (padrão 1)")
+    parser.add_argument("--port", type=int, default=0, help="porta da API falsa (padrão: livre)")
+    parser.add_argument("--no-latency", action="store_true", help="responder sem a latência gravada")
+    parser.add_argument("--drain", type=float, default=120, help="segundos aguardando convocações ao final")
+    parser.add_argument("--data-dir", help="diretório de dados do bot reproduzido (padrão: temporário)")
+    parser.add_argument("--report", help="gravar o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    _configurar_ambiente(args.data_dir or tempfile.mkdtemp(prefix="weprofit-replay-"))
+    sys.exit(asyncio.run(replay(args)))
+
+
+if __name__ == "__main__":
+    main()